@@ -60,10 +60,15 @@ This file implements a LangChain MCP client that:
   - Loads available MCP tools from each connected server.
   - Uses the Google Gemini API (via LangChain) to create a React agent with access to all tools.
   - Runs an interactive chat loop where user queries are processed by the agent.
+  - Traces every turn (LLM calls, tool calls and the matching server-side execution) and prints a
+    per-turn waterfall summary; see tracing.py.
 
 Detailed explanations:
   - Retries (max_retries=2): If an API call fails due to transient issues (e.g., timeouts), it will retry up to 2 times.
   - Temperature (set to 0): A value of 0 means fully deterministic output; increase this for more creative responses.
+  - Tracing: set MCP_TRACE_FILE to export the spans as JSON lines. The same file is passed on to the MCP
+    servers (unless their config sets it), so the waterfall can split tool time into database, server and
+    stdio time. MCP_TRACE_SUMMARY=0 turns the waterfall summary off.
 """
 
 import asyncio                        # For asynchronous operations
@@ -75,7 +80,7 @@ from contextlib import AsyncExitStack # For managing multiple asynchronous conte
 # ---------------------------
 # MCP Client Imports
 # ---------------------------
-from mcp import ClientSession, StdioServerParameters  # For managing MCP client sessions and server parameters
+from mcp import StdioServerParameters                 # For managing MCP server parameters
 from mcp.client.stdio import stdio_client             # For establishing a stdio connection to an MCP server
 
 # ---------------------------
@@ -85,6 +90,10 @@ from langchain_mcp_adapters.tools import load_mcp_tools  # Adapter to convert MC
 from langgraph.prebuilt import create_react_agent        # Function to create a prebuilt React agent using LangGraph
 from langchain_google_genai import ChatGoogleGenerativeAI  # Wrapper for the Google Gemini API via LangChain
 
+# ---------------------------
+# Tracing Imports
+# ---------------------------
+from tracing import LLMCallTracer, Tracer, TracingClientSession, waterfall  # Spans for turns, LLM calls and tool calls
 
 
 # ---------------------------
@@ -92,6 +101,10 @@ from langchain_google_genai import ChatGoogleGenerativeAI  # Wrapper for the Goo
 # ---------------------------
 from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from a .env file (e.g., GOOGLE_API_KEY)
+
+TRACE_FILE = os.getenv("MCP_TRACE_FILE", "")                      # JSONL file the spans are exported to (optional)
+TRACE_SUMMARY = os.getenv("MCP_TRACE_SUMMARY", "1") != "0"        # Print a waterfall summary after every turn
+tracer = Tracer("mcp-client", TRACE_FILE)
 # ---------------------------
 # Custom JSON Encoder for LangChain objects
 # ---------------------------
@@ -167,13 +180,20 @@ async def run_agent():
     async with AsyncExitStack() as stack:
         for server_name, server_info in mcp_servers.items():
             print(f"\n🔗 Connecting to MCP Server: {server_name}...")
+            # Servers write their spans to the client's trace file unless their config says otherwise
+            server_env = dict(server_info.get("env") or {})
+            if TRACE_FILE:
+                server_env.setdefault("MCP_TRACE_FILE", TRACE_FILE)
             server_params = StdioServerParameters(
                 command=server_info["command"],
-                args=server_info["args"]
+                args=server_info["args"],
+                env=server_env or None
             )
             try:
                 read, write = await stack.enter_async_context(stdio_client(server_params))
-                session = await stack.enter_async_context(ClientSession(read, write))
+                session = await stack.enter_async_context(
+                    TracingClientSession(read, write, tracer=tracer, server_name=server_name)
+                )
                 await session.initialize()
                 server_tools = await load_mcp_tools(session)
                 for tool in server_tools:
@@ -234,7 +254,12 @@ async def run_agent():
 
        
             # <-- STEP 3: Send the entire history to the agent
-            response = await agent.ainvoke(current_turn_input)
+            # The turn is one trace: LLM calls are recorded by the callback handler, tool calls by the session
+            with tracer.span("agent.turn", attributes={"query_chars": len(query),
+                                                       "history_messages": len(conversation_history)}) as turn:
+                response = await agent.ainvoke(current_turn_input,
+                                               config={"callbacks": [LLMCallTracer(tracer, turn)]})
+                turn.attributes["response_messages"] = len(response['messages'])
             # response = await try_harder(agent, query)
             
             # <-- STEP 4: Append the user query and AI response to the history for the next turn
@@ -251,6 +276,10 @@ async def run_agent():
             except Exception:
                 print(str(response))
 
+            if TRACE_SUMMARY:
+                print("\n" + waterfall(tracer, turn))
+            tracer.finished_spans(turn.trace_id, clear=True)
+
 
 # ---------------------------
 # Entry Point
@@ -0,0 +1,338 @@
+"""
+tracing.py
+
+End-to-end tracing for the LangChain MCP client.
+
+Every agent turn is one trace, recorded as OpenTelemetry-style spans:
+  agent.turn   the whole turn, from the user's query to the final answer
+  llm.call     one chat model request (one per agent step), with token usage when the model reports it
+  tool.call    one MCP tools/call round trip as the client sees it (stdio, server, database)
+The tool.call span is propagated to the MCP server as a W3C traceparent in the request's _meta, and the
+database servers (Servers/instrumentation.py) record their side of the call as a child span in the same
+trace, with per-phase timings (connect, acquire, execute, fetch, serialize).
+
+Spans are kept in memory for the turn's waterfall summary and, with a trace file set, appended to it as
+one JSON line each. When the client and the servers share that file (run_agent passes MCP_TRACE_FILE on
+to the servers it starts), the waterfall also shows the server spans, which splits a tool call into
+database time, other server time and stdio/transport overhead.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler  # Hooks for the chat model's start and end
+from mcp import ClientSession                             # MCP client session, extended to propagate trace context
+
+# Server phases that are spent talking to the database
+DATABASE_PHASES = ("connect", "acquire", "execute", "fetch")
+
+# Width of the bars in the waterfall summary
+WATERFALL_WIDTH = 40
+
+
+# ---------------------------
+# Spans
+# ---------------------------
+class Span:
+    """One timed operation of a trace."""
+
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_span_id", "start_ns", "end_ns", "status",
+                 "attributes")
+
+    def __init__(self, name: str, kind: str, trace_id: str, parent_span_id: Optional[str] = None,
+                 attributes: Optional[dict] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.status = "ok"
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    @property
+    def traceparent(self) -> str:
+        """W3C trace context header naming this span as the parent (sampled)."""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current_span = contextvars.ContextVar("mcp_client_span", default=None)
+
+
+class Tracer:
+    """Creates spans, keeps the finished ones per trace and exports them to an optional JSONL file."""
+
+    def __init__(self, service: str = "mcp-client", trace_file: Optional[str] = None):
+        self.service = service
+        self.trace_file = trace_file or None
+        self._lock = threading.Lock()
+        self._finished: Dict[str, List[Span]] = {}
+        self._file = None
+        self._server_records: Dict[str, List[dict]] = {}  # trace_id -> server records read so far
+        self._read_offset = 0                               # bytes of the trace file already read
+
+    def start_span(self, name: str, kind: str = "internal", parent: Optional[Span] = None,
+                   attributes: Optional[dict] = None) -> Span:
+        """Start a span under parent (default: the current span); without one it starts a new trace."""
+        parent = parent if parent is not None else _current_span.get()
+        if parent is None:
+            return Span(name, kind, os.urandom(16).hex(), None, attributes)
+        return Span(name, kind, parent.trace_id, parent.span_id, attributes)
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None):
+        if span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.status = "error"
+            span.attributes["error"] = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self._finished.setdefault(span.trace_id, []).append(span)
+        if self.trace_file:
+            self._export(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", parent: Optional[Span] = None,
+             attributes: Optional[dict] = None):
+        """Run the block as a span, which is the current span (the parent of new spans) inside it."""
+        span = self.start_span(name, kind, parent, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def finished_spans(self, trace_id: str, clear: bool = False) -> List[Span]:
+        with self._lock:
+            spans = self._finished.pop(trace_id, []) if clear else list(self._finished.get(trace_id, []))
+            if clear:
+                self._server_records.pop(trace_id, None)
+        return spans
+
+    def server_spans(self, trace_id: str) -> List[dict]:
+        """Server-side records of a trace from the shared trace file (those with engine and tool keys).
+
+        The file is tailed: each call reads only the lines appended since the previous one and keeps the
+        server records of the traces this tracer has spans for, until finished_spans(clear=True).
+        """
+        if not self.trace_file:
+            return []
+        with self._lock:
+            self._tail_trace_file()
+            return list(self._server_records.get(trace_id, []))
+
+    def _tail_trace_file(self):
+        try:
+            with open(self.trace_file, "rb") as f:
+                if os.fstat(f.fileno()).st_size < self._read_offset:
+                    self._read_offset = 0  # truncated or replaced
+                f.seek(self._read_offset)
+                data = f.read()
+        except OSError:
+            return
+        # A server may be halfway through a line; leave it for the next call
+        end = data.rfind(b"\n") + 1
+        self._read_offset += end
+        for line in data[:end].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict) or "engine" not in record or "tool" not in record:
+                continue
+            trace_id = record.get("trace_id")
+            if trace_id in self._finished or trace_id in self._server_records:
+                self._server_records.setdefault(trace_id, []).append(record)
+
+    def _export(self, span: Span):
+        line = json.dumps({"ts": span.end_ns / 1e9, "service": self.service, **span.to_dict()}, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._file = open(self.trace_file, "a", encoding="utf-8", buffering=1)
+                self._file.write(line)
+            except OSError as e:
+                print(f"⚠️  Could not write trace file {self.trace_file}: {e}; span export disabled")
+                self.trace_file = None
+
+
+# ---------------------------
+# LLM call spans
+# ---------------------------
+class LLMCallTracer(BaseCallbackHandler):
+    """LangChain callback handler that records every chat model request of a turn as an llm.call span."""
+
+    # Run the hooks inline so the span times are not shifted by a thread pool hand-off
+    run_inline = True
+
+    def __init__(self, tracer: Tracer, turn: Span):
+        self.tracer = tracer
+        self.turn = turn
+        self._spans: Dict[Any, Span] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, invocation_params=None, metadata=None, **kwargs):
+        self._start(run_id, sum(len(batch) for batch in messages), invocation_params, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, invocation_params=None, metadata=None, **kwargs):
+        self._start(run_id, len(prompts), invocation_params, metadata)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        message = _first_message(response)
+        usage = getattr(message, "usage_metadata", None) or {}
+        if usage:
+            span.attributes["input_tokens"] = usage.get("input_tokens")
+            span.attributes["output_tokens"] = usage.get("output_tokens")
+        span.attributes["tool_calls"] = len(getattr(message, "tool_calls", None) or [])
+        self.tracer.end_span(span)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.tracer.end_span(span, error)
+
+    def _start(self, run_id, message_count: int, invocation_params: Optional[dict], metadata: Optional[dict]):
+        params = invocation_params or {}
+        model = params.get("model") or params.get("model_name") or (metadata or {}).get("ls_model_name")
+        self._spans[run_id] = self.tracer.start_span(
+            "llm.call", "client", parent=self.turn, attributes={"model": model, "messages": message_count}
+        )
+
+
+def _first_message(response):
+    try:
+        return response.generations[0][0].message
+    except (AttributeError, IndexError):
+        return None
+
+
+# ---------------------------
+# Tool call spans and trace context propagation
+# ---------------------------
+class TracingClientSession(ClientSession):
+    """ClientSession that records every tools/call as a tool.call span and sends its traceparent in _meta."""
+
+    def __init__(self, *args, tracer: Tracer, server_name: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracer = tracer
+        self.server_name = server_name
+
+    async def call_tool(self, name, arguments=None, *args, meta=None, **kwargs):
+        attributes = {
+            "server": self.server_name,
+            "tool": name,
+            "request_bytes": len(json.dumps(arguments or {}, default=str).encode("utf-8")),
+        }
+        with self.tracer.span("tool.call", "client", attributes=attributes) as span:
+            result = await super().call_tool(
+                name, arguments, *args, meta={**(meta or {}), "traceparent": span.traceparent}, **kwargs
+            )
+            span.attributes["response_bytes"] = sum(
+                len(getattr(item, "text", "").encode("utf-8")) for item in result.content
+            )
+            if result.isError:
+                span.status = "error"
+            return result
+
+
+# ---------------------------
+# Waterfall summary
+# ---------------------------
+def waterfall(tracer: Tracer, turn: Span) -> str:
+    """Per-turn summary: where the time of the turn went, and every span on a shared time axis.
+
+    LLM and tool time add up the spans of each kind (parallel tool calls overlap); "agent" is what the turn
+    spent outside of them. With server spans in the shared trace file, every tool call is split into
+    database time (the connect/acquire/execute/fetch phases), other server time and stdio overhead.
+    """
+    spans = [span for span in tracer.finished_spans(turn.trace_id) if span is not turn]
+    servers = {record.get("parent_span_id"): record for record in tracer.server_spans(turn.trace_id)}
+    turn_ms = turn.duration_ms
+
+    llm_ms = sum(span.duration_ms for span in spans if span.name == "llm.call")
+    tool_ms = sum(span.duration_ms for span in spans if span.name == "tool.call")
+    server_ms = database_ms = stdio_ms = 0.0
+    for span in spans:
+        record = servers.get(span.span_id)
+        if span.name != "tool.call" or record is None:
+            continue
+        server_ms += record.get("total_ms", 0.0)
+        database_ms += sum(record.get("phases_ms", {}).get(name, 0.0) for name in DATABASE_PHASES)
+        stdio_ms += max(0.0, span.duration_ms - record.get("total_ms", 0.0))
+
+    breakdown = [f"llm {_ms(llm_ms)}", f"tools {_ms(tool_ms)}"]
+    if servers:
+        breakdown += [f"database {_ms(database_ms)}", f"server other {_ms(server_ms - database_ms)}",
+                      f"stdio {_ms(stdio_ms)}"]
+    breakdown.append(f"agent {_ms(max(0.0, turn_ms - llm_ms - tool_ms))}")
+    lines = [f"⏱️  Turn {turn.trace_id[:8]}: {_ms(turn_ms)} ({', '.join(breakdown)})"]
+
+    rows = []
+    for span in sorted(spans, key=lambda s: s.start_ns):
+        if span.name == "llm.call":
+            label = f"llm {span.attributes.get('model') or ''}".rstrip()
+            tokens = [span.attributes.get(key) for key in ("input_tokens", "output_tokens")]
+            if all(token is not None for token in tokens):
+                label += f" ({tokens[0]} in / {tokens[1]} out)"
+        else:
+            label = f"{span.name} {span.attributes.get('server', '')}/{span.attributes.get('tool', '')}"
+        if span.status != "ok":
+            label += " [error]"
+        rows.append((span.start_ns / 1e6, span.duration_ms, label))
+        record = servers.get(span.span_id)
+        if record is not None:
+            total_ms = record.get("total_ms", 0.0)
+            phases = ", ".join(f"{name} {_ms(ms)}" for name, ms in record.get("phases_ms", {}).items() if ms)
+            label = f"  server {record.get('engine')} {record.get('status')}" + (f" ({phases})" if phases else "")
+            rows.append((record["ts"] * 1000 - total_ms, total_ms, label))
+
+    turn_start_ms = turn.start_ns / 1e6
+    for start_ms, duration_ms, label in rows:
+        offset_ms = max(0.0, start_ms - turn_start_ms)
+        lines.append(f"  {offset_ms:>9.0f} ms {duration_ms:>9.1f} ms  {_bar(offset_ms, duration_ms, turn_ms)}  {label}")
+    return "\n".join(lines)
+
+
+def _bar(offset_ms: float, duration_ms: float, total_ms: float) -> str:
+    if total_ms <= 0:
+        return " " * WATERFALL_WIDTH
+    start = min(WATERFALL_WIDTH - 1, int(offset_ms / total_ms * WATERFALL_WIDTH))
+    length = max(1, round(duration_ms / total_ms * WATERFALL_WIDTH))
+    length = min(length, WATERFALL_WIDTH - start)
+    return " " * start + "█" * length + " " * (WATERFALL_WIDTH - start - length)
+
+
+def _ms(ms: float) -> str:
+    return f"{ms / 1000:.2f} s" if ms >= 1000 else f"{ms:.0f} ms"
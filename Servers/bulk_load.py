@@ -0,0 +1,161 @@
+"""
+bulk_load.py
+
+Input side of the bulk load tools: rows come from a CSV file, a JSONL file or inline rows and are
+handed out in chunks, so files of any size are loaded with bounded memory.
+
+  - CSV / TSV: first line is the header unless has_header=False (then columns are required).
+               Empty fields load as NULL, like COPY ... CSV does.
+  - JSONL: one JSON object (keys are columns) or JSON array (positional) per line.
+  - rows:  a list of objects or of arrays; arrays need columns.
+"""
+
+import csv
+import datetime
+import json
+import os
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+FILE_FORMATS = ("csv", "tsv", "jsonl")
+
+
+def open_rows(file_path: Optional[str] = None, rows: Optional[list] = None, columns: Optional[List[str]] = None,
+              file_format: Optional[str] = None, has_header: bool = True) -> Tuple[List[str], Iterator[tuple], Optional[int], Callable[[], None]]:
+    """Return (columns, row iterator, total rows if known, close) for a file or inline rows.
+
+    Raises ValueError for missing or inconsistent input.
+    """
+    if (file_path is None) == (rows is None):
+        raise ValueError("Pass exactly one of file_path or rows")
+
+    if rows is not None:
+        columns, iterator = _inline_rows(rows, columns)
+        return columns, iterator, len(rows), lambda: None
+
+    if not os.path.isfile(file_path):
+        raise ValueError(f"File '{file_path}' does not exist")
+    file_format = (file_format or os.path.splitext(file_path)[1].lstrip(".") or "csv").lower()
+    if file_format in ("json", "ndjson"):
+        file_format = "jsonl"
+    delimiter = "\t" if file_format == "tsv" else ","
+    if file_format == "tsv":
+        file_format = "csv"
+    if file_format not in FILE_FORMATS:
+        raise ValueError(f"Unknown file_format '{file_format}'. Use one of: {', '.join(FILE_FORMATS)}")
+
+    handle = open(file_path, "r", encoding="utf-8", newline="")
+    try:
+        if file_format == "csv":
+            columns, iterator = _csv_rows(handle, columns, has_header, delimiter)
+        else:
+            columns, iterator = _jsonl_rows(handle, columns)
+    except Exception:
+        handle.close()
+        raise
+    return columns, iterator, None, handle.close
+
+
+def chunks(iterator: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    """Split an iterator into lists of at most size rows."""
+    iterator = iter(iterator)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def quoted_csv(rows: Sequence[Sequence], null: str, literal: Callable[[Any], str] = str) -> str:
+    """CSV text with every non-NULL value quoted and NULL written unquoted as `null`.
+
+    Quoting everything keeps empty strings and NULL apart for both COPY (null="") and LOAD DATA (null="NULL").
+    """
+    lines = []
+    for row in rows:
+        lines.append(",".join(
+            null if value is None else '"' + literal(value).replace('"', '""') + '"'
+            for value in row
+        ))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def text_literal(value: Any) -> str:
+    """Text form of a Python value that both engines parse back into the column type."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(sep=" ")
+    return str(value)
+
+
+# ---------------------------
+# Readers
+# ---------------------------
+def _inline_rows(rows: list, columns: Optional[List[str]]):
+    if not rows:
+        if not columns:
+            raise ValueError("rows is empty and no columns were given")
+        return list(columns), iter(())
+    if isinstance(rows[0], dict):
+        columns = list(columns or rows[0].keys())
+        return columns, (tuple(row.get(col) for col in columns) for row in rows)
+    if not columns:
+        raise ValueError("columns are required when rows are arrays")
+    return list(columns), (_positional(row, len(columns), i) for i, row in enumerate(rows))
+
+
+def _csv_rows(handle, columns: Optional[List[str]], has_header: bool, delimiter: str):
+    reader = csv.reader(handle, delimiter=delimiter)
+    header = next(reader, None) if has_header else None
+    if columns is None:
+        if header is None:
+            raise ValueError("columns are required when the CSV file has no header")
+        columns = header
+    columns = list(columns)
+    width = len(columns)
+
+    def rows():
+        for line_no, row in enumerate(reader, start=2 if has_header else 1):
+            if not row:
+                continue
+            yield _positional([None if value == "" else value for value in row], width, line_no)
+    return columns, rows()
+
+
+def _jsonl_rows(handle, columns: Optional[List[str]]):
+    lines = (line for line in handle if line.strip())
+    first_line = next(lines, None)
+    if first_line is None:
+        if not columns:
+            raise ValueError("The JSONL file is empty and no columns were given")
+        return list(columns), iter(())
+    first = json.loads(first_line)
+    if isinstance(first, dict):
+        columns = list(columns or first.keys())
+    elif not columns:
+        raise ValueError("columns are required when JSONL lines are arrays")
+    columns = list(columns)
+
+    def rows():
+        for line_no, record in enumerate(_records(first, lines), start=1):
+            if isinstance(record, dict):
+                yield tuple(record.get(col) for col in columns)
+            else:
+                yield _positional(record, len(columns), line_no)
+    return columns, rows()
+
+
+def _records(first, lines):
+    yield first
+    for line in lines:
+        yield json.loads(line)
+
+
+def _positional(row: Sequence, width: int, position: int) -> tuple:
+    if len(row) != width:
+        raise ValueError(f"Row {position} has {len(row)} values, expected {width}")
+    return tuple(row)
@@ -0,0 +1,129 @@
+"""
+catalog_cache.py
+
+In-process, TTL-bound cache of the database names present on a server.
+
+Existence checks before a database switch become dictionary lookups. The cache is
+refreshed when its TTL expires, when a name is missing and the cache is older than
+miss_refresh_interval (databases created outside of the MCP server), and explicitly
+through invalidate() after CREATE/DROP/ALTER DATABASE passes through the executor.
+
+AsyncDatabaseCatalog takes a coroutine loader (aiomysql) and exposes awaitable names()/exists().
+"""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from loguru import logger
+
+
+class DatabaseCatalog:
+    """TTL cache of database names, loaded by a driver-specific loader()."""
+
+    def __init__(self, loader: Callable[[], List[str]], *, name: str = "catalog",
+                 ttl: float = 60.0, miss_refresh_interval: float = 5.0):
+        self.name = name
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._names: Optional[List[str]] = None
+        self._lookup = set()
+        self._loaded_at = 0.0
+        self.counters = {"hits": 0, "misses": 0, "refreshes": 0, "invalidations": 0}
+
+    def names(self) -> List[str]:
+        """Database names, reloading them if the TTL has expired."""
+        with self._lock:
+            if self._expired_locked(self.ttl):
+                self._refresh_locked()
+            else:
+                self.counters["hits"] += 1
+            return list(self._names)
+
+    def exists(self, database_name: str) -> bool:
+        """Dictionary lookup; a miss only reloads if the cache is not brand new."""
+        with self._lock:
+            if self._expired_locked(self.ttl):
+                self._refresh_locked()
+            elif database_name in self._lookup:
+                self.counters["hits"] += 1
+                return True
+            elif self._expired_locked(self.miss_refresh_interval):
+                self._refresh_locked()
+            else:
+                self.counters["misses"] += 1
+            return database_name in self._lookup
+
+    def invalidate(self):
+        """Forget the cached names; the next lookup reloads them."""
+        with self._lock:
+            self._names = None
+            self._lookup = set()
+            self.counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "ttl": self.ttl,
+                "cached_databases": len(self._names) if self._names is not None else None,
+                "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._names is not None else None,
+                **self.counters,
+            }
+
+    def _expired_locked(self, max_age: float) -> bool:
+        return self._names is None or time.monotonic() - self._loaded_at > max_age
+
+    def _refresh_locked(self):
+        names = list(self._loader())
+        self._names = names
+        self._lookup = set(names)
+        self._loaded_at = time.monotonic()
+        self.counters["refreshes"] += 1
+        logger.debug(f"[{self.name}] Loaded {len(names)} database names")
+
+
+class AsyncDatabaseCatalog(DatabaseCatalog):
+    """DatabaseCatalog whose loader is a coroutine function; concurrent misses share one reload."""
+
+    def __init__(self, loader: Callable[[], Awaitable[List[str]]], **kwargs):
+        super().__init__(loader, **kwargs)
+        self._refresh_lock = asyncio.Lock()
+
+    async def names(self) -> List[str]:
+        """Database names, reloading them if the TTL has expired."""
+        async with self._refresh_lock:
+            with self._lock:
+                if not self._expired_locked(self.ttl):
+                    self.counters["hits"] += 1
+                    return list(self._names)
+            await self._refresh()
+            with self._lock:
+                return list(self._names)
+
+    async def exists(self, database_name: str) -> bool:
+        """Dictionary lookup; a miss only reloads if the cache is not brand new."""
+        async with self._refresh_lock:
+            with self._lock:
+                if not self._expired_locked(self.ttl):
+                    if database_name in self._lookup:
+                        self.counters["hits"] += 1
+                        return True
+                    if not self._expired_locked(self.miss_refresh_interval):
+                        self.counters["misses"] += 1
+                        return False
+            await self._refresh()
+            with self._lock:
+                return database_name in self._lookup
+
+    async def _refresh(self):
+        names = list(await self._loader())
+        with self._lock:
+            self._names = names
+            self._lookup = set(names)
+            self._loaded_at = time.monotonic()
+            self.counters["refreshes"] += 1
+        logger.debug(f"[{self.name}] Loaded {len(names)} database names")
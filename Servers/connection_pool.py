@@ -0,0 +1,587 @@
+"""
+connection_pool.py
+
+Small thread-safe connection pool shared by the database servers.
+
+The pool does not know anything about a particular driver. It is built from:
+  - connect(tag):       opens a new DB-API connection (tag is an optional label such as a database name).
+  - health_check(conn): optional, raises / returns False when a warm connection is dead.
+  - switch(conn, tag):  optional, re-points an idle connection at another tag (e.g. MySQL select_db).
+  - reset(conn):        optional, cleans a connection before it goes back to the idle list.
+
+Idle connections are kept warm, checked before reuse when they have been idle for a while,
+evicted after idle_timeout and recycled after max_lifetime. When a borrow finds the pool below
+min_size, the missing connections are opened in the background (a thread, or a task for the asyncio
+pool), so a burst of calls after start-up, or after connections were dropped, finds them warm. Counters are kept so the pool can be sized.
+Borrowing is timed as the "acquire" phase of the current tool call, opening a connection as "connect".
+
+AsyncConnectionPool is the asyncio flavour for drivers with coroutine APIs (aiomysql): the same
+callables are coroutine functions and borrowers wait on the event loop instead of a thread condition.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from instrumentation import phase
+
+
+# Pass as tag to accept any warm connection without switching it
+ANY_TAG = object()
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection could be borrowed within the acquire timeout."""
+
+
+class _PoolEntry:
+    """Book-keeping for one physical connection."""
+
+    __slots__ = ("conn", "tag", "created_at", "last_used")
+
+    def __init__(self, conn, tag):
+        now = time.monotonic()
+        self.conn = conn
+        self.tag = tag
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Thread-safe pool of warm connections with tag affinity, idle eviction and health checks."""
+
+    def __init__(
+        self,
+        connect: Callable[[Optional[str]], Any],
+        *,
+        name: str = "pool",
+        min_size: int = 0,
+        max_size: int = 5,
+        idle_timeout: float = 300.0,
+        max_lifetime: Optional[float] = None,
+        health_check: Optional[Callable[[Any], Any]] = None,
+        health_check_interval: float = 30.0,
+        switch: Optional[Callable[[Any, Optional[str]], None]] = None,
+        reset: Optional[Callable[[Any], None]] = None,
+        acquire_timeout: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.name = name
+        self.min_size = max(0, min(min_size, max_size))
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._connect = connect
+        self._health_check = health_check
+        self._switch = switch
+        self._reset = reset
+
+        self._lock = threading.Condition()
+        self._idle: List[_PoolEntry] = []
+        self._in_use: Dict[int, _PoolEntry] = {}
+        self._opening = 0
+        self._closed = False
+
+        self.counters = {
+            "hits": 0,           # warm connection reused as-is
+            "switches": 0,       # warm connection re-pointed at another tag
+            "misses": 0,         # new physical connection opened
+            "waits": 0,          # borrower had to wait for a release
+            "timeouts": 0,       # borrower gave up waiting
+            "health_check_failures": 0,
+            "idle_evictions": 0,
+            "lifetime_recycles": 0,
+            "discarded": 0,      # returned broken by the caller
+            "prewarmed": 0,      # opened in the background to reach min_size
+        }
+
+    # ---------------------------
+    # Borrow / return
+    # ---------------------------
+    def acquire(self, tag: Optional[str] = None, timeout: Optional[float] = None):
+        """Borrow a connection, preferring an idle one that already carries the requested tag.
+
+        With tag=ANY_TAG any warm connection is returned as-is (useful for server-wide catalog queries).
+        """
+        with phase("acquire"):
+            conn = self._acquire(tag, timeout)
+        self._keep_warm(tag)
+        return conn
+
+    def _acquire(self, tag, timeout: Optional[float]):
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        waited = False
+
+        while True:
+            stale: List[_PoolEntry] = []
+            entry = None
+            must_open = False
+            with self._lock:
+                if self._closed:
+                    raise PoolExhaustedError(f"Pool '{self.name}' is closed")
+                stale = self._collect_stale_locked()
+
+                entry = self._take_idle_locked(tag)
+                if entry is None and len(self._idle) + len(self._in_use) + self._opening < self.max_size:
+                    self._opening += 1
+                    must_open = True
+                elif entry is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise PoolExhaustedError(
+                            f"Pool '{self.name}' exhausted: {self.max_size} connections in use"
+                        )
+                    if not waited:
+                        self.counters["waits"] += 1
+                        waited = True
+                    # Close stale connections outside of the wait as well
+                    if not stale:
+                        self._lock.wait(remaining)
+                        continue
+
+            self._close_entries(stale)
+
+            if must_open:
+                return self._open(tag)
+            if entry is None:
+                continue
+
+            conn = self._prepare(entry, tag)
+            if conn is not None:
+                return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a borrowed connection. Broken connections should be returned with discard=True."""
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            # Not ours (or already released); make sure it does not leak
+            self._safe_close(conn)
+            return
+
+        if not discard and self._reset is not None:
+            try:
+                self._reset(conn)
+            except Exception as e:
+                logger.warning(f"[{self.name}] Reset failed, discarding connection: {e}")
+                discard = True
+
+        expired = self.max_lifetime is not None and time.monotonic() - entry.created_at > self.max_lifetime
+
+        with self._lock:
+            if discard or expired or self._closed:
+                if discard:
+                    self.counters["discarded"] += 1
+                elif expired:
+                    self.counters["lifetime_recycles"] += 1
+                close_it = True
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                close_it = False
+            self._lock.notify()
+
+        if close_it:
+            self._safe_close(entry.conn)
+
+    @contextmanager
+    def connection(self, tag: Optional[str] = None, timeout: Optional[float] = None):
+        """Context manager: borrow a connection and always give it back.
+
+        If the block raises, the connection is handed to reset() (which should roll back);
+        a failing reset discards it.
+        """
+        conn = self.acquire(tag, timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ---------------------------
+    # Housekeeping
+    # ---------------------------
+    def prune(self):
+        """Evict idle connections past idle_timeout / max_lifetime (keeps min_size warm)."""
+        with self._lock:
+            stale = self._collect_stale_locked()
+        self._close_entries(stale)
+
+    def close(self):
+        """Close every idle connection and refuse new borrowers."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._lock.notify_all()
+        self._close_entries(idle)
+
+    def stats(self) -> dict:
+        """Pool size and hit/miss counters."""
+        with self._lock:
+            counters = dict(self.counters)
+            idle = len(self._idle)
+            in_use = len(self._in_use)
+        borrows = counters["hits"] + counters["switches"] + counters["misses"]
+        return {
+            "name": self.name,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle": idle,
+            "in_use": in_use,
+            "borrows": borrows,
+            "hit_ratio": round((counters["hits"] + counters["switches"]) / borrows, 4) if borrows else None,
+            **counters,
+        }
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _reserve_warm_up_locked(self) -> int:
+        """Reserve the connections missing to min_size; the caller opens them with _warm_up()."""
+        if self._closed:
+            return 0
+        missing = self.min_size - (len(self._idle) + len(self._in_use) + self._opening)
+        if missing > 0:
+            self._opening += missing
+        return max(0, missing)
+
+    def _keep_warm(self, tag):
+        with self._lock:
+            count = self._reserve_warm_up_locked()
+        if count:
+            # A plain thread: the warm-up is not part of the current tool call's timings
+            threading.Thread(target=self._warm_up, args=(None if tag is ANY_TAG else tag, count),
+                             name=f"{self.name}-warm-up", daemon=True).start()
+
+    def _warm_up(self, tag, count: int):
+        for opened in range(count):
+            try:
+                conn = self._connect(tag)
+            except Exception as e:
+                logger.warning(f"[{self.name}] Opening a warm connection failed: {e}")
+                with self._lock:
+                    self._opening -= count - opened
+                    self._lock.notify_all()
+                return
+            self._add_warm(conn, tag)
+
+    def _add_warm(self, conn, tag):
+        """Put a connection opened by the warm-up on the idle list."""
+        with self._lock:
+            self._opening -= 1
+            self._lock.notify()
+            if not self._closed:
+                self._idle.append(_PoolEntry(conn, tag))
+                self.counters["prewarmed"] += 1
+                return
+        self._safe_close(conn)
+
+    def _take_idle_locked(self, tag):
+        """Pop the most recently used idle entry, preferring one with the same tag."""
+        if tag is ANY_TAG:
+            return self._idle.pop() if self._idle else None
+        for i in range(len(self._idle) - 1, -1, -1):
+            if self._idle[i].tag == tag:
+                return self._idle.pop(i)
+        if self._switch is not None and self._idle:
+            return self._idle.pop()
+        return None
+
+    def _collect_stale_locked(self) -> List[_PoolEntry]:
+        now = time.monotonic()
+        keep, stale = [], []
+        total = len(self._idle) + len(self._in_use)
+        # Oldest-used first so the warmest connections survive
+        for entry in sorted(self._idle, key=lambda e: e.last_used):
+            if self.max_lifetime is not None and now - entry.created_at > self.max_lifetime:
+                self.counters["lifetime_recycles"] += 1
+                stale.append(entry)
+                total -= 1
+            elif now - entry.last_used > self.idle_timeout and total > self.min_size:
+                self.counters["idle_evictions"] += 1
+                stale.append(entry)
+                total -= 1
+            else:
+                keep.append(entry)
+        self._idle = keep
+        return stale
+
+    def _open(self, tag):
+        if tag is ANY_TAG:
+            tag = None
+        try:
+            with phase("connect"):
+                conn = self._connect(tag)
+        except Exception:
+            with self._lock:
+                self._opening -= 1
+                self._lock.notify()
+            raise
+        entry = _PoolEntry(conn, tag)
+        with self._lock:
+            self._opening -= 1
+            self.counters["misses"] += 1
+            self._in_use[id(conn)] = entry
+        logger.info(f"[{self.name}] Opened new connection ({self._describe(tag)})")
+        return conn
+
+    def _prepare(self, entry: _PoolEntry, tag):
+        """Health-check and re-tag a warm entry. Returns None if it had to be dropped."""
+        if self._health_check is not None and time.monotonic() - entry.last_used > self.health_check_interval:
+            try:
+                healthy = self._health_check(entry.conn) is not False
+            except Exception:
+                healthy = False
+            if not healthy:
+                logger.warning(f"[{self.name}] Dropping dead connection ({self._describe(entry.tag)})")
+                with self._lock:
+                    self.counters["health_check_failures"] += 1
+                    self._lock.notify()
+                self._safe_close(entry.conn)
+                return None
+
+        switched = tag is not ANY_TAG and entry.tag != tag
+        if switched:
+            try:
+                self._switch(entry.conn, tag)
+            except Exception as e:
+                logger.warning(f"[{self.name}] Switch to {self._describe(tag)} failed: {e}")
+                with self._lock:
+                    self._lock.notify()
+                self._safe_close(entry.conn)
+                raise
+            entry.tag = tag
+
+        with self._lock:
+            self.counters["switches" if switched else "hits"] += 1
+            self._in_use[id(entry.conn)] = entry
+        return entry.conn
+
+    def _close_entries(self, entries):
+        for entry in entries:
+            self._safe_close(entry.conn)
+
+    @staticmethod
+    def _safe_close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _describe(tag):
+        return f"'{tag}'" if tag is not None else "default"
+
+
+class AsyncConnectionPool(ConnectionPool):
+    """asyncio pool with the same tag affinity, eviction and counters as ConnectionPool.
+
+    connect, health_check, switch and reset are coroutine functions; close() on a connection must be
+    synchronous (as it is for aiomysql). The inherited thread lock only guards book-keeping and is never
+    held across an await.
+    """
+
+    def __init__(self, connect, **kwargs):
+        super().__init__(connect, **kwargs)
+        self._waiters = deque()
+        self._warm_ups = set()  # running warm-up tasks (the loop only keeps weak references)
+
+    async def acquire(self, tag: Optional[str] = None, timeout: Optional[float] = None):
+        """Borrow a connection, preferring an idle one that already carries the requested tag."""
+        with phase("acquire"):
+            conn = await self._acquire_async(tag, timeout)
+        self._keep_warm(tag)
+        return conn
+
+    async def _acquire_async(self, tag, timeout: Optional[float]):
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        waited = False
+
+        while True:
+            with self._lock:
+                if self._closed:
+                    raise PoolExhaustedError(f"Pool '{self.name}' is closed")
+                stale = self._collect_stale_locked()
+                entry = self._take_idle_locked(tag)
+                must_open = entry is None and len(self._idle) + len(self._in_use) + self._opening < self.max_size
+                if must_open:
+                    self._opening += 1
+                elif entry is None and not waited:
+                    self.counters["waits"] += 1
+                    waited = True
+
+            self._close_entries(stale)
+
+            if must_open:
+                return await self._open_async(tag)
+            if entry is not None:
+                conn = await self._prepare_async(entry, tag)
+                if conn is not None:
+                    return conn
+                continue
+            if stale:
+                continue
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self._wait_for_release(remaining):
+                with self._lock:
+                    self.counters["timeouts"] += 1
+                raise PoolExhaustedError(f"Pool '{self.name}' exhausted: {self.max_size} connections in use")
+
+    async def release(self, conn, discard: bool = False):
+        """Return a borrowed connection. Broken connections should be returned with discard=True."""
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            self._safe_close(conn)
+            return
+
+        if not discard and self._reset is not None:
+            try:
+                await self._reset(conn)
+            except Exception as e:
+                logger.warning(f"[{self.name}] Reset failed, discarding connection: {e}")
+                discard = True
+
+        expired = self.max_lifetime is not None and time.monotonic() - entry.created_at > self.max_lifetime
+
+        with self._lock:
+            if discard or expired or self._closed:
+                if discard:
+                    self.counters["discarded"] += 1
+                elif expired:
+                    self.counters["lifetime_recycles"] += 1
+                close_it = True
+            else:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+                close_it = False
+
+        if close_it:
+            self._safe_close(entry.conn)
+        self._wake_one()
+
+    @asynccontextmanager
+    async def connection(self, tag: Optional[str] = None, timeout: Optional[float] = None):
+        """Async context manager: borrow a connection and always give it back."""
+        conn = await self.acquire(tag, timeout)
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    def close(self):
+        super().close()
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(False)
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _keep_warm(self, tag):
+        with self._lock:
+            count = self._reserve_warm_up_locked()
+        if count:
+            # A fresh context: the warm-up is not part of the current tool call's timings
+            task = asyncio.get_running_loop().create_task(
+                self._warm_up_async(None if tag is ANY_TAG else tag, count), context=contextvars.Context()
+            )
+            self._warm_ups.add(task)
+            task.add_done_callback(self._warm_ups.discard)
+
+    async def _warm_up_async(self, tag, count: int):
+        for opened in range(count):
+            try:
+                conn = await self._connect(tag)
+            except BaseException as e:
+                logger.warning(f"[{self.name}] Opening a warm connection failed: {e}")
+                with self._lock:
+                    self._opening -= count - opened
+                self._wake_one()
+                if not isinstance(e, Exception):
+                    raise
+                return
+            self._add_warm(conn, tag)
+            self._wake_one()
+
+    async def _wait_for_release(self, timeout: float) -> bool:
+        """Wait until a connection is released (True) or the timeout expires (False)."""
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+
+    def _wake_one(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+
+    async def _open_async(self, tag):
+        if tag is ANY_TAG:
+            tag = None
+        try:
+            with phase("connect"):
+                conn = await self._connect(tag)
+        except BaseException:
+            with self._lock:
+                self._opening -= 1
+            self._wake_one()
+            raise
+        entry = _PoolEntry(conn, tag)
+        with self._lock:
+            self._opening -= 1
+            self.counters["misses"] += 1
+            self._in_use[id(conn)] = entry
+        logger.info(f"[{self.name}] Opened new connection ({self._describe(tag)})")
+        return conn
+
+    async def _prepare_async(self, entry: _PoolEntry, tag):
+        """Health-check and re-tag a warm entry. Returns None if it had to be dropped."""
+        if self._health_check is not None and time.monotonic() - entry.last_used > self.health_check_interval:
+            try:
+                healthy = await self._health_check(entry.conn) is not False
+            except Exception:
+                healthy = False
+            if not healthy:
+                logger.warning(f"[{self.name}] Dropping dead connection ({self._describe(entry.tag)})")
+                with self._lock:
+                    self.counters["health_check_failures"] += 1
+                self._safe_close(entry.conn)
+                self._wake_one()
+                return None
+
+        switched = tag is not ANY_TAG and entry.tag != tag
+        if switched:
+            try:
+                await self._switch(entry.conn, tag)
+            except BaseException as e:
+                logger.warning(f"[{self.name}] Switch to {self._describe(tag)} failed: {e}")
+                self._safe_close(entry.conn)
+                self._wake_one()
+                raise
+            entry.tag = tag
+
+        with self._lock:
+            self.counters["switches" if switched else "hits"] += 1
+            self._in_use[id(entry.conn)] = entry
+        return entry.conn
@@ -0,0 +1,116 @@
+"""
+cost_guard.py
+
+Pre-flight EXPLAIN check for agent-written SELECTs.
+
+Each server runs EXPLAIN on a plain read before executing it and hands the planner's estimate
+(estimated_rows, estimated_cost), read by postgres_plan_estimate / mysql_plan_estimate, to check():
+  - estimated cost above max_cost:   the query is rejected (a LIMIT would not make it cheaper).
+  - estimated rows above max_rows:   rejected in "reject" mode, capped with LIMIT row_cap in "limit" mode.
+Paged queries stream their rows, so only the cost threshold applies to them. A threshold of 0 is
+not checked; mode "off" skips the EXPLAIN altogether.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+GUARD_MODES = ("off", "reject", "limit")
+
+
+class QueryRejected(Exception):
+    """Raised when a query's estimate exceeds the guard's thresholds; report explains why."""
+
+    def __init__(self, report: dict):
+        super().__init__(report["reason"])
+        self.report = report
+
+
+class CostGuard:
+    """Thresholds and counters of one server's EXPLAIN guard."""
+
+    def __init__(self, engine: str, *, mode: str = "off", max_rows: float = 100000, max_cost: float = 1000000,
+                 row_cap: int = 1000):
+        mode = (mode or "off").strip().lower()
+        if mode not in GUARD_MODES:
+            raise ValueError(f"Unknown cost guard mode '{mode}'. Use one of: {', '.join(GUARD_MODES)}")
+        self.engine = engine
+        self.mode = mode
+        self.max_rows = max_rows
+        self.max_cost = max_cost
+        self.row_cap = row_cap
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "rejected": 0, "capped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def check(self, estimated_rows: Optional[float], estimated_cost: Optional[float], paged: bool = False) -> Optional[dict]:
+        """Return None to run the query as is, or a report with the LIMIT to cap it with.
+
+        Raises QueryRejected when the query must not run.
+        """
+        report = {"estimated_rows": estimated_rows, "estimated_cost": estimated_cost}
+        with self._lock:
+            self.counters["checked"] += 1
+            if self.max_cost and estimated_cost is not None and estimated_cost > self.max_cost:
+                self.counters["rejected"] += 1
+                raise QueryRejected({
+                    **report,
+                    "action": "rejected",
+                    "reason": f"Estimated cost {estimated_cost:g} exceeds the limit of {self.max_cost:g}"
+                })
+            if paged or not self.max_rows or estimated_rows is None or estimated_rows <= self.max_rows:
+                return None
+            reason = f"Estimated {estimated_rows:g} rows exceeds the limit of {self.max_rows:g}"
+            if self.mode == "reject":
+                self.counters["rejected"] += 1
+                raise QueryRejected({**report, "action": "rejected", "reason": reason})
+            self.counters["capped"] += 1
+            return {**report, "action": "capped", "limit": self.row_cap,
+                    "reason": f"{reason}; only the first {self.row_cap} rows are returned"}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "engine": self.engine,
+                "mode": self.mode,
+                "max_rows": self.max_rows,
+                "max_cost": self.max_cost,
+                "row_cap": self.row_cap,
+                **self.counters,
+            }
+
+
+def postgres_plan_estimate(explain: list) -> Tuple[Optional[float], Optional[float]]:
+    """(estimated rows, estimated cost) of a PostgreSQL EXPLAIN (FORMAT JSON) result."""
+    plan = explain[0]["Plan"]
+    return plan.get("Plan Rows"), plan.get("Total Cost")
+
+
+def _plan_nodes(node):
+    """Every object in an EXPLAIN FORMAT=JSON tree."""
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _plan_nodes(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _plan_nodes(value)
+
+
+def mysql_plan_estimate(plan: dict) -> Tuple[Optional[float], Optional[float]]:
+    """(estimated rows, estimated cost) of a MySQL EXPLAIN FORMAT=JSON document.
+
+    Format version 2 (MySQL 8.3+) states both at the top. Version 1 only has the cost; rows are the
+    largest join output, unknown (None) once GROUP BY / DISTINCT folds them.
+    """
+    if "estimated_total_cost" in plan:
+        return plan.get("estimated_rows"), plan.get("estimated_total_cost")
+    block = plan.get("query_block", {})
+    cost = block.get("cost_info", {}).get("query_cost")
+    nodes = list(_plan_nodes(block))
+    produced = [node["rows_produced_per_join"] for node in nodes if "rows_produced_per_join" in node]
+    grouped = any("grouping_operation" in node or "duplicates_removal" in node for node in nodes)
+    rows = float(max(produced)) if produced and not grouped else None
+    return rows, float(cost) if cost is not None else None
@@ -0,0 +1,343 @@
+"""
+cursor_registry.py
+
+Open server-side cursors for paged query results, addressed by opaque continuation tokens.
+
+A paged query registers its cursor here together with a close(cursor, exhausted) callback that
+returns (or discards) the borrowed connection. Pages are read with fetchmany(), so memory stays
+bounded by the page size. Cursors are closed as soon as they are exhausted, and a background
+reaper closes cursors that have not been read for idle_timeout seconds.
+
+Every open cursor holds a pooled connection. Cursors are registered under a group (the pool they
+borrowed from); make_room(group), called before borrowing, closes the group's least recently used
+cursors so at most max_per_group stay open and the pool always has connections left for other calls.
+
+AsyncCursorRegistry does the same for drivers whose fetchmany() and close callback are coroutines
+(aiomysql); its reaper runs as a task on the event loop.
+"""
+
+import asyncio
+import secrets
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from loguru import logger
+
+
+class CursorNotFoundError(Exception):
+    """Raised for unknown, exhausted or reaped continuation tokens."""
+
+
+class _OpenCursor:
+    __slots__ = ("token", "cursor", "close", "group", "columns", "page_size", "lookahead", "rows_fetched",
+                 "meta", "last_used", "lock", "closed")
+
+    def __init__(self, token, cursor, close, page_size, meta, group=None):
+        self.token = token
+        self.group = group
+        self.cursor = cursor
+        self.close = close
+        self.columns: List[str] = []
+        self.page_size = page_size
+        self.lookahead: List[Any] = []
+        self.rows_fetched = 0
+        self.meta = meta
+        self.last_used = time.monotonic()
+        self.lock = threading.Lock()
+        self.closed = False
+
+
+class Page:
+    """One page of rows read from an open cursor."""
+
+    __slots__ = ("token", "columns", "rows", "has_more", "rows_fetched", "meta")
+
+    def __init__(self, token, columns, rows, has_more, rows_fetched, meta):
+        self.token = token if has_more else None
+        self.columns = columns
+        self.rows = rows
+        self.has_more = has_more
+        self.rows_fetched = rows_fetched
+        self.meta = meta
+
+
+class CursorRegistry:
+    """Thread-safe registry of open cursors with idle reaping."""
+
+    def __init__(self, *, name: str = "cursors", idle_timeout: float = 300.0, max_open: int = 20,
+                 max_per_group: Optional[int] = None):
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self.max_per_group = max_per_group
+        self._lock = threading.Lock()
+        self._open = {}
+        self._reaper: Optional[threading.Thread] = None
+        self.counters = {"opened": 0, "exhausted": 0, "closed": 0, "reaped": 0, "evicted": 0, "pages": 0}
+
+    def make_room(self, group) -> int:
+        """Close the group's least recently used cursors until one more fits under max_per_group.
+
+        Call it before borrowing the connection for a new cursor of the group.
+        """
+        with self._lock:
+            evicted = self._evict_locked(group)
+        for old in evicted:
+            logger.warning(f"[{self.name}] Too many open cursors on {group}, closing {old.token}")
+            with old.lock:
+                self._close_entry(old, exhausted=False)
+        return len(evicted)
+
+    def open(self, cursor, close: Callable[[Any, bool], None], page_size: int, group=None, **meta) -> Page:
+        """Register an executed cursor and read its first page."""
+        entry = _OpenCursor(secrets.token_urlsafe(16), cursor, close, page_size, meta, group)
+        with self._lock:
+            evicted = self._evict_locked()
+            self._open[entry.token] = entry
+            self.counters["opened"] += 1
+            self._ensure_reaper_locked()
+        for old in evicted:
+            logger.warning(f"[{self.name}] Too many open cursors, closing {old.token}")
+            with old.lock:
+                self._close_entry(old, exhausted=False)
+        return self._read_page(entry, page_size)
+
+    def fetch(self, token: str, page_size: Optional[int] = None) -> Page:
+        """Read the next page of an open cursor."""
+        with self._lock:
+            entry = self._open.get(token)
+        if entry is None:
+            raise CursorNotFoundError(
+                "Continuation token is unknown, exhausted or expired; run the query again"
+            )
+        return self._read_page(entry, page_size or entry.page_size)
+
+    def close(self, token: str) -> bool:
+        """Close an open cursor before it is exhausted. Returns False if the token is unknown."""
+        with self._lock:
+            entry = self._open.pop(token, None)
+            if entry is not None:
+                self.counters["closed"] += 1
+        if entry is None:
+            return False
+        with entry.lock:
+            self._close_entry(entry, exhausted=False)
+        return True
+
+    def reap(self) -> int:
+        """Close cursors idle for longer than idle_timeout."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [e for e in self._open.values() if now - e.last_used > self.idle_timeout and not e.lock.locked()]
+            for entry in idle:
+                del self._open[entry.token]
+                self.counters["reaped"] += 1
+        for entry in idle:
+            logger.info(f"[{self.name}] Reaping idle cursor {entry.token}")
+            with entry.lock:
+                self._close_entry(entry, exhausted=False)
+        return len(idle)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "open_cursors": len(self._open),
+                "idle_timeout": self.idle_timeout,
+                "max_open": self.max_open,
+                "max_per_group": self.max_per_group,
+                **self.counters,
+            }
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    def _evict_locked(self, group=None) -> list:
+        """Unregister the least recently used cursors over max_open (or, for a group, over max_per_group)."""
+        if group is None:
+            candidates, limit = self._open.values(), self.max_open
+        elif self.max_per_group is not None:
+            candidates, limit = [e for e in self._open.values() if e.group == group], self.max_per_group
+        else:
+            return []
+        evicted = sorted(candidates, key=lambda e: e.last_used)[:max(0, len(candidates) - limit + 1)]
+        for entry in evicted:
+            del self._open[entry.token]
+            self.counters["evicted"] += 1
+        return evicted
+
+    def _read_page(self, entry: _OpenCursor, page_size: int) -> Page:
+        with entry.lock:
+            if entry.closed:
+                raise CursorNotFoundError("Continuation token was closed; run the query again")
+            try:
+                # Read one extra row so has_more is exact and exhausted cursors close right away
+                wanted = page_size + 1 - len(entry.lookahead)
+                fetched = entry.cursor.fetchmany(wanted) if wanted > 0 else []
+                if not entry.columns and entry.cursor.description:
+                    entry.columns = [desc[0] for desc in entry.cursor.description]
+            except Exception:
+                self._forget(entry)
+                self._close_entry(entry, exhausted=False)
+                raise
+
+            page = self._take_page(entry, fetched, page_size)
+            if not page.has_more:
+                self._close_entry(entry, exhausted=True)
+            return page
+
+    def _take_page(self, entry: _OpenCursor, fetched, page_size: int) -> Page:
+        """Merge freshly fetched rows with the lookahead and cut one page."""
+        rows = entry.lookahead + list(fetched)
+        entry.lookahead = rows[page_size:]
+        rows = rows[:page_size]
+        entry.rows_fetched += len(rows)
+        entry.last_used = time.monotonic()
+        has_more = bool(entry.lookahead)
+
+        with self._lock:
+            self.counters["pages"] += 1
+        if not has_more:
+            self._forget(entry)
+            with self._lock:
+                self.counters["exhausted"] += 1
+        return Page(entry.token, entry.columns, rows, has_more, entry.rows_fetched, entry.meta)
+
+    def _forget(self, entry: _OpenCursor):
+        with self._lock:
+            self._open.pop(entry.token, None)
+
+    def _close_entry(self, entry: _OpenCursor, exhausted: bool):
+        if entry.closed:
+            return
+        entry.closed = True
+        try:
+            entry.close(entry.cursor, exhausted)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Error while closing cursor {entry.token}: {e}")
+
+    def _ensure_reaper_locked(self):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap_forever, name=f"{self.name}-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap_forever(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            try:
+                self.reap()
+            except Exception as e:
+                logger.warning(f"[{self.name}] Cursor reaper error: {e}")
+
+
+class AsyncCursorRegistry(CursorRegistry):
+    """CursorRegistry for coroutine cursors: await fetchmany() and await close(cursor, exhausted)."""
+
+    async def make_room(self, group) -> int:
+        """Close the group's least recently used cursors until one more fits under max_per_group."""
+        with self._lock:
+            evicted = self._evict_locked(group)
+        for old in evicted:
+            logger.warning(f"[{self.name}] Too many open cursors on {group}, closing {old.token}")
+            async with old.lock:
+                await self._close_entry(old, exhausted=False)
+        return len(evicted)
+
+    async def open(self, cursor, close, page_size: int, group=None, **meta) -> Page:
+        """Register an executed cursor and read its first page."""
+        entry = _OpenCursor(secrets.token_urlsafe(16), cursor, close, page_size, meta, group)
+        entry.lock = asyncio.Lock()
+        with self._lock:
+            evicted = self._evict_locked()
+            self._open[entry.token] = entry
+            self.counters["opened"] += 1
+            self._ensure_reaper_locked()
+        for old in evicted:
+            logger.warning(f"[{self.name}] Too many open cursors, closing {old.token}")
+            async with old.lock:
+                await self._close_entry(old, exhausted=False)
+        return await self._read_page(entry, page_size)
+
+    async def fetch(self, token: str, page_size: Optional[int] = None) -> Page:
+        """Read the next page of an open cursor."""
+        with self._lock:
+            entry = self._open.get(token)
+        if entry is None:
+            raise CursorNotFoundError(
+                "Continuation token is unknown, exhausted or expired; run the query again"
+            )
+        return await self._read_page(entry, page_size or entry.page_size)
+
+    async def close(self, token: str) -> bool:
+        """Close an open cursor before it is exhausted. Returns False if the token is unknown."""
+        with self._lock:
+            entry = self._open.pop(token, None)
+            if entry is not None:
+                self.counters["closed"] += 1
+        if entry is None:
+            return False
+        async with entry.lock:
+            await self._close_entry(entry, exhausted=False)
+        return True
+
+    async def reap(self) -> int:
+        """Close cursors idle for longer than idle_timeout."""
+        now = time.monotonic()
+        with self._lock:
+            idle = [e for e in self._open.values() if now - e.last_used > self.idle_timeout and not e.lock.locked()]
+            for entry in idle:
+                del self._open[entry.token]
+                self.counters["reaped"] += 1
+        for entry in idle:
+            logger.info(f"[{self.name}] Reaping idle cursor {entry.token}")
+            async with entry.lock:
+                await self._close_entry(entry, exhausted=False)
+        return len(idle)
+
+    # ---------------------------
+    # Internals
+    # ---------------------------
+    async def _read_page(self, entry: _OpenCursor, page_size: int) -> Page:
+        async with entry.lock:
+            if entry.closed:
+                raise CursorNotFoundError("Continuation token was closed; run the query again")
+            try:
+                wanted = page_size + 1 - len(entry.lookahead)
+                fetched = await entry.cursor.fetchmany(wanted) if wanted > 0 else []
+                if not entry.columns and entry.cursor.description:
+                    entry.columns = [desc[0] for desc in entry.cursor.description]
+            except Exception:
+                self._forget(entry)
+                await self._close_entry(entry, exhausted=False)
+                raise
+
+            page = self._take_page(entry, fetched, page_size)
+            if not page.has_more:
+                await self._close_entry(entry, exhausted=True)
+            return page
+
+    async def _close_entry(self, entry: _OpenCursor, exhausted: bool):
+        if entry.closed:
+            return
+        entry.closed = True
+        try:
+            await entry.close(entry.cursor, exhausted)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Error while closing cursor {entry.token}: {e}")
+
+    def _ensure_reaper_locked(self):
+        if self._reaper is not None and not self._reaper.done():
+            return
+        self._reaper = asyncio.get_running_loop().create_task(self._reap_forever())
+
+    async def _reap_forever(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 60.0))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.warning(f"[{self.name}] Cursor reaper error: {e}")
@@ -0,0 +1,233 @@
+"""
+index_advisor.py
+
+Candidate indexes for the most expensive statements of a database.
+
+The slow-query tools read normalized statement text (pg_stat_statements.query with $1 placeholders,
+MySQL DIGEST_TEXT with ? placeholders) and hand it here with the schema from the schema extractor.
+For every statement the advisor finds the tables it reads and the columns it filters, joins, groups
+or sorts on, and proposes one composite index per table:
+    equality filters first, then join columns, then the first range column, or the GROUP BY /
+    ORDER BY columns when there is no range predicate (an index serves a sort only after the
+    equality prefix).
+A candidate is dropped when an existing index (or the primary key) already starts with the same
+columns. This is a heuristic on statement text, not a planner: candidates are meant to be checked
+with EXPLAIN before they are created.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Clause keywords that switch what the following column references mean
+_CLAUSE = re.compile(
+    r"\b(SELECT|FROM|JOIN|ON|USING|WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|OFFSET|FETCH|UNION|"
+    r"INTERSECT|EXCEPT|SET|VALUES|RETURNING|WINDOW|UPDATE|INTO|DELETE)\b",
+    re.I,
+)
+_TABLE_REFERENCE = re.compile(r"^\s*([\w$.]+)(?:\s+(?:AS\s+)?(?!(?:ON|USING|WHERE|JOIN|SET|LEFT|RIGHT|INNER|OUTER|FULL|CROSS|NATURAL|LATERAL|GROUP|ORDER|LIMIT|UNION)\b)(\w+))?", re.I)
+_COLUMN = r"((?:[A-Za-z_]\w*\.)?[A-Za-z_]\w*)"
+_OPERATOR = r"(=|<=>|<>|!=|<=|>=|<|>|\bNOT\s+IN\b|\bIN\b|\bBETWEEN\b|\bNOT\s+LIKE\b|\bLIKE\b|\bILIKE\b|\bIS\b)"
+_COMPARISON = re.compile(_COLUMN + r"\s*" + _OPERATOR, re.I)
+# Join condition between two qualified columns: a.col = b.col
+_JOIN_CONDITION = re.compile(r"([A-Za-z_]\w*\.[A-Za-z_]\w*)\s*=\s*([A-Za-z_]\w*\.[A-Za-z_]\w*)", re.I)
+_SORT_ITEM = re.compile(r"^\s*" + _COLUMN + r"\s*(?:ASC|DESC)?\s*(?:NULLS\s+(?:FIRST|LAST))?\s*$", re.I)
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_EQUALITY = {"=", "<=>", "IN", "IS"}
+_NOT_COLUMNS = {"AND", "OR", "NOT", "NULL", "TRUE", "FALSE", "CASE", "WHEN", "THEN", "ELSE", "END", "EXISTS",
+                "ANY", "ALL", "SOME", "INTERVAL", "CURRENT_DATE", "CURRENT_TIMESTAMP", "NOW"}
+
+MAX_INDEX_COLUMNS = 3
+
+
+def predicate_columns(sql: str, schema: dict) -> Dict[str, dict]:
+    """Columns a statement filters, joins, groups and sorts on, resolved against schema.
+
+    Returns {table_name: {"equality": [...], "join": [...], "range": [...], "sort": [...]}} with columns in the order
+    they appear; references that do not resolve to exactly one table of the schema are ignored.
+    """
+    text = _LITERAL.sub("?", sql.replace("`", "").replace('"', ""))
+    # MySQL digests space out qualified names: `db` . `table`
+    text = re.sub(r"\s*\.\s*", ".", text)
+    lookup = _TableLookup(schema)
+    aliases: Dict[str, str] = {}
+    segments = _segments(text)
+
+    for clause, body in segments:
+        if clause in ("FROM", "JOIN", "UPDATE", "INTO"):
+            for reference in body.split(",") if clause == "FROM" else [body]:
+                match = _TABLE_REFERENCE.match(reference)
+                table = lookup.table(match.group(1)) if match else None
+                if table is None:
+                    continue
+                aliases[table.lower()] = table
+                aliases[match.group(1).split(".")[-1].lower()] = table
+                if match.group(2):
+                    aliases[match.group(2).lower()] = table
+    tables = list(dict.fromkeys(aliases.values()))
+
+    found: Dict[str, dict] = {}
+
+    def add(reference: str, kind: str):
+        table, column = lookup.column(reference, aliases, tables)
+        if table is None:
+            return
+        columns = found.setdefault(table, {"equality": [], "join": [], "range": [], "sort": []})
+        if column not in columns[kind]:
+            columns[kind].append(column)
+
+    for clause, body in segments:
+        if clause in ("WHERE", "ON", "HAVING"):
+            for left, right in _JOIN_CONDITION.findall(body):
+                add(left, "join")
+                add(right, "join")
+            for reference, operator in _COMPARISON.findall(_JOIN_CONDITION.sub(" ", body)):
+                if reference.upper() in _NOT_COLUMNS:
+                    continue
+                add(reference, "equality" if " ".join(operator.upper().split()) in _EQUALITY else "range")
+        elif clause == "USING":
+            for reference in re.findall(r"\w+", body.split(")")[0]):
+                for table in tables:
+                    add(f"{table}.{reference}", "join")
+        elif clause in ("GROUP BY", "ORDER BY"):
+            for item in _top_level_split(body):
+                match = _SORT_ITEM.match(item)
+                if match:
+                    add(match.group(1), "sort")
+    return found
+
+
+def candidate_indexes(statements: Sequence[dict], schema: dict, engine: str) -> List[dict]:
+    """Missing indexes suggested by the predicates of statements, most expensive first.
+
+    statements are {"id", "query", "total_ms"} dicts; schema is the schema extractor's structure with
+    an "indexes" list per table. Candidates proposed by several statements are merged.
+    """
+    merged: Dict[Tuple[str, tuple], dict] = {}
+    for statement in statements:
+        for table, columns in predicate_columns(statement["query"], schema).items():
+            key_columns = _index_columns(columns, schema[table])
+            if not key_columns or _covered(key_columns, schema[table]):
+                continue
+            candidate = merged.get((table, key_columns))
+            if candidate is None:
+                candidate = merged[(table, key_columns)] = {
+                    "table": table,
+                    "columns": list(key_columns),
+                    "create_sql": create_index_sql(engine, table, key_columns),
+                    "statements": [],
+                    "total_ms": 0.0,
+                }
+                shared = _shared_prefix_indexes(key_columns, schema[table])
+                if shared:
+                    candidate["extends"] = shared
+            candidate["statements"].append(statement["id"])
+            candidate["total_ms"] = round(candidate["total_ms"] + (statement.get("total_ms") or 0), 3)
+    return sorted(merged.values(), key=lambda c: c["total_ms"], reverse=True)
+
+
+def create_index_sql(engine: str, table: str, columns: Sequence[str]) -> str:
+    """CREATE INDEX statement for a candidate, with a name derived from table and columns."""
+    name = "_".join(["idx", table, *columns])[:63]
+    if engine == "mysql":
+        quote = lambda identifier: "`" + identifier.replace("`", "``") + "`"
+    else:
+        quote = lambda identifier: '"' + identifier.replace('"', '""') + '"'
+    return f"CREATE INDEX {quote(name)} ON {quote(table)} ({', '.join(quote(col) for col in columns)});"
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+class _TableLookup:
+    """Case-insensitive lookup of tables and columns in a loaded schema."""
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+        self.tables = {name.lower(): name for name in schema}
+        self.columns = {
+            name: {col["name"].lower(): col["name"] for col in table["columns"]}
+            for name, table in schema.items()
+        }
+
+    def table(self, reference: str) -> Optional[str]:
+        return self.tables.get(reference.split(".")[-1].lower())
+
+    def column(self, reference: str, aliases: Dict[str, str], tables: List[str]) -> Tuple[Optional[str], Optional[str]]:
+        qualifier, _, name = reference.rpartition(".")
+        name = name.lower()
+        if qualifier:
+            table = aliases.get(qualifier.split(".")[-1].lower())
+            candidates = [table] if table else []
+        else:
+            candidates = tables
+        owners = [table for table in candidates if name in self.columns[table]]
+        if len(owners) != 1:
+            return None, None
+        return owners[0], self.columns[owners[0]][name]
+
+
+def _segments(text: str) -> List[Tuple[str, str]]:
+    """Split a statement into (clause keyword, text up to the next clause keyword)."""
+    matches = list(_CLAUSE.finditer(text))
+    segments = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        segments.append((" ".join(match.group(1).upper().split()), text[match.end():end]))
+    return segments
+
+
+def _top_level_split(text: str) -> List[str]:
+    """Split on commas outside parentheses."""
+    items, depth, current = [], 0, []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    items.append("".join(current))
+    return items
+
+
+def _index_columns(columns: dict, table: dict) -> tuple:
+    key = list(columns["equality"])
+    joins = tuple(col for col in columns["join"] if col not in key)
+    # Join columns that already lead an index (typically the primary key) only help after an equality prefix
+    if joins and (key or not _covered(joins, table)):
+        key.extend(joins)
+    ranges = [col for col in columns["range"] if col not in key]
+    if ranges:
+        key.append(ranges[0])
+    else:
+        key.extend(col for col in columns["sort"] if col not in key)
+    return tuple(key[:MAX_INDEX_COLUMNS])
+
+
+def _usable_columns(index: dict) -> List[str]:
+    # Expression parts (None) end the prefix a plain column lookup can use
+    columns = []
+    for col in index["columns"]:
+        if col is None:
+            break
+        columns.append(col.lower())
+    return columns
+
+
+def _covered(key_columns: tuple, table: dict) -> bool:
+    wanted = [col.lower() for col in key_columns]
+    for index in table["indexes"]:
+        if index.get("predicate"):
+            continue
+        if _usable_columns(index)[:len(wanted)] == wanted:
+            return True
+    return False
+
+
+def _shared_prefix_indexes(key_columns: tuple, table: dict) -> List[str]:
+    """Existing indexes on the candidate's leading column, which the candidate may replace."""
+    return [index["name"] for index in table["indexes"]
+            if _usable_columns(index)[:1] == [key_columns[0].lower()]]
@@ -0,0 +1,275 @@
+"""
+instrumentation.py
+
+Per-tool latency and payload instrumentation.
+
+Every tool call decorated with Instrumentation.tool() is one invocation. The code it runs marks
+where the time goes with phase():
+  connect    opening a new database connection (pool miss or reconnect)
+  acquire    borrowing a pooled connection (waiting, health check, switching databases)
+  execute    statements on the server (SET, EXPLAIN, PREPARE/EXECUTE, COMMIT)
+  fetch      reading result rows from the driver
+  serialize  encoding the response (encode_rows / json.dumps)
+Phases nest and only count their own time (connect inside acquire is not counted twice), so the
+phases of a call add up to at most its total; the rest is reported as "other" (validation, caches,
+thread hand-off). The invocation travels in a ContextVar, which worker threads started through anyio
+inherit, so phase() works in sync and async code alike and is a no-op outside a tool call.
+
+Each tool keeps rolling histograms over its last `window` calls (latency, every phase, rows and
+response bytes) for the server_stats tools; with trace_file set, every call is also appended to
+that file as one JSON line. When the MCP request carries a W3C traceparent in its _meta (the
+tracing client sends one per tool call), the call becomes a server span of that trace: the line
+gets trace_id, span_id and parent_span_id so the client's waterfall can line it up with its own
+tool-call span.
+"""
+
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from loguru import logger
+from mcp.server.lowlevel.server import request_ctx
+
+PHASES = ("connect", "acquire", "execute", "fetch", "serialize")
+
+# Upper bounds (ms) of the latency buckets reported next to the percentiles
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Tool responses put "status" first; compact formats have no space after the colon
+_ERROR_RESPONSE = re.compile(r'\s*\{\s*"status":\s*"error"')
+
+# W3C trace context: version-trace_id-parent_id-flags
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+class Invocation:
+    """Timings and payload of one tool call."""
+
+    __slots__ = ("tool", "started", "phases", "rows", "response_bytes", "status", "attributes", "_nested")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.rows = 0
+        self.response_bytes = 0
+        self.status = "success"
+        self.attributes = {}
+        self._nested = []  # time of inner phases, one slot per open phase
+
+
+_current = contextvars.ContextVar("mcp_invocation", default=None)
+
+
+def current_invocation() -> Optional[Invocation]:
+    return _current.get()
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the time spent in the block to a phase of the current tool call."""
+    invocation = _current.get()
+    if invocation is None:
+        yield
+        return
+    invocation._nested.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = invocation._nested.pop()
+        invocation.phases[name] = invocation.phases.get(name, 0.0) + elapsed - nested
+        if invocation._nested:
+            invocation._nested[-1] += elapsed
+
+
+def add_rows(count: int):
+    """Count result rows returned (or written) by the current tool call."""
+    invocation = _current.get()
+    if invocation is not None and count:
+        invocation.rows += count
+
+
+class RollingHistogram:
+    """Percentiles (and optional bucket counts) over the last `window` samples."""
+
+    def __init__(self, window: int, buckets: Optional[tuple] = None):
+        self._samples = deque(maxlen=window)
+        self._buckets = buckets
+
+    def add(self, value: float):
+        self._samples.append(value)
+
+    def summary(self) -> dict:
+        samples = sorted(self._samples)
+        if not samples:
+            return {"count": 0}
+        summary = {
+            "count": len(samples),
+            "mean": round(sum(samples) / len(samples), 3),
+            "p50": round(_percentile(samples, 0.50), 3),
+            "p95": round(_percentile(samples, 0.95), 3),
+            "p99": round(_percentile(samples, 0.99), 3),
+            "max": round(samples[-1], 3),
+        }
+        if self._buckets:
+            counts, i = {}, 0
+            for bound in self._buckets:
+                start = i
+                while i < len(samples) and samples[i] <= bound:
+                    i += 1
+                counts[f"<={bound}"] = i - start
+            counts[f">{self._buckets[-1]}"] = len(samples) - i
+            summary["buckets"] = counts
+        return summary
+
+
+def _percentile(samples: list, q: float) -> float:
+    # Nearest-rank on sorted samples
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency", "phases", "rows", "response_bytes")
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.latency = RollingHistogram(window, LATENCY_BUCKETS_MS)
+        self.phases = {name: RollingHistogram(window) for name in PHASES + ("other",)}
+        self.rows = RollingHistogram(window)
+        self.response_bytes = RollingHistogram(window)
+
+
+class Instrumentation:
+    """Rolling per-tool statistics of one server, plus an optional JSONL trace file."""
+
+    def __init__(self, engine: str, *, window: int = 1000, trace_file: Optional[str] = None):
+        self.engine = engine
+        self.window = max(1, window)
+        self.trace_file = trace_file or None
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._trace = None
+
+    def tool(self, name: str):
+        """Decorator for async tool functions: every call becomes an invocation of `name`.
+
+        A tool called from inside another tool call (e.g. list_databases on an error path) is part of
+        the outer invocation.
+        """
+        def decorate(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if _current.get() is not None:
+                    return await func(*args, **kwargs)
+                invocation = Invocation(name)
+                try:
+                    database_name = signature.bind_partial(*args, **kwargs).arguments.get("database_name")
+                except TypeError:
+                    database_name = None
+                if database_name is not None:
+                    invocation.attributes["database"] = database_name
+                invocation.attributes.update(_incoming_trace_context())
+                token = _current.set(invocation)
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException as e:
+                    invocation.status = "cancelled" if _is_cancellation(e) else "exception"
+                    raise
+                else:
+                    if isinstance(result, str):
+                        invocation.response_bytes = len(result.encode("utf-8"))
+                        if _ERROR_RESPONSE.match(result):
+                            invocation.status = "error"
+                    return result
+                finally:
+                    _current.reset(token)
+                    self.record(invocation)
+            return wrapper
+        return decorate
+
+    def record(self, invocation: Invocation):
+        """Add a finished invocation to the histograms and the trace file."""
+        total_ms = (time.perf_counter() - invocation.started) * 1000
+        phases_ms = {name: round(seconds * 1000, 3) for name, seconds in invocation.phases.items()}
+        other_ms = max(0.0, total_ms - sum(phases_ms.values()))
+        with self._lock:
+            stats = self._tools.get(invocation.tool)
+            if stats is None:
+                stats = self._tools[invocation.tool] = _ToolStats(self.window)
+            stats.calls += 1
+            if invocation.status != "success":
+                stats.errors += 1
+            stats.latency.add(total_ms)
+            for name, histogram in stats.phases.items():
+                histogram.add(other_ms if name == "other" else phases_ms.get(name, 0.0))
+            stats.rows.add(invocation.rows)
+            stats.response_bytes.add(invocation.response_bytes)
+        if self.trace_file:
+            self._write_trace({
+                "ts": time.time(),
+                "engine": self.engine,
+                "tool": invocation.tool,
+                "status": invocation.status,
+                **invocation.attributes,
+                "total_ms": round(total_ms, 3),
+                "phases_ms": phases_ms,
+                "other_ms": round(other_ms, 3),
+                "rows": invocation.rows,
+                "response_bytes": invocation.response_bytes,
+            })
+
+    def stats(self) -> dict:
+        with self._lock:
+            tools = {
+                name: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "latency_ms": stats.latency.summary(),
+                    "phases_ms": {phase_name: histogram.summary() for phase_name, histogram in stats.phases.items()},
+                    "rows": stats.rows.summary(),
+                    "response_bytes": stats.response_bytes.summary(),
+                }
+                for name, stats in self._tools.items()
+            }
+        return {"engine": self.engine, "window": self.window, "trace_file": self.trace_file, "tools": tools}
+
+    def _write_trace(self, record: dict):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            try:
+                if self._trace is None:
+                    self._trace = open(self.trace_file, "a", encoding="utf-8", buffering=1)
+                self._trace.write(line)
+            except OSError as e:
+                logger.warning(f"Could not write trace file {self.trace_file}: {e}; tracing disabled")
+                self.trace_file = None
+
+
+def _incoming_trace_context() -> dict:
+    """Span ids for the current MCP request when its _meta carries a traceparent, else {}."""
+    context = request_ctx.get(None)
+    meta = context.meta if context is not None else None
+    traceparent = (meta.model_extra or {}).get("traceparent") if meta is not None else None
+    match = _TRACEPARENT.match(traceparent) if isinstance(traceparent, str) else None
+    if match is None or match.group(1) == "0" * 32:
+        return {}
+    return {"trace_id": match.group(1), "span_id": os.urandom(8).hex(), "parent_span_id": match.group(2)}
+
+
+def _is_cancellation(e: BaseException) -> bool:
+    # asyncio.CancelledError (and trio's Cancelled under anyio) derive from BaseException only
+    return not isinstance(e, Exception)
@@ -0,0 +1,299 @@
+import anyio
+import anyio.to_thread
+import asyncio
+import datetime
+import decimal
+import json
+import os
+import re
+import sqlite3
+import time
+from contextlib import aclosing
+from typing import Dict, List, Optional
+from loguru import logger
+from mcp.server.fastmcp import FastMCP
+
+import mysql_server
+import postgres_server
+from result_encoding import dumps, encode_rows, validate_format
+
+mcp = FastMCP("Multi_Database_Server")
+
+# Upper bound on sub-queries in flight at once (a call may ask for fewer)
+MAX_CONCURRENCY = int(os.getenv("MULTI_DB_MAX_CONCURRENCY", "8"))
+MAX_QUERIES = int(os.getenv("MULTI_DB_MAX_QUERIES", "100"))
+
+# Federated queries: rows per page moved from the engines, rows allowed per source and in the answer
+FEDERATED_PAGE_SIZE = int(os.getenv("MULTI_DB_FEDERATED_PAGE_SIZE", "5000"))
+FEDERATED_MAX_SOURCE_ROWS = int(os.getenv("MULTI_DB_FEDERATED_MAX_SOURCE_ROWS", "1000000"))
+FEDERATED_MAX_RESULT_ROWS = int(os.getenv("MULTI_DB_FEDERATED_MAX_RESULT_ROWS", "10000"))
+
+ENGINES = {
+    "mysql": "mysql",
+    "postgres": "postgres",
+    "postgresql": "postgres",
+}
+
+
+# ---------------------------
+# Per-engine execution
+# ---------------------------
+async def execute_query(engine: str, sql_query: str, database_name: str, result_format: str = "json",
+                        params: Optional[list] = None, timeout: Optional[float] = None) -> dict:
+    """Run one query through the engine's own executor and return its response as a dict.
+
+    Postgres work is offloaded to the postgres server's worker threads; MySQL is natively async.
+    """
+    engine = ENGINES.get((engine or "").strip().lower())
+    if engine == "postgres":
+        response = await postgres_server.run_cancellable(postgres_server.query_data, sql_query, database_name, None, result_format, params, timeout)
+    elif engine == "mysql":
+        response = await mysql_server.query_data(sql_query, database_name, None, result_format, params, timeout)
+    else:
+        return {
+            "status": "error",
+            "error": f"Unknown engine. Use one of: {', '.join(sorted(ENGINES))}",
+            "query": sql_query
+        }
+    return json.loads(response)
+
+
+def _validate_queries(queries: List[dict]) -> str:
+    """Return an error message for a malformed query list, or an empty string."""
+    if not queries:
+        return "No queries given. Pass a list of {\"engine\", \"database\", \"sql_query\"} objects."
+    if len(queries) > MAX_QUERIES:
+        return f"Too many queries ({len(queries)}); at most {MAX_QUERIES} per call"
+    for i, query in enumerate(queries):
+        if not isinstance(query, dict):
+            return f"Query {i} must be an object with engine, database and sql_query"
+        missing = [key for key in ("engine", "database", "sql_query") if not query.get(key)]
+        if missing:
+            return f"Query {i} is missing: {', '.join(missing)}"
+    return ""
+
+
+#Fan-out tool
+@mcp.tool(name="multi_database_query", description="Run several SQL queries in parallel across MySQL and PostgreSQL databases (e.g. the same metric on every tenant database) and return every result with its timing. queries is a list of objects with 'engine' ('mysql' or 'postgres'), 'database' and 'sql_query', plus optional 'params' for %s placeholders and 'timeout' in seconds.")
+async def multi_database_query(queries: List[dict], max_concurrency: int = MAX_CONCURRENCY, result_format: str = "json") -> str:
+    """Execute (engine, database, SQL) triples concurrently under a bounded concurrency limit.
+
+    Results keep the order of the input; a failing query does not affect the others.
+    result_format applies to every sub-result: "json" (default), "columnar", "csv" or "tsv".
+    """
+    logger.info(f"Received {len(queries or [])} fan-out queries")
+
+    try:
+        result_format = validate_format(result_format)
+    except ValueError as e:
+        return json.dumps({"status": "error", "error": str(e)}, indent=2)
+
+    error = _validate_queries(queries)
+    if error:
+        return json.dumps({"status": "error", "error": error}, indent=2)
+
+    limit = max(1, min(max_concurrency or MAX_CONCURRENCY, MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(index: int, query: dict) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                result = await execute_query(query["engine"], query["sql_query"], query["database"], result_format, query.get("params"), query.get("timeout"))
+            except Exception as e:
+                result = {"status": "error", "database": query["database"], "error": str(e), "query": query["sql_query"]}
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        return {"index": index, "engine": query["engine"], "elapsed_ms": elapsed_ms, **result}
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(run(i, query) for i, query in enumerate(queries)))
+    wall_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    succeeded = sum(1 for result in results if result.get("status") == "success")
+    return dumps({
+        "status": "success" if succeeded else "error",
+        "total_queries": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "max_concurrency": limit,
+        "elapsed_ms": wall_ms,
+        "sum_query_ms": round(sum(result["elapsed_ms"] for result in results), 2),
+        "results": results
+    }, result_format)
+
+
+# ---------------------------
+# Federated queries (in-memory SQLite)
+# ---------------------------
+_TABLE_NAME = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+async def stream_query(engine: str, sql_query: str, database_name: str, page_size: int = FEDERATED_PAGE_SIZE):
+    """Async generator of (colnames, rows) pages from either engine."""
+    engine = ENGINES.get((engine or "").strip().lower())
+    if engine == "mysql":
+        async with aclosing(mysql_server.stream_query(sql_query, database_name, page_size)) as pages:
+            async for page in pages:
+                yield page
+    elif engine == "postgres":
+        pages = postgres_server.stream_query(sql_query, database_name, page_size)
+        try:
+            while True:
+                page = await postgres_server.run_blocking(next, pages, None)
+                if page is None:
+                    break
+                yield page
+        finally:
+            await postgres_server.run_blocking(pages.close)
+    else:
+        raise ValueError(f"Unknown engine. Use one of: {', '.join(sorted(ENGINES))}")
+
+
+def _sqlite_value(value):
+    """Map driver values onto the types sqlite3 stores natively."""
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+async def _load_source(db: sqlite3.Connection, source: Dict[str, str]) -> dict:
+    """Stream one sub-query into its SQLite table page by page."""
+    started = time.perf_counter()
+    table = source["table"]
+    insert = None
+    rows_loaded = 0
+    async with aclosing(stream_query(source["engine"], source["sql_query"], source["database"])) as pages:
+        async for colnames, rows in pages:
+            if insert is None:
+                db.execute(f"CREATE TABLE {_quote(table)} ({', '.join(_quote(c) for c in _dedupe(colnames))})")
+                insert = f"INSERT INTO {_quote(table)} VALUES ({', '.join('?' for _ in colnames)})"
+            rows_loaded += len(rows)
+            if rows_loaded > FEDERATED_MAX_SOURCE_ROWS:
+                raise ValueError(
+                    f"Source '{table}' returned more than {FEDERATED_MAX_SOURCE_ROWS} rows; filter or aggregate it first"
+                )
+            db.executemany(insert, [tuple(_sqlite_value(v) for v in row) for row in rows])
+    return {
+        "table": table,
+        "engine": source["engine"],
+        "database": source["database"],
+        "rows_loaded": rows_loaded,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def _dedupe(colnames: List[str]) -> List[str]:
+    """SQLite needs distinct column names: repeated ones get a _2, _3 ... suffix."""
+    seen = {}
+    result = []
+    for name in colnames:
+        key = name.lower()
+        seen[key] = seen.get(key, 0) + 1
+        result.append(name if seen[key] == 1 else f"{name}_{seen[key]}")
+    return result
+
+
+def _validate_sources(sources: List[Dict[str, str]]) -> str:
+    """Return an error message for a malformed source list, or an empty string."""
+    if not sources:
+        return "No sources given. Pass a list of {\"engine\", \"database\", \"sql_query\", \"table\"} objects."
+    tables = set()
+    for i, source in enumerate(sources):
+        if not isinstance(source, dict):
+            return f"Source {i} must be an object with engine, database, sql_query and table"
+        missing = [key for key in ("engine", "database", "sql_query", "table") if not source.get(key)]
+        if missing:
+            return f"Source {i} is missing: {', '.join(missing)}"
+        if not _TABLE_NAME.match(source["table"]):
+            return f"Source {i}: table must be a plain identifier (letters, digits, underscore)"
+        if source["table"].lower() in tables:
+            return f"Source {i}: table name '{source['table']}' is used twice"
+        tables.add(source["table"].lower())
+    return ""
+
+
+# join_sql must stay inside the in-memory database: ATTACH (also used by VACUUM INTO) and DETACH would
+# reach files on the server host, PRAGMA could reconfigure the connection
+_DENIED_ACTIONS = {sqlite3.SQLITE_ATTACH, sqlite3.SQLITE_DETACH, sqlite3.SQLITE_PRAGMA}
+
+
+def _authorize(action: int, *args) -> int:
+    return sqlite3.SQLITE_DENY if action in _DENIED_ACTIONS else sqlite3.SQLITE_OK
+
+
+def _run_join(db: sqlite3.Connection, join_sql: str):
+    db.set_authorizer(_authorize)
+    # execute() runs exactly one statement; anything after a ';' is rejected
+    cursor = db.execute(join_sql)
+    colnames = [desc[0] for desc in cursor.description] if cursor.description else []
+    rows = cursor.fetchmany(FEDERATED_MAX_RESULT_ROWS + 1)
+    return colnames, rows
+
+
+#Federated query tool
+@mcp.tool(name="federated_query", description="Join or aggregate data that lives in different databases/engines (e.g. a MySQL table with a PostgreSQL table) without pulling both result sets into the conversation. sources is a list of objects with 'engine' ('mysql' or 'postgres'), 'database', 'sql_query' and 'table'; each sub-query result is loaded into an in-memory SQLite table of that name, then join_sql (SQLite dialect) runs over those tables and only its result is returned.")
+async def federated_query(sources: List[Dict[str, str]], join_sql: str, result_format: str = "json") -> str:
+    """Run one sub-query per source in parallel, stream the rows into in-memory SQLite and run join_sql there."""
+    logger.info(f"Received federated query over {len(sources or [])} sources: {join_sql}")
+
+    try:
+        result_format = validate_format(result_format)
+    except ValueError as e:
+        return json.dumps({"status": "error", "error": str(e)}, indent=2)
+
+    error = _validate_sources(sources)
+    if error:
+        return json.dumps({"status": "error", "error": error}, indent=2)
+
+    started = time.perf_counter()
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    try:
+        # Let every load finish before the SQLite connection can be closed
+        loaded = await asyncio.gather(*(_load_source(db, source) for source in sources), return_exceptions=True)
+        failures = [(source["table"], result) for source, result in zip(sources, loaded) if isinstance(result, Exception)]
+        if failures:
+            return json.dumps({
+                "status": "error",
+                "error": "; ".join(f"Loading source '{table}' failed: {e}" for table, e in failures),
+                "join_sql": join_sql
+            }, indent=2)
+
+        try:
+            colnames, rows = await anyio.to_thread.run_sync(_run_join, db, join_sql)
+        except sqlite3.Error as e:
+            return json.dumps({
+                "status": "error",
+                "error": f"join_sql failed: {e}",
+                "sources": loaded,
+                "join_sql": join_sql
+            }, indent=2)
+
+        truncated = len(rows) > FEDERATED_MAX_RESULT_ROWS
+        rows = rows[:FEDERATED_MAX_RESULT_ROWS]
+        return dumps({
+            "status": "success",
+            "sources": loaded,
+            **encode_rows(colnames, rows, result_format),
+            "join_sql": join_sql,
+            "row_count": len(rows),
+            "truncated": truncated,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }, result_format)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    mcp.run(transport="stdio")
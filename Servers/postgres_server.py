@@ -1,141 +1,739 @@
+import anyio
+import anyio.from_thread
+import anyio.to_thread
+import contextvars
+import io
 import psycopg2
+import psycopg2.errors
+import psycopg2.extensions
+import psycopg2.sql
 import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
 from loguru import logger
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+
+from bulk_load import chunks, open_rows, quoted_csv, text_literal
+from catalog_cache import DatabaseCatalog
+from cost_guard import CostGuard, QueryRejected, postgres_plan_estimate
+from connection_pool import ConnectionPool
+from cursor_registry import CursorNotFoundError, CursorRegistry
+from index_advisor import candidate_indexes
+from instrumentation import Instrumentation, add_rows, phase
+from prepared_statements import PreparedStatementCache, statement_key
+from query_cache import QueryResultCache
+from replica_routing import ReplicaRouter
+from result_encoding import dumps, encode_rows, validate_format
+from schema_cache import DEFAULT_CACHE_DIR, SchemaCache
+from schema_report import render_schema
+from sql_utils import (classify, database_ddl, folded_name_parts, is_cacheable_read, is_ddl, is_plain_read, is_preparable,
+                       is_replica_safe, may_write, normalize_sql, numbered_placeholders, referenced_tables, with_row_limit,
+                       written_tables)
 
 mcp = FastMCP("Postgres_Server")
 
+# Connection settings (override through environment variables)
+DB_USER = os.getenv("POSTGRES_USER", "postgres")
+DB_PASS = os.getenv("POSTGRES_PASSWORD", "pass123")
+DB_HOST = os.getenv("POSTGRES_HOST", "localhost")
+DB_PORT = os.getenv("POSTGRES_PORT", "5432")
+MAINTENANCE_DB = "postgres"  # Default database used for catalog lookups
+
+# Primary and read replicas as libpq DSNs or URIs (replicas comma-separated); settings a DSN leaves out
+# (user, password, port) come from the variables above. Replica-safe reads go to the replicas in turn.
+PRIMARY_DSN = os.getenv("POSTGRES_PRIMARY_DSN", "")
+REPLICA_DSNS = [dsn.strip() for dsn in os.getenv("POSTGRES_REPLICA_DSNS", "").split(",") if dsn.strip()]
+# Seconds of replication lag above which reads fall back to the primary (0: lag is not checked),
+# how often lag is measured (and failed replicas retried), and how long reads of a database stay on
+# the primary after a write to it
+REPLICA_MAX_LAG = float(os.getenv("POSTGRES_REPLICA_MAX_LAG", "0"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("POSTGRES_REPLICA_CHECK_INTERVAL", "5"))
+REPLICA_READ_AFTER_WRITE = float(os.getenv("POSTGRES_REPLICA_READ_AFTER_WRITE", "5"))
+
+# Pool settings, one pool per database
+POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
+POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "5"))
+POOL_IDLE_TIMEOUT = float(os.getenv("POSTGRES_POOL_IDLE_TIMEOUT", "300"))
+POOL_MAX_LIFETIME = float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", "3600"))
+POOL_HEALTH_CHECK_INTERVAL = float(os.getenv("POSTGRES_POOL_HEALTH_CHECK_INTERVAL", "30"))
+
+# Seconds the list of database names is trusted before it is reloaded
+CATALOG_TTL = float(os.getenv("POSTGRES_CATALOG_TTL", "60"))
+
+# Paged results: server-side cursors left unread this long are closed
+CURSOR_IDLE_TIMEOUT = float(os.getenv("POSTGRES_CURSOR_IDLE_TIMEOUT", "300"))
+MAX_OPEN_CURSORS = int(os.getenv("POSTGRES_MAX_OPEN_CURSORS", "20"))
+MAX_PAGE_SIZE = int(os.getenv("POSTGRES_MAX_PAGE_SIZE", "10000"))
+
+# Tool calls served concurrently (each one occupies a worker thread while psycopg2 blocks)
+MAX_CONCURRENCY = int(os.getenv("POSTGRES_MAX_CONCURRENCY", "16"))
+
+# Seconds a statement may run (0: no limit) and the most a single call may ask for
+STATEMENT_TIMEOUT = float(os.getenv("POSTGRES_STATEMENT_TIMEOUT", "60"))
+MAX_STATEMENT_TIMEOUT = float(os.getenv("POSTGRES_MAX_STATEMENT_TIMEOUT", "600"))
+
+# Read-query result cache (TTL 0 disables it)
+QUERY_CACHE_TTL = float(os.getenv("POSTGRES_QUERY_CACHE_TTL", "60"))
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("POSTGRES_QUERY_CACHE_MAX_ENTRIES", "256"))
+QUERY_CACHE_MAX_BYTES = int(os.getenv("POSTGRES_QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Parameterized queries: prepared statements kept per connection (0 disables), uses before preparing
+PREPARED_STATEMENTS = int(os.getenv("POSTGRES_PREPARED_STATEMENTS", "100"))
+PREPARE_THRESHOLD = int(os.getenv("POSTGRES_PREPARE_THRESHOLD", "2"))
+
+# Pre-flight EXPLAIN of SELECTs: "off", "reject" (refuse expensive queries) or "limit" (cap large results)
+COST_GUARD_MODE = os.getenv("POSTGRES_COST_GUARD", "off")
+COST_GUARD_MAX_ROWS = float(os.getenv("POSTGRES_COST_GUARD_MAX_ROWS", "100000"))
+COST_GUARD_MAX_COST = float(os.getenv("POSTGRES_COST_GUARD_MAX_COST", "1000000"))
+COST_GUARD_ROW_CAP = int(os.getenv("POSTGRES_COST_GUARD_ROW_CAP", "1000"))
+
+# Bulk loads are sent to COPY in chunks of this many rows
+BULK_CHUNK_SIZE = int(os.getenv("POSTGRES_BULK_CHUNK_SIZE", "10000"))
+
+# Statements accepted by one batch call
+BATCH_MAX_STATEMENTS = int(os.getenv("POSTGRES_BATCH_MAX_STATEMENTS", "500"))
+
+# Most common values the table stats tool reports per column
+TABLE_STATS_MOST_COMMON = int(os.getenv("POSTGRES_TABLE_STATS_MOST_COMMON", "5"))
+
+# Extracted schemas are kept on disk here (empty string: memory only)
+SCHEMA_CACHE_DIR = os.getenv("SCHEMA_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+# Per-tool timings: calls kept in the rolling histograms, JSONL file every call is appended to (empty: off)
+STATS_WINDOW = int(os.getenv("MCP_STATS_WINDOW", "1000"))
+TRACE_FILE = os.getenv("MCP_TRACE_FILE", "")
+
+
+# ---------------------------
+# Async execution
+# ---------------------------
+# psycopg2 releases the GIL while it waits on the server, so blocking calls run in worker
+# threads and the event loop keeps accepting other tool calls in the meantime.
+_limiter = anyio.CapacityLimiter(MAX_CONCURRENCY)
+
+
+async def run_blocking(func, *args):
+    """Run a blocking psycopg2 code path in a worker thread."""
+    return await anyio.to_thread.run_sync(func, *args, limiter=_limiter)
+
+
+# ---------------------------
+# Instrumentation
+# ---------------------------
+# Every tool call is timed by phase (connect, acquire, execute, fetch, serialize); the worker
+# threads inherit the call's context, so the sync code paths below record into it directly.
+instrumentation = Instrumentation("postgres", window=STATS_WINDOW, trace_file=TRACE_FILE)
+
+
+# ---------------------------
+# Statement timeouts and cancellation
+# ---------------------------
+# The default timeout is set on every pooled connection at connect time; a call asking for another
+# one sends SET LOCAL, which ends with the transaction.
+statement_counters = {"timeouts": 0, "cancellations": 0}
+_counters_lock = threading.Lock()
+
+
+class _Call:
+    """The connection a tool call is running statements on, so cancelling the call can stop them."""
+
+    __slots__ = ("conn", "cancelled")
+
+    def __init__(self):
+        self.conn = None
+        self.cancelled = False
+
+
+_current_call = contextvars.ContextVar("postgres_call", default=None)
+
+
+async def run_cancellable(func, *args):
+    """Like run_blocking, but cancelling the tool call cancels the running statement on the server.
+
+    The worker thread is abandoned on cancellation; it sees the statement fail, rolls back and
+    returns its connection to the pool as usual.
+    """
+    call = _Call()
+    token = _current_call.set(call)  # copied into the worker thread's context
+    try:
+        return await anyio.to_thread.run_sync(func, *args, limiter=_limiter, abandon_on_cancel=True)
+    except anyio.get_cancelled_exc_class():
+        call.cancelled = True
+        conn = call.conn
+        if conn is not None and not conn.closed:
+            _count("cancellations")
+            logger.info("Tool call cancelled; cancelling its running statement")
+            with anyio.CancelScope(shield=True):
+                # Out-of-band cancel request (what pg_cancel_backend does), safe from another thread
+                await anyio.to_thread.run_sync(conn.cancel)
+        raise
+    finally:
+        _current_call.reset(token)
+
+
+def _bind_call(conn):
+    """Record the connection the current tool call is about to run statements on."""
+    call = _current_call.get()
+    if call is not None:
+        call.conn = conn
+        if call.cancelled:
+            raise psycopg2.errors.QueryCanceled("canceling statement due to user request")
+
+
+def _count(counter: str):
+    with _counters_lock:
+        statement_counters[counter] += 1
+
+
+def _statement_timeout(timeout: Optional[float]) -> float:
+    """Seconds allowed for a call: the default, or the requested timeout capped at the maximum."""
+    if timeout is None or timeout <= 0:
+        return STATEMENT_TIMEOUT
+    return min(timeout, MAX_STATEMENT_TIMEOUT) if MAX_STATEMENT_TIMEOUT > 0 else timeout
+
+
+def _set_timeout(cursor, timeout: float):
+    """Override the connection's default statement_timeout for the current transaction."""
+    if timeout != STATEMENT_TIMEOUT:
+        cursor.execute("SET LOCAL statement_timeout = %s", (int(timeout * 1000),))
+
+
+def _cancel_error(e: "psycopg2.errors.QueryCanceled", timeout: float) -> dict:
+    """Count a cancelled statement and describe it for the agent."""
+    if "statement timeout" in str(e):
+        _count("timeouts")
+        return {
+            "timed_out": True,
+            "error": f"Statement cancelled after the {timeout:g}s statement timeout",
+            "hint": "Narrow the query (filters, LIMIT, aggregation) or pass a larger timeout"
+        }
+    return {"cancelled": True, "error": "Statement cancelled"}
+
+
+# ---------------------------
+# Connection pools (keyed by server and database)
+# ---------------------------
+def _connection_params(dsn: str) -> dict:
+    """Connection keywords of a server: the DSN's settings over the POSTGRES_* defaults."""
+    params = {"user": DB_USER, "password": DB_PASS, "host": DB_HOST, "port": DB_PORT}
+    if dsn:
+        params.update(psycopg2.extensions.parse_dsn(dsn))
+    params.pop("dbname", None)
+    return params
+
+
+PRIMARY = _connection_params(PRIMARY_DSN)
+REPLICAS = {f"{params['host']}:{params['port']}": params for params in map(_connection_params, REPLICA_DSNS)}
+
+replicas = ReplicaRouter(
+    "postgres",
+    list(REPLICAS),
+    max_lag=REPLICA_MAX_LAG,
+    check_interval=REPLICA_CHECK_INTERVAL,
+    read_after_write=REPLICA_READ_AFTER_WRITE
+)
+
+# Seconds the replica is behind; 0 once it has replayed everything it received (an idle primary
+# would otherwise look like growing lag), NULL when unknown
+_REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+"""
+
+
+def _pg_health_check(conn) -> bool:
+    """A warm connection is healthy if it is open and answers SELECT 1."""
+    if conn.closed:
+        return False
+    # Autocommit keeps the check to a single round trip (no BEGIN/ROLLBACK)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    finally:
+        conn.autocommit = False
+    return True
+
+
+def _pg_reset(conn):
+    """Roll back anything left open before the connection goes back to the pool.
+
+    Read-only transactions end here too: rolling back a READ ONLY transaction costs the same round
+    trip as committing it. The session goes back to the pool's default (transactional, read-write).
+    """
+    if conn.closed:
+        raise psycopg2.InterfaceError("connection already closed")
+    if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        conn.rollback()
+    if conn.autocommit or conn.readonly is not None:
+        conn.autocommit = False
+        conn.readonly = None
+
+
+def _pg_connect(database_name: str, params: dict):
+    options = f"-c statement_timeout={int(STATEMENT_TIMEOUT * 1000)}"
+    if params.get("options"):
+        options = f"{params['options']} {options}"
+    return psycopg2.connect(**dict(params, dbname=database_name, options=options))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database_name: str, replica: Optional[str] = None) -> ConnectionPool:
+    """Return the pool for a database on the primary (or a replica), creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get((replica, database_name))
+        if pool is None:
+            params = PRIMARY if replica is None else REPLICAS[replica]
+            pool = ConnectionPool(
+                lambda _tag, db=database_name, params=params: _pg_connect(db, params),
+                name=f"postgres:{database_name}" if replica is None else f"postgres@{replica}:{database_name}",
+                min_size=POOL_MIN_SIZE,
+                max_size=POOL_MAX_SIZE,
+                idle_timeout=POOL_IDLE_TIMEOUT,
+                max_lifetime=POOL_MAX_LIFETIME,
+                health_check=_pg_health_check,
+                health_check_interval=POOL_HEALTH_CHECK_INTERVAL,
+                reset=_pg_reset,
+            )
+            _pools[(replica, database_name)] = pool
+        return pool
+
+
+def drop_pool(database_name: str):
+    """Close and forget the pools of a database (e.g. after DROP DATABASE)."""
+    with _pools_lock:
+        pools = [_pools.pop(key) for key in list(_pools) if key[1] == database_name]
+    for pool in pools:
+        pool.close()
+
+
+def _replica_lag(conn) -> Optional[float]:
+    # Autocommit, like the health check: no transaction left open for the statement that follows
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(_REPLICA_LAG_SQL)
+            lag = cursor.fetchone()[0]
+    finally:
+        conn.autocommit = False
+    return None if lag is None else float(lag)
+
+
+def acquire_for(database_name: str, sql_query: str):
+    """Borrow a connection for a statement: replica-safe reads from a replica, everything else from the primary.
+
+    Returns (pool, connection); give the connection back to that pool.
+    """
+    replica = replicas.choose(database_name) if is_replica_safe(sql_query) else None
+    if replica is not None:
+        pool = get_pool(database_name, replica)
+        conn = None
+        try:
+            conn = pool.acquire()
+            with phase("acquire"):
+                usable = not replicas.lag_check_due(replica) or replicas.report_lag(replica, _replica_lag(conn))
+            if usable:
+                logger.debug(f"Routing read on {database_name} to replica {replica}")
+                return pool, conn
+            pool.release(conn)
+        except Exception as e:
+            logger.warning(f"Replica {replica} unavailable, reading from the primary: {e}")
+            replicas.report_failure(replica, e)
+            if conn is not None:
+                pool.release(conn, discard=True)
+    pool = get_pool(database_name)
+    return pool, pool.acquire()
+
+
+# ---------------------------
+# Database catalog cache
+# ---------------------------
+def _load_database_names() -> list:
+    """Read the database names from pg_database through the maintenance pool."""
+    with get_pool(MAINTENANCE_DB).connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT datname FROM pg_database WHERE datistemplate = false;")
+        databases = cursor.fetchall()
+        cursor.close()
+    return [db[0] for db in databases]
+
+
+catalog = DatabaseCatalog(_load_database_names, name="postgres", ttl=CATALOG_TTL)
+
+
+def _fold_identifier(name: str) -> str:
+    """Postgres folds unquoted identifiers to lower case."""
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1]
+    return name.lower()
+
+
 #List Database Function
 def list_databases() -> str:
     """List all databases present in the PostgreSQL server."""
     
-    conn = psycopg2.connect(
-        host="localhost",
-        database="postgres",  # Connect to the default 'postgres' database
-        user="postgres",
-        password="pass123"
-    )
-
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT datname FROM pg_database WHERE datistemplate = false;")
-
-    databases = cursor.fetchall()
+    databases = catalog.names()
 
     for db in databases:
-        print(db[0])
-
-    cursor.close()
-    conn.close()
+        logger.debug(db)
 
-    return json.dumps(databases)
+    return json.dumps([[db] for db in databases])
 
 #Small list database tool
 @mcp.tool(name="postgres_list_databases", description="List all databases present in the PostgreSQL server.")
-def list_databases_tool() -> str:
+@instrumentation.tool("postgres_list_databases")
+async def list_databases_tool() -> str:
     """If the user asks for number of databases present in PostgreSQL server, use this tool."""
-    return list_databases()
+    return await run_blocking(list_databases)
 
 # MAIN WALA TOOL WITH SWITCHING AND JUMPING
 
 #Database existence check function
 def database_exists(database_name: str) -> bool:
-    """Check if a database exists."""
+    """Check if a database exists (served from the catalog cache)."""
     try:
-        # Connect to postgres database to check
-        conn = psycopg2.connect(
-            dbname="postgres",
-            user="postgres",
-            password="pass123",
-            host="localhost",
-            port="5432"
-        )
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT 1 FROM pg_database WHERE datname = %s AND datistemplate = false",
-            (database_name,)
-        )
-        exists = cursor.fetchone() is not None
-        cursor.close()
-        conn.close()
-        return exists
-    except:
+        return catalog.exists(database_name)
+    except Exception as e:
+        logger.error(f"Database check error: {e}")
         return False
 
-from typing import Optional
+# ---------------------------
+# Read-query result cache
+# ---------------------------
+query_cache = QueryResultCache(
+    "postgres",
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    max_bytes=QUERY_CACHE_MAX_BYTES,
+    ttl=QUERY_CACHE_TTL
+)
+
+
+def _cache_key(database_name: str, sql_query: str, params: Optional[list]) -> tuple:
+    if params is None:
+        return database_name, normalize_sql(sql_query)
+    return database_name, normalize_sql(sql_query), json.dumps(params, default=str)
+
+
+# ---------------------------
+# Prepared statements (parameterized queries)
+# ---------------------------
+prepared_statements = PreparedStatementCache(
+    "postgres",
+    max_per_connection=PREPARED_STATEMENTS,
+    threshold=PREPARE_THRESHOLD
+)
 
-# Global connection tracking
-current_connection = None
-current_database = None
 
-@mcp.tool(name="postgres_query_executor", description="Execute SQL queries on a specified PostgreSQL database and return results in JSON format.")
-def query_data(sql_query: str, database_name: str) -> str:
-    """Execute Postgres SQL queries safely with automatic database switching."""
-    global current_connection, current_database
+def _param_type(value) -> str:
+    """Declared PREPARE type of a value; unknown lets the server infer it from the context."""
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        return "bigint"
+    return "unknown"
+
+
+def _execute(conn, cursor, database_name: str, sql_query: str, params: Optional[list] = None):
+    """Run a statement; parameterized templates seen before on this connection go through PREPARE/EXECUTE."""
+    if params is None:
+        cursor.execute(sql_query)
+        return
+    text, count = numbered_placeholders(sql_query, "$")
+    if not prepared_statements.enabled or count != len(params) or not is_preparable(sql_query):
+        # psycopg2 binds the values client-side (and reports a placeholder mismatch)
+        cursor.execute(sql_query, params)
+        return
+
+    types = [_param_type(value) for value in params]
+    key = statement_key(database_name, sql_query, params, types)
+    name, ready, stale = prepared_statements.checkout(conn, database_name, key)
+    for old_name in stale:
+        cursor.execute(f"DEALLOCATE {old_name}")
+    if name is None:
+        cursor.execute(sql_query, params)
+        return
+    if not ready:
+        declared = f" ({', '.join(types)})" if types else ""
+        cursor.execute(f"PREPARE {name}{declared} AS {text}")
+        prepared_statements.prepared(conn, key, name)
+    try:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}", params)
+    except psycopg2.errors.InvalidSqlStatementName:
+        prepared_statements.forget(conn, key)
+        raise
+
+
+def _result_response(database_name: str, sql_query: str, colnames: list, rows, result_format: str, cached: bool = False,
+                     cost_report: Optional[dict] = None) -> str:
+    """JSON response for a complete SELECT result."""
+    with phase("serialize"):
+        response = {
+            "status": "success",
+            "database": database_name,
+            **encode_rows(colnames, rows, result_format),
+            "sql_query": sql_query,
+            "row_count": len(rows) if rows else 0
+        }
+        if cached:
+            response["cached"] = True
+        if cost_report is not None:
+            response["cost_guard"] = cost_report
+        return dumps(response, result_format)
+
+
+# ---------------------------
+# Cost guard (pre-flight EXPLAIN)
+# ---------------------------
+cost_guard = CostGuard(
+    "postgres",
+    mode=COST_GUARD_MODE,
+    max_rows=COST_GUARD_MAX_ROWS,
+    max_cost=COST_GUARD_MAX_COST,
+    row_cap=COST_GUARD_ROW_CAP
+)
+
+
+def _guard(cursor, sql_query: str, params: Optional[list] = None, paged: bool = False) -> Optional[dict]:
+    """EXPLAIN a plain read before running it: None to run it as is, or a report with the LIMIT to apply.
+
+    Raises QueryRejected for queries over the thresholds.
+    """
+    if not cost_guard.enabled or not is_plain_read(sql_query):
+        return None
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {sql_query}", params)
+    return cost_guard.check(*postgres_plan_estimate(cursor.fetchone()[0]), paged)
+
+
+def _rejected_response(database_name: str, sql_query: str, e: QueryRejected) -> str:
+    return json.dumps({
+        "status": "error",
+        "database": database_name,
+        "error": f"Query rejected by the cost guard: {e}",
+        "cost_guard": e.report,
+        "hint": "Add selective filters, aggregate in SQL, or add a LIMIT, then retry",
+        "query": sql_query
+    }, indent=2)
+
+
+# ---------------------------
+# Paged results (server-side cursors)
+# ---------------------------
+# Open cursors of a database leave at least one connection of its pool to other calls
+cursors = CursorRegistry(name="postgres", idle_timeout=CURSOR_IDLE_TIMEOUT, max_open=MAX_OPEN_CURSORS,
+                         max_per_group=max(1, POOL_MAX_SIZE - 1))
+
+
+def _paged_response(page, database_name: str, sql_query: Optional[str] = None) -> str:
+    """JSON response for one page; continuation_token is only present while rows remain."""
+    result_format = page.meta["result_format"]
+    with phase("serialize"):
+        response = {
+            "status": "success",
+            "database": database_name,
+            **encode_rows(page.columns, page.rows, result_format),
+            "row_count": len(page.rows),
+            "rows_fetched": page.rows_fetched,
+            "has_more": page.has_more
+        }
+        if sql_query is not None:
+            response["sql_query"] = sql_query
+        if page.has_more:
+            response["continuation_token"] = page.token
+        return dumps(response, result_format)
+
+
+def _start_paged_query(sql_query: str, database_name: str, page_size: int, result_format: str, params: Optional[list] = None,
+                       timeout: float = STATEMENT_TIMEOUT) -> str:
+    """Run a SELECT through a named (server-side) cursor and return its first page.
+
+    The connection stays borrowed until the cursor is exhausted, closed, reaped or evicted to make
+    room for a newer cursor on the same database.
+    """
+    cursors.make_room(database_name)
+    pool, conn = acquire_for(database_name, sql_query)
+
+    def close(cursor, exhausted):
+        discard = False
+        try:
+            cursor.close()
+            conn.rollback()  # ends the read transaction the cursor lived in
+        except Exception:
+            discard = True
+        pool.release(conn, discard=discard or bool(conn.closed))
+
+    try:
+        _bind_call(conn)
+        # Named cursors live in a transaction; a read-only one needs no commit (close() rolls it back)
+        if classify(sql_query).read_only:
+            conn.readonly = True
+        with phase("execute"):
+            with conn.cursor() as setup:
+                _set_timeout(setup, timeout)
+                _guard(setup, sql_query, params, paged=True)
+            cursor = conn.cursor(name=f"mcp_{uuid.uuid4().hex}")
+            cursor.itersize = page_size
+            # Named cursors cannot run EXECUTE; the values are bound client-side
+            cursor.execute(sql_query, params)
+    except Exception:
+        pool.release(conn, discard=bool(conn.closed))
+        raise
+
+    with phase("fetch"):
+        page = cursors.open(cursor, close, page_size, group=database_name, database=database_name,
+                            result_format=result_format)
+    add_rows(len(page.rows))
+    return _paged_response(page, database_name, sql_query)
+
+
+def stream_query(sql_query: str, database_name: str, page_size: int = 1000):
+    """Yield (colnames, rows) pages of a SELECT read through a named cursor.
+
+    Used by the multi-database server to move large results without holding them in memory.
+    The connection goes back to the pool when the generator is exhausted or closed.
+    """
+    if not database_exists(database_name):
+        raise ValueError(f"Database '{database_name}' does not exist")
+    pool, conn = acquire_for(database_name, sql_query)
+    cursor = None
+    discard = False
+    try:
+        if classify(sql_query).read_only:
+            conn.readonly = True
+        cursor = conn.cursor(name=f"mcp_{uuid.uuid4().hex}")
+        cursor.itersize = page_size
+        cursor.execute(sql_query)
+        first = True
+        while True:
+            rows = cursor.fetchmany(page_size)
+            if rows or first:
+                yield [desc[0] for desc in cursor.description], rows
+            first = False
+            if len(rows) < page_size:
+                break
+    finally:
+        try:
+            if cursor is not None:
+                cursor.close()
+            conn.rollback()
+        except Exception:
+            discard = True
+        pool.release(conn, discard=discard or bool(conn.closed))
+
+
+def query_data(sql_query: str, database_name: str, page_size: Optional[int] = None, result_format: str = "json",
+               params: Optional[list] = None, timeout: Optional[float] = None) -> str:
+    """Execute Postgres SQL queries safely, borrowing a warm connection from the database's pool.
+
+    params binds values to %s placeholders; a template repeated on a connection is prepared once and
+    then only EXECUTEd with new values.
+    timeout (seconds) overrides POSTGRES_STATEMENT_TIMEOUT up to POSTGRES_MAX_STATEMENT_TIMEOUT.
+    With page_size, SELECT results are streamed from a server-side cursor one page at a time.
+    Read-only statements run without a COMMIT: in autocommit mode, or in a READ ONLY transaction when
+    a timeout override needs SET LOCAL; everything else runs in a transaction that is committed.
+    Repeated plain SELECTs are answered from the result cache until a write touches one of their tables.
+    result_format: "json" (row objects, default), "columnar" (columns header + row arrays), "csv" or "tsv".
+    """
     
     logger.info(f"Received SQL query: {sql_query} for database: {database_name}")
     
-    DB_USER = "postgres"
-    DB_PASS = "pass123"
-    DB_HOST = "localhost"
-    DB_PORT = "5432"
-    
     cursor = None
+    conn = None
+    pool = None
+    timeout = _statement_timeout(timeout)
     
     try:
-        # Check if we need to switch databases
-        if current_database != database_name or current_connection is None:
-            logger.info(f"Switching from {current_database} to {database_name}")
-            
-            # Validate database exists
-            if not database_exists(database_name):
-                return json.dumps({
-                    "status": "error",
-                    "error": f"Database '{database_name}' does not exist",
-                    "available_databases": list_databases(),
-                    "query": sql_query
-                }, indent=2)
-            
-            # Close existing connection
-            if current_connection:
-                current_connection.close()
-                logger.info(f"Closed connection to {current_database}")
-            
-            # Create new connection
-            current_connection = psycopg2.connect(
-                dbname=database_name,
-                user=DB_USER,
-                password=DB_PASS,
-                host=DB_HOST,
-                port=DB_PORT
-            )
-            current_database = database_name
-            logger.info(f"Established new connection to {database_name}")
+        # Validate database exists before creating a pool for it
+        if not database_exists(database_name):
+            return json.dumps({
+                "status": "error",
+                "error": f"Database '{database_name}' does not exist",
+                "available_databases": list_databases(),
+                "query": sql_query
+            }, indent=2)
         
-        # Execute query on current connection
-        cursor = current_connection.cursor()
-        cursor.execute(sql_query)
-        current_connection.commit()
+        result_format = validate_format(result_format)
         
-        # Handle results (same as your existing logic)
-        query_upper = sql_query.strip().upper()
+        statement = classify(sql_query)
         
-        if query_upper.startswith(('SELECT', 'WITH')):
-            rows = cursor.fetchall()
+        # Paged mode keeps memory bounded by the page size
+        if page_size and statement.query:
+            return _start_paged_query(sql_query, database_name, max(1, min(page_size, MAX_PAGE_SIZE)), result_format, params, timeout)
+        
+        cache_key = None
+        if query_cache.enabled and is_cacheable_read(sql_query):
+            cache_key = _cache_key(database_name, sql_query, params)
+            hit = query_cache.get(cache_key)
+            if hit is not None:
+                add_rows(len(hit.rows))
+                return _result_response(database_name, sql_query, hit.colnames, hit.rows, result_format, cached=True)
+        
+        # Borrow a warm connection for this database (switching no longer closes anything);
+        # replica-safe reads are served by a replica when there are any
+        pool, conn = acquire_for(database_name, sql_query)
+        _bind_call(conn)
+        
+        # CREATE/DROP/ALTER DATABASE cannot run inside a transaction block
+        ddl = database_ddl(sql_query)
+        if ddl is not None:
+            conn.autocommit = True
+            if ddl[0] in ("DROP", "ALTER"):
+                # Our own idle connections would block dropping/renaming the target
+                drop_pool(_fold_identifier(ddl[1]))
+        elif statement.read_only:
+            # Reads skip BEGIN/COMMIT; SET LOCAL needs a transaction, which is then READ ONLY
+            if timeout == STATEMENT_TIMEOUT:
+                conn.autocommit = True
+            else:
+                conn.readonly = True
+        
+        # Execute query on the borrowed connection
+        cursor = conn.cursor()
+        capped = None
+        try:
+            with phase("execute"):
+                if ddl is None:
+                    _set_timeout(cursor, timeout)
+                    capped = _guard(cursor, sql_query, params)
+                _execute(conn, cursor, database_name, with_row_limit(sql_query, capped["limit"]) if capped else sql_query, params)
+                if not conn.autocommit and not statement.read_only:
+                    conn.commit()
+        finally:
+            if ddl is not None:
+                # The set of databases may have changed
+                catalog.invalidate()
+                schema_cache.invalidate(_fold_identifier(ddl[1]))
+                query_cache.invalidate(_fold_identifier(ddl[1]))
+                replicas.note_write(_fold_identifier(ddl[1]))
+            else:
+                if is_ddl(sql_query):
+                    schema_cache.invalidate(database_name)
+                    prepared_statements.invalidate(database_name)
+                if statement.writes:
+                    # Unknown targets (None) drop every cached result of this database
+                    query_cache.invalidate(database_name, written_tables(sql_query))
+                    replicas.note_write(database_name)
+        
+        # Statements that return rows (SELECT, SHOW, EXPLAIN, ... RETURNING) have a description
+        if cursor.description is not None:
+            with phase("fetch"):
+                rows = cursor.fetchall()
+            add_rows(len(rows))
             colnames = [desc[0] for desc in cursor.description] if cursor.description else []
             
-            if colnames and rows:
-                result = [dict(zip(colnames, row)) for row in rows]
-            else:
-                result = rows
+            response = _result_response(database_name, sql_query, colnames, rows, result_format, cost_report=capped)
+            if cache_key is not None and capped is None:
+                # The encoded response stands in for the memory the cached rows hold
+                query_cache.put(cache_key, database_name, colnames, rows, referenced_tables(sql_query), len(response))
             
-            return json.dumps({
-                "status": "success",
-                "database": database_name,
-                "data": result,
-                "sql_query": sql_query,
-                "row_count": len(rows) if rows else 0
-            }, indent=2, default=str)
+            return response
             
         else:
             affected_rows = cursor.rowcount if cursor.rowcount >= 0 else None
@@ -149,6 +747,17 @@ def query_data(sql_query: str, database_name: str) -> str:
                 "query_type": "DDL/DML"
             }, indent=2)
             
+    except QueryRejected as e:
+        return _rejected_response(database_name, sql_query, e)
+        
+    except psycopg2.errors.QueryCanceled as e:
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            **_cancel_error(e, timeout),
+            "query": sql_query
+        }, indent=2)
+        
     except Exception as e:
         return json.dumps({
             "status": "error",
@@ -160,12 +769,556 @@ def query_data(sql_query: str, database_name: str) -> str:
     finally:
         if cursor is not None:
             cursor.close()
-        # if conn is not None:
-        #     conn.close()
+        if conn is not None:
+            # reset() rolls back failed transactions; dead connections are discarded
+            pool.release(conn, discard=bool(conn.closed))
 
 
-# # SCHEMA EXTRACTION TOOL
-@mcp.tool(name="postgres_schema_extractor", description="Extract and return the schema of the specified PostgreSQL database in a .txt file format.")
+@mcp.tool(name="postgres_query_executor", description="Execute SQL queries on a specified PostgreSQL database and return results in JSON format. Statements are cancelled after a default timeout; pass timeout (seconds) for a known long-running query. Prefer %s placeholders with the values in params (e.g. sql_query='SELECT * FROM users WHERE id = %s', params=[42]) over inlining literals: repeated templates are prepared once and reuse the plan. SELECTs may be checked with EXPLAIN first: too expensive ones are rejected or capped with a LIMIT, and cost_guard in the response says why (rewrite the query accordingly). For large SELECTs pass page_size to get the first page plus a continuation_token for postgres_fetch_next. result_format 'columnar', 'csv' or 'tsv' returns a compact, token-efficient encoding.")
+@instrumentation.tool("postgres_query_executor")
+async def query_data_tool(sql_query: str, database_name: str, page_size: Optional[int] = None, result_format: str = "json",
+                          params: Optional[list] = None, timeout: Optional[float] = None) -> str:
+    """Execute a query without blocking other tool calls; cancelling the call cancels the query."""
+    return await run_cancellable(query_data, sql_query, database_name, page_size, result_format, params, timeout)
+
+
+#Next page
+def fetch_next(continuation_token: str, page_size: Optional[int] = None, close: bool = False) -> str:
+    """Resume an open server-side cursor."""
+    try:
+        if close:
+            closed = cursors.close(continuation_token)
+            return json.dumps({
+                "status": "success" if closed else "error",
+                "message": "Cursor closed." if closed else "Continuation token is unknown, exhausted or expired"
+            }, indent=2)
+        
+        with phase("fetch"):
+            page = cursors.fetch(continuation_token, max(1, min(page_size, MAX_PAGE_SIZE)) if page_size else None)
+        add_rows(len(page.rows))
+        return _paged_response(page, page.meta["database"])
+    
+    except CursorNotFoundError as e:
+        return json.dumps({
+            "status": "error",
+            "error": str(e)
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "error": f"Fetching the next page failed, cursor closed: {e}"
+        }, indent=2)
+
+
+#Next page tool
+@mcp.tool(name="postgres_fetch_next", description="Fetch the next page of a paged postgres_query_executor result using its continuation_token. Set close=true to release the cursor without reading further.")
+@instrumentation.tool("postgres_fetch_next")
+async def fetch_next_tool(continuation_token: str, page_size: Optional[int] = None, close: bool = False) -> str:
+    """Resume an open server-side cursor without blocking other tool calls."""
+    return await run_blocking(fetch_next, continuation_token, page_size, close)
+
+
+# ---------------------------
+# Batches (many statements, one transaction)
+# ---------------------------
+def _statement_result(cursor, index: int, sql_query: str, started: float, result_format: str) -> dict:
+    """Per-statement entry of a batch response."""
+    result = {"index": index, "status": "success", "sql_query": sql_query}
+    if cursor.description is not None:
+        with phase("fetch"):
+            rows = cursor.fetchall()
+        add_rows(len(rows))
+        colnames = [desc[0] for desc in cursor.description]
+        with phase("serialize"):
+            result.update(encode_rows(colnames, rows, result_format))
+        result["row_count"] = len(rows)
+    else:
+        result["affected_rows"] = cursor.rowcount if cursor.rowcount >= 0 else None
+    result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return result
+
+
+def execute_batch(statements: List[str], database_name: str, savepoints: bool = False, result_format: str = "json") -> str:
+    """Run statements in order on one connection inside a single transaction, committed once at the end.
+
+    Without savepoints the first failure rolls the whole batch back. With savepoints every statement
+    runs under its own SAVEPOINT (sent in the same round trip as the statement), so a failing statement
+    is undone on its own and the rest of the batch still commits.
+    """
+    logger.info(f"Received batch of {len(statements or [])} statements for database: {database_name}")
+
+    conn = None
+    pool = None
+    results = []
+    executed = []
+    committed = False
+
+    try:
+        if not database_exists(database_name):
+            return json.dumps({
+                "status": "error",
+                "error": f"Database '{database_name}' does not exist",
+                "available_databases": list_databases()
+            }, indent=2)
+
+        result_format = validate_format(result_format)
+        if not statements:
+            raise ValueError("No statements given")
+        if len(statements) > BATCH_MAX_STATEMENTS:
+            raise ValueError(f"Too many statements ({len(statements)}); at most {BATCH_MAX_STATEMENTS} per batch")
+        for i, statement in enumerate(statements):
+            if database_ddl(statement) is not None:
+                raise ValueError(f"Statement {i}: CREATE/DROP/ALTER DATABASE cannot run inside a transaction; use postgres_query_executor")
+
+        pool = get_pool(database_name)
+        conn = pool.acquire()
+        _bind_call(conn)
+        batch_started = time.perf_counter()
+        failed = None
+
+        with conn.cursor() as cursor:
+            for i, statement in enumerate(statements):
+                if failed is not None and not savepoints:
+                    results.append({"index": i, "status": "skipped", "sql_query": statement})
+                    continue
+                started = time.perf_counter()
+                try:
+                    with phase("execute"):
+                        cursor.execute(f"SAVEPOINT mcp_batch_{i}; {statement}" if savepoints else statement)
+                    executed.append(statement)
+                    results.append(_statement_result(cursor, i, statement, started, result_format))
+                except psycopg2.Error as e:
+                    if failed is None:
+                        failed = i
+                    if isinstance(e, psycopg2.errors.QueryCanceled):
+                        details = _cancel_error(e, STATEMENT_TIMEOUT)
+                        if details.get("cancelled"):
+                            # The tool call itself was cancelled: stop here, nothing commits
+                            raise
+                    else:
+                        details = {"error": str(e).strip()}
+                    if savepoints:
+                        cursor.execute(f"ROLLBACK TO SAVEPOINT mcp_batch_{i}")
+                    results.append({
+                        "index": i,
+                        "status": "error",
+                        "sql_query": statement,
+                        **details,
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+                    })
+
+        with phase("execute"):
+            if failed is not None and not savepoints:
+                conn.rollback()
+                executed = []
+            else:
+                conn.commit()
+                committed = True
+
+        succeeded = sum(1 for result in results if result["status"] == "success")
+        with phase("serialize"):
+            return dumps({
+                "status": "success" if committed else "error",
+                "database": database_name,
+                "committed": committed,
+                "total_statements": len(statements),
+                "succeeded": succeeded,
+                "failed": sum(1 for result in results if result["status"] == "error"),
+                "message": "Batch committed." if committed else f"Statement {failed} failed; the whole batch was rolled back.",
+                "elapsed_ms": round((time.perf_counter() - batch_started) * 1000, 2),
+                "results": results
+            }, result_format)
+
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            "committed": committed,
+            "error": str(e),
+            "results": results
+        }, indent=2)
+
+    finally:
+        if committed:
+            for statement in executed:
+                if is_ddl(statement):
+                    schema_cache.invalidate(database_name)
+                    prepared_statements.invalidate(database_name)
+                if may_write(statement):
+                    query_cache.invalidate(database_name, written_tables(statement))
+                    replicas.note_write(database_name)
+        if conn is not None:
+            # reset() rolls back anything left open
+            pool.release(conn, discard=bool(conn.closed))
+
+
+#Batch tool
+@mcp.tool(name="postgres_batch_executor", description="Run an ordered list of SQL statements on one PostgreSQL database in a single transaction with one commit (e.g. a multi-step migration or data fix) and return per-statement results. Any failure rolls back the whole batch unless savepoints=true, which undoes only the failing statement and commits the rest.")
+@instrumentation.tool("postgres_batch_executor")
+async def execute_batch_tool(statements: List[str], database_name: str, savepoints: bool = False, result_format: str = "json") -> str:
+    """Run a batch without blocking other tool calls."""
+    return await run_cancellable(execute_batch, statements, database_name, savepoints, result_format)
+
+
+# ---------------------------
+# Bulk load (COPY FROM STDIN)
+# ---------------------------
+def _qualified_identifier(name: str) -> psycopg2.sql.Composable:
+    """schema.table (or table) as a quoted identifier, folded the way Postgres folds the name as written."""
+    return psycopg2.sql.Identifier(*folded_name_parts(name))
+
+
+def bulk_load(table_name: str, database_name: str, file_path: Optional[str] = None, rows: Optional[list] = None,
+              columns: Optional[List[str]] = None, file_format: Optional[str] = None, has_header: bool = True,
+              chunk_size: Optional[int] = None, progress: Optional[Callable[[int, Optional[int]], None]] = None) -> str:
+    """Load a CSV/JSONL file or inline rows into a table with COPY FROM STDIN, one chunk at a time.
+
+    All chunks go into one transaction: either every row is loaded or none is.
+    progress(rows_loaded, total_rows_or_None) is called after every chunk.
+    """
+    logger.info(f"Bulk load into {table_name} on database: {database_name}")
+
+    conn = None
+    pool = None
+    close_input = None
+
+    try:
+        if not database_exists(database_name):
+            return json.dumps({
+                "status": "error",
+                "error": f"Database '{database_name}' does not exist",
+                "available_databases": list_databases()
+            }, indent=2)
+
+        columns, row_iter, total, close_input = open_rows(file_path, rows, columns, file_format, has_header)
+        chunk_size = max(1, chunk_size or BULK_CHUNK_SIZE)
+        copy_sql = psycopg2.sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(
+            _qualified_identifier(table_name),
+            psycopg2.sql.SQL(", ").join(psycopg2.sql.Identifier(_fold_identifier(col.strip())) for col in columns)
+        )
+
+        pool = get_pool(database_name)
+        conn = pool.acquire()
+        _bind_call(conn)
+        started = time.perf_counter()
+        loaded = 0
+        chunk_count = 0
+        with conn.cursor() as cursor:
+            copy_text = copy_sql.as_string(conn)
+            for chunk in chunks(row_iter, chunk_size):
+                # Unquoted empty fields are NULL for COPY ... CSV, quoted ones are empty strings
+                data = io.StringIO(quoted_csv(chunk, "", text_literal))
+                with phase("execute"):
+                    cursor.copy_expert(copy_text, data)
+                add_rows(len(chunk))
+                loaded += len(chunk)
+                chunk_count += 1
+                if progress is not None:
+                    progress(loaded, total)
+        with phase("execute"):
+            conn.commit()
+        elapsed = time.perf_counter() - started
+        # The result cache matches table names case-insensitively
+        query_cache.invalidate(database_name, {folded_name_parts(table_name)[-1].lower()})
+        replicas.note_write(database_name)
+
+        return json.dumps({
+            "status": "success",
+            "database": database_name,
+            "table": table_name,
+            "method": "copy",
+            "columns": columns,
+            "rows_loaded": loaded,
+            "chunks": chunk_count,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(loaded / elapsed, 1) if elapsed > 0 else None
+        }, indent=2)
+
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            "table": table_name,
+            "error": str(e),
+            "message": "Nothing was loaded; the load was rolled back."
+        }, indent=2)
+
+    finally:
+        if close_input is not None:
+            close_input()
+        if conn is not None:
+            # reset() rolls back a failed load
+            pool.release(conn, discard=bool(conn.closed))
+
+
+#Bulk load tool
+@mcp.tool(name="postgres_bulk_load", description="Bulk-load rows into a PostgreSQL table with COPY instead of many INSERT calls. Pass either file_path (a CSV/TSV file with a header line, or JSONL with one object per line) or rows (a list of objects, or of arrays plus columns). Loads in chunks inside one transaction and reports rows/s.")
+@instrumentation.tool("postgres_bulk_load")
+async def bulk_load_tool(table_name: str, database_name: str, file_path: Optional[str] = None, rows: Optional[list] = None,
+                         columns: Optional[List[str]] = None, file_format: Optional[str] = None, has_header: bool = True,
+                         chunk_size: Optional[int] = None, ctx: Context = None) -> str:
+    """Bulk load without blocking other tool calls; progress is reported to the client after every chunk."""
+
+    def progress(loaded: int, total: Optional[int]):
+        # Best effort: a client that cannot take progress notifications must not fail the load
+        try:
+            if ctx is not None:
+                anyio.from_thread.run(ctx.report_progress, loaded, total)
+        except Exception as e:
+            logger.debug(f"Progress report skipped: {e}")
+
+    return await run_cancellable(bulk_load, table_name, database_name, file_path, rows, columns, file_format,
+                                 has_header, chunk_size, progress)
+
+
+#Pool statistics
+def server_stats() -> str:
+    """Pool, cache, cursor and concurrency statistics of the PostgreSQL server."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.prune()
+    return json.dumps({
+        "status": "success",
+        "pools": {pool.name: pool.stats() for pool in pools},
+        "catalog": catalog.stats(),
+        "schema_cache": schema_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "prepared_statements": prepared_statements.stats(),
+        "cost_guard": cost_guard.stats(),
+        "replicas": replicas.stats(),
+        "statements": {
+            "timeout": STATEMENT_TIMEOUT,
+            "max_timeout": MAX_STATEMENT_TIMEOUT,
+            **statement_counters
+        },
+        "cursors": cursors.stats(),
+        "concurrency": {
+            "limit": MAX_CONCURRENCY,
+            "in_flight": _limiter.borrowed_tokens
+        },
+        "tools": instrumentation.stats()
+    }, indent=2)
+
+
+#Pool statistics tool
+@mcp.tool(name="postgres_server_stats", description="Report PostgreSQL server internals such as connection pool sizes, hit/miss counters and per-tool latency histograms (connect, acquire, execute, fetch and serialize time, rows and response bytes).")
+@instrumentation.tool("postgres_server_stats")
+async def server_stats_tool() -> str:
+    """Use this tool to inspect how the PostgreSQL server is performing (e.g. to size the connection pools)."""
+    # Only in-memory counters (and closing a few idle sockets), fine to run on the event loop
+    return server_stats()
+
+
+# ---------------------------
+# Schema extraction (set-based)
+# ---------------------------
+SCHEMA_NAME = "public"
+
+# Each query reads the whole schema in one pass; rows are grouped by table oid in Python.
+_SCHEMA_TABLES_SQL = """
+    SELECT c.oid, c.relname
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %(schema)s
+    AND c.relkind IN ('r', 'p', 'v', 'f')
+    ORDER BY c.relname::text;
+"""
+
+# data_type / character_maximum_length mirror information_schema.columns
+_SCHEMA_COLUMNS_SQL = """
+    SELECT
+        a.attrelid,
+        a.attname,
+        CASE
+            WHEN t.typtype = 'd' THEN
+                CASE WHEN bt.typcategory = 'A' THEN 'ARRAY'
+                     WHEN bt.typtype <> 'b' OR btn.nspname <> 'pg_catalog' THEN 'USER-DEFINED'
+                     ELSE pg_catalog.format_type(t.typbasetype, NULL) END
+            WHEN t.typcategory = 'A' THEN 'ARRAY'
+            WHEN t.typtype <> 'b' OR tn.nspname <> 'pg_catalog' THEN 'USER-DEFINED'
+            ELSE pg_catalog.format_type(a.atttypid, NULL)
+        END AS data_type,
+        a.attnotnull OR (t.typtype = 'd' AND t.typnotnull) AS not_null,
+        CASE WHEN a.attgenerated = '' THEN pg_catalog.pg_get_expr(d.adbin, d.adrelid) END AS column_default,
+        CASE
+            WHEN a.atttypmod < 0 THEN NULL
+            WHEN COALESCE(NULLIF(t.typbasetype, 0), a.atttypid) IN ('bpchar'::regtype, 'varchar'::regtype) THEN a.atttypmod - 4
+            WHEN COALESCE(NULLIF(t.typbasetype, 0), a.atttypid) IN ('bit'::regtype, 'varbit'::regtype) THEN a.atttypmod
+        END AS character_maximum_length
+    FROM pg_catalog.pg_attribute a
+    JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_catalog.pg_type t ON t.oid = a.atttypid
+    JOIN pg_catalog.pg_namespace tn ON tn.oid = t.typnamespace
+    LEFT JOIN pg_catalog.pg_type bt ON bt.oid = t.typbasetype
+    LEFT JOIN pg_catalog.pg_namespace btn ON btn.oid = bt.typnamespace
+    LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+    WHERE n.nspname = %(schema)s
+    AND c.relkind IN ('r', 'p', 'v', 'f')
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    ORDER BY a.attrelid, a.attnum;
+"""
+
+_SCHEMA_PRIMARY_KEYS_SQL = """
+    SELECT con.conrelid, a.attname
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_namespace n ON n.oid = con.connamespace
+    CROSS JOIN LATERAL unnest(con.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    WHERE n.nspname = %(schema)s
+    AND con.contype = 'p'
+    ORDER BY con.conrelid, k.ord;
+"""
+
+_SCHEMA_FOREIGN_KEYS_SQL = """
+    SELECT con.conrelid, a.attname, ft.relname, fa.attname, con.conname
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_namespace n ON n.oid = con.connamespace
+    CROSS JOIN LATERAL unnest(con.conkey, con.confkey) WITH ORDINALITY AS k(attnum, fattnum, ord)
+    JOIN pg_catalog.pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+    JOIN pg_catalog.pg_class ft ON ft.oid = con.confrelid
+    JOIN pg_catalog.pg_attribute fa ON fa.attrelid = con.confrelid AND fa.attnum = k.fattnum
+    WHERE n.nspname = %(schema)s
+    AND con.contype = 'f'
+    ORDER BY con.conrelid, con.conname, k.ord;
+"""
+
+# Same text as information_schema.check_constraints.check_clause
+_SCHEMA_CHECKS_SQL = """
+    SELECT con.conrelid, con.conname, pg_catalog.pg_get_expr(con.conbin, con.conrelid)
+    FROM pg_catalog.pg_constraint con
+    JOIN pg_catalog.pg_namespace n ON n.oid = con.connamespace
+    WHERE n.nspname = %(schema)s
+    AND con.contype = 'c'
+    AND con.conrelid <> 0
+    ORDER BY con.conrelid, con.conname;
+"""
+
+# Key columns of every index in order (INCLUDE columns excluded); expression parts come back as NULL
+_SCHEMA_INDEXES_SQL = """
+    SELECT
+        i.indrelid,
+        ic.relname,
+        i.indisunique,
+        pg_catalog.pg_get_expr(i.indpred, i.indrelid),
+        array(
+            SELECT a.attname
+            FROM unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+            LEFT JOIN pg_catalog.pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum AND k.attnum > 0
+            WHERE k.ord <= i.indnkeyatts
+            ORDER BY k.ord
+        )
+    FROM pg_catalog.pg_index i
+    JOIN pg_catalog.pg_class ic ON ic.oid = i.indexrelid
+    JOIN pg_catalog.pg_namespace n ON n.oid = ic.relnamespace
+    WHERE n.nspname = %(schema)s
+    ORDER BY i.indrelid, ic.relname::text;
+"""
+
+
+# Cheap catalog fingerprint: any DDL inserts/updates/deletes rows in these catalogs,
+# which changes their row count or the sum of their xmin transaction ids
+_SCHEMA_FINGERPRINT_SQL = """
+    SELECT concat_ws('/',
+        (SELECT count(*) || ':' || coalesce(sum(c.xmin::text::bigint), 0)
+         FROM pg_catalog.pg_class c WHERE c.relnamespace = n.oid),
+        (SELECT count(*) || ':' || coalesce(sum(a.xmin::text::bigint), 0)
+         FROM pg_catalog.pg_attribute a JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+         WHERE c.relnamespace = n.oid),
+        (SELECT count(*) || ':' || coalesce(sum(d.xmin::text::bigint), 0)
+         FROM pg_catalog.pg_attrdef d JOIN pg_catalog.pg_class c ON c.oid = d.adrelid
+         WHERE c.relnamespace = n.oid),
+        (SELECT count(*) || ':' || coalesce(sum(con.xmin::text::bigint), 0)
+         FROM pg_catalog.pg_constraint con WHERE con.connamespace = n.oid)
+    )
+    FROM pg_catalog.pg_namespace n
+    WHERE n.nspname = %(schema)s;
+"""
+
+schema_cache = SchemaCache("postgres", SCHEMA_CACHE_DIR)
+
+
+def schema_fingerprint(cursor, schema_name: str = SCHEMA_NAME) -> str:
+    """Fingerprint of the schema's catalog rows, used to validate cached schemas."""
+    cursor.execute(_SCHEMA_FINGERPRINT_SQL, {"schema": schema_name})
+    row = cursor.fetchone()
+    return f"{schema_name}/{row[0]}" if row else f"{schema_name}/missing"
+
+
+def load_schema(cursor, schema_name: str = SCHEMA_NAME) -> dict:
+    """Read tables, columns, keys, checks and indexes of a schema with a constant number of pg_catalog queries.
+
+    Returns {table_name: {"columns": [...], "primary_keys": [...], "foreign_keys": [...], "checks": [...],
+    "indexes": [...]}} ordered by table name.
+    """
+    params = {"schema": schema_name}
+
+    cursor.execute(_SCHEMA_TABLES_SQL, params)
+    by_oid = {}
+    schema = {}
+    for oid, table_name in cursor.fetchall():
+        table = {"columns": [], "primary_keys": [], "foreign_keys": [], "checks": [], "indexes": []}
+        by_oid[oid] = table
+        schema[table_name] = table
+
+    cursor.execute(_SCHEMA_COLUMNS_SQL, params)
+    for oid, col_name, data_type, not_null, default, max_length in cursor.fetchall():
+        if oid in by_oid:
+            by_oid[oid]["columns"].append({
+                "name": col_name,
+                "data_type": data_type,
+                "nullable": not not_null,
+                "default": default,
+                "max_length": max_length
+            })
+
+    cursor.execute(_SCHEMA_PRIMARY_KEYS_SQL, params)
+    for oid, col_name in cursor.fetchall():
+        if oid in by_oid:
+            by_oid[oid]["primary_keys"].append(col_name)
+
+    cursor.execute(_SCHEMA_FOREIGN_KEYS_SQL, params)
+    for oid, col_name, ref_table, ref_column, constraint_name in cursor.fetchall():
+        if oid in by_oid:
+            by_oid[oid]["foreign_keys"].append({
+                "column": col_name,
+                "ref_table": ref_table,
+                "ref_column": ref_column,
+                "constraint": constraint_name
+            })
+
+    cursor.execute(_SCHEMA_CHECKS_SQL, params)
+    for oid, constraint_name, check_clause in cursor.fetchall():
+        if oid in by_oid:
+            by_oid[oid]["checks"].append({"name": constraint_name, "clause": check_clause})
+
+    cursor.execute(_SCHEMA_INDEXES_SQL, params)
+    for oid, index_name, unique, predicate, columns in cursor.fetchall():
+        if oid in by_oid:
+            by_oid[oid]["indexes"].append({
+                "name": index_name,
+                "columns": list(columns),
+                "unique": unique,
+                "predicate": predicate
+            })
+
+    return schema
+
+
+def cached_schema(cursor, database_name: str) -> dict:
+    """Schema of the connected database, served from the schema cache while its fingerprint matches."""
+    # One cheap query decides whether the cached schema is still valid
+    fingerprint = schema_fingerprint(cursor)
+    schema = schema_cache.get(database_name, fingerprint)
+    if schema is None:
+        schema = load_schema(cursor)
+        schema_cache.put(database_name, fingerprint, schema)
+    return schema
+
+
+# # SCHEMA EXTRACTION
 def extract_database_schema(database_name: str) -> str:
     """Extract comprehensive schema information from a PostgreSQL database."""
     
@@ -178,152 +1331,15 @@ def extract_database_schema(database_name: str) -> str:
         }, indent=2)
     
     try:
-        # Connect to the specified database
-        conn = psycopg2.connect(
-            dbname=database_name,
-            user="postgres",
-            password="pass123",
-            host="localhost",
-            port="5432"
-        )
-        cursor = conn.cursor()
-        
-        schema_info = []
-        schema_info.append(f"DATABASE SCHEMA: {database_name}")
-        schema_info.append("=" * 50)
-        schema_info.append("")
-        
-        # 1. Get all table names
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            ORDER BY table_name;
-        """)
-        tables = cursor.fetchall()
-        
-        schema_info.append("TABLE NAMES (Node Types):")
-        schema_info.append("-" * 30)
-        for table in tables:
-            schema_info.append(f"• {table[0]}")
-        schema_info.append("")
-        
-        # 2. For each table, get column definitions and constraints
-        for table in tables:
-            table_name = table[0]
-            schema_info.append(f"TABLE: {table_name}")
-            schema_info.append("=" * 40)
-            
-            # Get column information
-            cursor.execute("""
-                SELECT 
-                    column_name,
-                    data_type,
-                    is_nullable,
-                    column_default,
-                    character_maximum_length
-                FROM information_schema.columns 
-                WHERE table_name = %s AND table_schema = 'public'
-                ORDER BY ordinal_position;
-            """, (table_name,))
-            
-            columns = cursor.fetchall()
-            
-            schema_info.append("COLUMNS (Attributes/Properties):")
-            schema_info.append("-" * 35)
-            
-            for col in columns:
-                col_name, data_type, nullable, default, max_length = col
-                
-                # Format column info
-                col_info = f"• {col_name}: {data_type}"
-                if max_length:
-                    col_info += f"({max_length})"
-                if nullable == "NO":
-                    col_info += " NOT NULL"
-                if default:
-                    col_info += f" DEFAULT {default}"
-                
-                schema_info.append(col_info)
-            
-            schema_info.append("")
-            
-            # 3. Get primary keys
-            cursor.execute("""
-                SELECT column_name
-                FROM information_schema.key_column_usage
-                WHERE table_name = %s 
-                AND constraint_name IN (
-                    SELECT constraint_name
-                    FROM information_schema.table_constraints
-                    WHERE table_name = %s AND constraint_type = 'PRIMARY KEY'
-                );
-            """, (table_name, table_name))
-            
-            primary_keys = cursor.fetchall()
-            if primary_keys:
-                schema_info.append("PRIMARY KEYS:")
-                schema_info.append("-" * 15)
-                for pk in primary_keys:
-                    schema_info.append(f"• {pk[0]}")
-                schema_info.append("")
-            
-            # 4. Get foreign key relationships
-            cursor.execute("""
-                SELECT 
-                    kcu.column_name,
-                    ccu.table_name AS foreign_table_name,
-                    ccu.column_name AS foreign_column_name,
-                    tc.constraint_name
-                FROM information_schema.table_constraints AS tc 
-                JOIN information_schema.key_column_usage AS kcu
-                    ON tc.constraint_name = kcu.constraint_name
-                    AND tc.table_schema = kcu.table_schema
-                JOIN information_schema.constraint_column_usage AS ccu
-                    ON ccu.constraint_name = tc.constraint_name
-                    AND ccu.table_schema = tc.table_schema
-                WHERE tc.constraint_type = 'FOREIGN KEY' 
-                AND tc.table_name = %s;
-            """, (table_name,))
-            
-            foreign_keys = cursor.fetchall()
-            if foreign_keys:
-                schema_info.append("FOREIGN KEY RELATIONSHIPS (Node Connections):")
-                schema_info.append("-" * 45)
-                for fk in foreign_keys:
-                    col_name, ref_table, ref_column, constraint_name = fk
-                    schema_info.append(f"• {col_name} → {ref_table}.{ref_column}")
-                schema_info.append("")
-            
-            # 5. Get check constraints and unique constraints
-            cursor.execute("""
-                SELECT constraint_name, check_clause
-                FROM information_schema.check_constraints
-                WHERE constraint_schema = 'public'
-                AND constraint_name IN (
-                    SELECT constraint_name
-                    FROM information_schema.table_constraints
-                    WHERE table_name = %s AND constraint_type = 'CHECK'
-                );
-            """, (table_name,))
-            
-            check_constraints = cursor.fetchall()
-            if check_constraints:
-                schema_info.append("CHECK CONSTRAINTS:")
-                schema_info.append("-" * 20)
-                for constraint in check_constraints:
-                    constraint_name, check_clause = constraint
-                    schema_info.append(f"• {constraint_name}: {check_clause}")
-                schema_info.append("")
-            
-            schema_info.append("") # Extra spacing between tables
-        
-        # Close connection
-        cursor.close()
-        conn.close()
+        # Borrow a connection to the specified database
+        with get_pool(database_name).connection() as conn:
+            cursor = conn.cursor()
+            with phase("execute"):
+                schema = cached_schema(cursor, database_name)
+            cursor.close()
         
-        # Join all schema information
-        schema_text = "\n".join(schema_info)
+        with phase("serialize"):
+            schema_text = render_schema(database_name, schema)
         
         return json.dumps({
             "status": "success",
@@ -339,6 +1355,278 @@ def extract_database_schema(database_name: str) -> str:
             "error": str(e)
         }, indent=2)
 
+
+# # SCHEMA EXTRACTION TOOL
+@mcp.tool(name="postgres_schema_extractor", description="Extract and return the schema of the specified PostgreSQL database in a .txt file format.")
+@instrumentation.tool("postgres_schema_extractor")
+async def extract_database_schema_tool(database_name: str) -> str:
+    """Extract a schema without blocking other tool calls."""
+    return await run_blocking(extract_database_schema, database_name)
+
+
+# ---------------------------
+# Slow-query log and index advisor
+# ---------------------------
+SLOW_QUERY_ORDER = {"total": "total_ms", "mean": "mean_ms"}
+
+# pg_stat_statements renamed total_time/mean_time to total_exec_time/mean_exec_time in PostgreSQL 13
+_SLOW_QUERIES_SQL = """
+    SELECT s.queryid, s.query, s.calls, s.{total} AS total_ms, s.{mean} AS mean_ms, s.rows,
+           s.shared_blks_hit, s.shared_blks_read
+    FROM pg_stat_statements s
+    JOIN pg_catalog.pg_database d ON d.oid = s.dbid
+    WHERE d.datname = current_database()
+    AND s.query NOT ILIKE '%%pg_stat_statements%%'
+    ORDER BY {order} DESC
+    LIMIT %s;
+"""
+
+_PG_STAT_STATEMENTS_HINT = ("Add pg_stat_statements to shared_preload_libraries in postgresql.conf, restart the server "
+                            "and run CREATE EXTENSION pg_stat_statements; in the database.")
+
+
+def slow_queries(database_name: str, limit: int = 10, order_by: str = "total") -> str:
+    """Most expensive statements of a database from pg_stat_statements, with candidate indexes."""
+    if order_by not in SLOW_QUERY_ORDER:
+        return json.dumps({
+            "status": "error",
+            "error": f"Unknown order_by '{order_by}'. Use one of: {', '.join(SLOW_QUERY_ORDER)}"
+        }, indent=2)
+
+    if not database_exists(database_name):
+        return json.dumps({
+            "status": "error",
+            "error": f"Database '{database_name}' does not exist",
+            "available_databases": list_databases()
+        }, indent=2)
+
+    try:
+        with get_pool(database_name).connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1 FROM pg_catalog.pg_extension WHERE extname = 'pg_stat_statements'")
+            if cursor.fetchone() is None:
+                cursor.close()
+                return json.dumps({
+                    "status": "error",
+                    "database": database_name,
+                    "error": f"The pg_stat_statements extension is not installed in database '{database_name}'",
+                    "hint": _PG_STAT_STATEMENTS_HINT
+                }, indent=2)
+            suffix = "exec_time" if conn.server_version >= 130000 else "time"
+            with phase("execute"):
+                cursor.execute(
+                    _SLOW_QUERIES_SQL.format(total=f"total_{suffix}", mean=f"mean_{suffix}", order=SLOW_QUERY_ORDER[order_by]),
+                    (max(1, limit),)
+                )
+            statements = [
+                {
+                    "id": queryid,
+                    "query": query,
+                    "calls": calls,
+                    "total_ms": round(total_ms, 3),
+                    "mean_ms": round(mean_ms, 3),
+                    "rows": rows,
+                    "shared_blks_hit": blks_hit,
+                    "shared_blks_read": blks_read
+                }
+                for queryid, query, calls, total_ms, mean_ms, rows, blks_hit, blks_read in cursor.fetchall()
+            ]
+            with phase("execute"):
+                schema = cached_schema(cursor, database_name)
+            cursor.close()
+
+        return json.dumps({
+            "status": "success",
+            "database": database_name,
+            "source": "pg_stat_statements",
+            "order_by": order_by,
+            "statements": statements,
+            "candidate_indexes": candidate_indexes(statements, schema, "postgres"),
+            "note": "Candidate indexes are derived from statement text; check them with EXPLAIN before creating them."
+        }, indent=2, default=str)
+
+    except psycopg2.errors.ObjectNotInPrerequisiteState as e:
+        # The extension exists but the library was not preloaded
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            "error": str(e).strip(),
+            "hint": _PG_STAT_STATEMENTS_HINT
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            "error": str(e)
+        }, indent=2)
+
+
+#Slow-query log tool
+@mcp.tool(name="postgres_slow_queries", description="Report the most expensive statements of a PostgreSQL database from pg_stat_statements, ordered by total or mean execution time (order_by 'total' or 'mean'), with candidate indexes for the columns they filter, join and sort on that no existing index covers. Use it to find what to tune; verify a candidate with EXPLAIN before creating it.")
+@instrumentation.tool("postgres_slow_queries")
+async def slow_queries_tool(database_name: str, limit: int = 10, order_by: str = "total") -> str:
+    """Read the statement statistics without blocking other tool calls."""
+    return await run_blocking(slow_queries, database_name, limit, order_by)
+
+
+# ---------------------------
+# Table statistics (planner estimates)
+# ---------------------------
+_RELKINDS = {"r": "table", "p": "partitioned table", "m": "materialized view", "f": "foreign table", "v": "view"}
+
+# The planner's own estimate: tuples per page at the last ANALYZE/VACUUM times the pages the table has now
+_TABLE_STATS_SQL = """
+    SELECT c.oid, n.nspname, c.relname, c.relkind, c.reltuples, c.relpages,
+           pg_relation_size(c.oid) / current_setting('block_size')::bigint AS pages,
+           pg_table_size(c.oid), pg_indexes_size(c.oid), pg_total_relation_size(c.oid),
+           s.n_live_tup, s.n_dead_tup, s.n_mod_since_analyze, GREATEST(s.last_analyze, s.last_autoanalyze)
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_catalog.pg_stat_all_tables s ON s.relid = c.oid
+    WHERE c.oid = to_regclass(%s);
+"""
+
+# anyarray has no cast to json; its text form is a valid text[] literal
+_COLUMN_STATS_SQL = """
+    SELECT a.attname, pg_catalog.format_type(a.atttypid, a.atttypmod), s.null_frac, s.avg_width, s.n_distinct,
+           s.correlation, s.most_common_vals::text::text[], s.most_common_freqs
+    FROM pg_catalog.pg_attribute a
+    LEFT JOIN pg_catalog.pg_stats s
+        ON s.schemaname = %s AND s.tablename = %s AND s.attname = a.attname AND s.inherited = %s
+    WHERE a.attrelid = %s AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum;
+"""
+
+
+def _row_estimate(reltuples: float, relpages: int, pages: int, live_tuples: Optional[int]):
+    """(estimate, source) like the planner: reltuples scaled to the current size, else the stats collector."""
+    # reltuples is -1 (PostgreSQL 14+) or 0 with no pages until the table is first vacuumed or analyzed
+    if reltuples >= 0 and relpages > 0:
+        return int(round(reltuples / relpages * pages)), "pg_class.reltuples"
+    if reltuples > 0:
+        return int(reltuples), "pg_class.reltuples"
+    if live_tuples is not None and (live_tuples > 0 or reltuples == 0):
+        return live_tuples, "pg_stat_all_tables.n_live_tup"
+    return None, None
+
+
+def _column_stats(row, row_estimate: Optional[int], most_common: int) -> dict:
+    name, data_type, null_frac, avg_width, n_distinct, correlation, values, freqs = row
+    column = {"name": name, "type": data_type}
+    if null_frac is None:
+        column["analyzed"] = False
+        return column
+    # Negative n_distinct is a fraction of the rows (the column grows with the table)
+    if n_distinct < 0:
+        distinct = int(round(-n_distinct * row_estimate)) if row_estimate is not None else None
+    else:
+        distinct = int(n_distinct)
+    column.update({
+        "null_frac": round(null_frac, 4),
+        "distinct_estimate": distinct,
+        "n_distinct": n_distinct,
+        "avg_width": avg_width,
+        "correlation": round(correlation, 4) if correlation is not None else None,
+        "most_common": [
+            {"value": value, "frequency": round(freq, 4)}
+            for value, freq in list(zip(values or [], freqs or []))[:most_common]
+        ],
+    })
+    return column
+
+
+def table_stats(table_name: str, database_name: str, exact_count: bool = False, columns: bool = True) -> str:
+    """Estimated rows, sizes and per-column planner statistics of a table, without scanning it.
+
+    The estimates come from pg_class and pg_stats and are as fresh as the last ANALYZE (autovacuum runs
+    it as tables change). exact_count adds SELECT count(*), a full scan bound by the statement timeout.
+    """
+    if not database_exists(database_name):
+        return json.dumps({
+            "status": "error",
+            "error": f"Database '{database_name}' does not exist",
+            "available_databases": list_databases()
+        }, indent=2)
+
+    try:
+        with get_pool(database_name).connection() as conn:
+            _bind_call(conn)
+            cursor = conn.cursor()
+            with phase("execute"):
+                cursor.execute(_TABLE_STATS_SQL, (table_name,))
+                row = cursor.fetchone()
+            if row is None:
+                cursor.close()
+                return json.dumps({
+                    "status": "error",
+                    "database": database_name,
+                    "error": f"Table '{table_name}' does not exist in database '{database_name}'",
+                    "hint": "Schema-qualify the name (schema.table) if it is not on the search_path"
+                }, indent=2)
+            (oid, schema, name, relkind, reltuples, relpages, pages, table_bytes, index_bytes, total_bytes,
+             live_tuples, dead_tuples, modified, last_analyzed) = row
+            estimate, source = _row_estimate(reltuples, relpages, pages, live_tuples)
+
+            stats = {
+                "status": "success",
+                "database": database_name,
+                "table": f"{schema}.{name}",
+                "kind": _RELKINDS.get(relkind, relkind),
+                "row_estimate": estimate,
+                "estimate_source": source,
+                "size": {
+                    "table_bytes": table_bytes,
+                    "index_bytes": index_bytes,
+                    "total_bytes": total_bytes,
+                },
+                "dead_rows": dead_tuples,
+                "modified_since_analyze": modified,
+                "last_analyzed": last_analyzed,
+            }
+
+            if columns:
+                with phase("execute"):
+                    cursor.execute(_COLUMN_STATS_SQL, (schema, name, relkind == "p", oid))
+                    rows = cursor.fetchall()
+                stats["columns"] = [_column_stats(column, estimate, max(0, TABLE_STATS_MOST_COMMON)) for column in rows]
+
+            if exact_count:
+                started = time.perf_counter()
+                with phase("execute"):
+                    cursor.execute(psycopg2.sql.SQL("SELECT count(*) FROM {}").format(psycopg2.sql.Identifier(schema, name)))
+                    stats["exact_row_count"] = cursor.fetchone()[0]
+                stats["count_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            cursor.close()
+
+        if last_analyzed is None:
+            stats["hint"] = f"The table has not been analyzed yet; run ANALYZE {schema}.{name} for planner statistics"
+        with phase("serialize"):
+            return json.dumps(stats, indent=2, default=str)
+
+    except psycopg2.errors.QueryCanceled as e:
+        cancel = _cancel_error(e, STATEMENT_TIMEOUT)
+        if cancel.get("timed_out") and exact_count:
+            cancel["hint"] = "The exact count timed out; use row_estimate, or count with a filter"
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            **cancel
+        }, indent=2)
+    except Exception as e:
+        return json.dumps({
+            "status": "error",
+            "database": database_name,
+            "error": str(e)
+        }, indent=2)
+
+
+#Table statistics tool
+@mcp.tool(name="postgres_table_stats", description="Answer 'how many rows / how big is this table' instantly from PostgreSQL planner statistics instead of SELECT COUNT(*): estimated row count, table and index sizes, and per column the null fraction, distinct-value estimate and most common values with their frequencies. table_name may be schema-qualified. Set exact_count=true only when the user needs the exact number; it scans the whole table. columns=false skips the per-column statistics.")
+@instrumentation.tool("postgres_table_stats")
+async def table_stats_tool(table_name: str, database_name: str, exact_count: bool = False, columns: bool = True) -> str:
+    """Read the table statistics without blocking other tool calls."""
+    return await run_cancellable(table_stats, table_name, database_name, exact_count, columns)
+
 if __name__ == "__main__":
     # print("Starting Postgres Server...")
     mcp.run(transport="stdio")
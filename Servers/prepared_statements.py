@@ -0,0 +1,129 @@
+"""
+prepared_statements.py
+
+Per-connection LRU of server-side prepared statements for parameterized queries.
+
+Queries passed with params use driver placeholders (%s, %% for a literal percent sign). A template
+that runs again on the same connection is prepared once (PREPARE ... AS / PREPARE ... FROM) and later
+calls only send EXECUTE with the new values, so the server skips parsing (and on PostgreSQL planning).
+Templates are prepared after `threshold` uses per connection; each connection keeps at most
+`max_per_connection` statements and deallocates the least recently used one beyond that.
+
+State hangs off the connection object through a WeakKeyDictionary, so it goes away with the
+connection. invalidate(database) marks every connection's statements for that database stale after
+DDL; they are deallocated on the connection's next checkout.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+
+class _ConnectionStatements:
+    __slots__ = ("statements", "uses", "generations", "next_id")
+
+    def __init__(self):
+        self.statements: "OrderedDict[tuple, str]" = OrderedDict()  # key -> statement name
+        self.uses: "OrderedDict[tuple, int]" = OrderedDict()        # key -> runs before preparing
+        self.generations = {}                                         # database -> generation seen
+        self.next_id = 0
+
+
+class PreparedStatementCache:
+    """Thread-safe registry of per-connection prepared statement LRUs."""
+
+    def __init__(self, engine: str, *, max_per_connection: int = 100, threshold: int = 2):
+        self.engine = engine
+        self.max_per_connection = max_per_connection
+        self.threshold = max(1, threshold)
+        self._lock = threading.Lock()
+        self._connections: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._generations = {}
+        self.counters = {"executions": 0, "hits": 0, "prepares": 0, "evictions": 0, "invalidations": 0,
+                         "unprepared": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_per_connection > 0
+
+    def checkout(self, conn, database_name: str, key: tuple) -> Tuple[Optional[str], bool, List[str]]:
+        """Decide how to run key on conn.
+
+        Returns (statement name or None to run unprepared, already prepared, names to deallocate first).
+        Call prepared() once a new name has been prepared successfully.
+        """
+        with self._lock:
+            self.counters["executions"] += 1
+            state = self._connections.get(conn)
+            if state is None:
+                state = self._connections[conn] = _ConnectionStatements()
+
+            stale = []
+            generation = self._generations.get(database_name, 0)
+            if state.generations.get(database_name, 0) != generation:
+                # DDL ran since these statements were prepared
+                for old_key in [k for k in state.statements if k[0] == database_name]:
+                    stale.append(state.statements.pop(old_key))
+                state.generations[database_name] = generation
+
+            name = state.statements.get(key)
+            if name is not None:
+                state.statements.move_to_end(key)
+                self.counters["hits"] += 1
+                return name, True, stale
+
+            uses = state.uses.pop(key, 0) + 1
+            if not self.enabled or uses < self.threshold:
+                state.uses[key] = uses
+                while len(state.uses) > max(self.max_per_connection, 1) * 4:
+                    state.uses.popitem(last=False)
+                self.counters["unprepared"] += 1
+                return None, False, stale
+
+            while len(state.statements) >= self.max_per_connection:
+                _, old_name = state.statements.popitem(last=False)
+                stale.append(old_name)
+                self.counters["evictions"] += 1
+            state.next_id += 1
+            return f"mcp_stmt_{state.next_id}", False, stale
+
+    def prepared(self, conn, key: tuple, name: str):
+        """Record a statement that was prepared successfully on conn."""
+        with self._lock:
+            state = self._connections.get(conn)
+            if state is not None:
+                state.statements[key] = name
+                self.counters["prepares"] += 1
+
+    def forget(self, conn, key: tuple):
+        """Drop a statement the server no longer knows (e.g. after a failed EXECUTE)."""
+        with self._lock:
+            state = self._connections.get(conn)
+            if state is not None:
+                state.statements.pop(key, None)
+
+    def invalidate(self, database_name: str):
+        """Mark every connection's statements for database_name stale (after DDL)."""
+        with self._lock:
+            self._generations[database_name] = self._generations.get(database_name, 0) + 1
+            self.counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            executions = self.counters["executions"]
+            return {
+                "engine": self.engine,
+                "enabled": self.enabled,
+                "connections": len(self._connections),
+                "statements": sum(len(state.statements) for state in self._connections.values()),
+                "max_per_connection": self.max_per_connection,
+                "threshold": self.threshold,
+                "hit_ratio": round(self.counters["hits"] / executions, 4) if executions else None,
+                **self.counters,
+            }
+
+
+def statement_key(database_name: str, sql_query: str, params: Sequence, types: Sequence[str] = ()) -> tuple:
+    """Cache key of a template: database, SQL text, number of values and their declared types."""
+    return database_name, sql_query, len(params), tuple(types)
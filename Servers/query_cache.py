@@ -0,0 +1,113 @@
+"""
+query_cache.py
+
+LRU cache of read-query results with table-level invalidation.
+
+Entries are keyed on (database, normalized SQL, extra key parts such as the result format) and
+bounded by entry count, total bytes and a TTL. Each entry records the tables its query read;
+a write through the executor evicts every entry that read one of the written tables (or every
+entry of the database when the written tables are unknown).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Sequence
+
+
+class _CacheEntry:
+    __slots__ = ("database", "colnames", "rows", "tables", "size", "created_at")
+
+    def __init__(self, database, colnames, rows, tables, size):
+        self.database = database
+        self.colnames = colnames
+        self.rows = rows
+        self.tables = tables
+        self.size = size
+        self.created_at = time.monotonic()
+
+
+class QueryResultCache:
+    """Thread-safe LRU of (colnames, rows) results bounded by entries, bytes and TTL."""
+
+    def __init__(self, engine: str, *, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024,
+                 ttl: float = 60.0):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expirations": 0,
+                         "invalidations": 0, "too_large": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: tuple) -> Optional[_CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if time.monotonic() - entry.created_at > self.ttl:
+                self._remove_locked(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry
+
+    def put(self, key: tuple, database: str, colnames: List[str], rows: Sequence, tables: Iterable[str], size: int):
+        """Store a result; size is its byte size as already encoded for the response (no re-encoding here)."""
+        with self._lock:
+            if size > self.max_bytes // 4:
+                self.counters["too_large"] += 1
+                return
+            if key in self._entries:
+                self._remove_locked(key)
+            self._entries[key] = _CacheEntry(database, colnames, rows, frozenset(tables), size)
+            self._bytes += size
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove_locked(oldest)
+                self.counters["evictions"] += 1
+
+    def invalidate(self, database: Optional[str] = None, tables: Optional[Iterable[str]] = None) -> int:
+        """Evict entries that read any of tables (in any database, since queries may be qualified),
+        or every entry of database when tables is None, or everything when both are None."""
+        tables = set(tables) if tables is not None else None
+        with self._lock:
+            if tables is not None:
+                doomed = [k for k, e in self._entries.items() if e.tables & tables]
+            elif database is not None:
+                doomed = [k for k, e in self._entries.items() if e.database == database]
+            else:
+                doomed = list(self._entries)
+            for key in doomed:
+                self._remove_locked(key)
+            self.counters["invalidations"] += len(doomed)
+        return len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                "engine": self.engine,
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else None,
+                **self.counters,
+            }
+
+    def _remove_locked(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
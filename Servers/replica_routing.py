@@ -0,0 +1,134 @@
+"""
+replica_routing.py
+
+Read-replica routing shared by the database servers.
+
+A server is configured with its primary and optional replicas. Statements the SQL classifier finds
+replica-safe (sql_utils.is_replica_safe: plain reads without locking clauses, sequences or session
+state) are sent to the replicas in turn; everything else goes to the primary. A read falls back to
+the primary when:
+  - the database was written through this server less than read_after_write seconds ago, so an
+    agent reading back its own INSERT sees it;
+  - connecting to the replica failed within the last check_interval seconds;
+  - max_lag is set and the replica's replication lag, measured on a borrowed connection at most
+    once per check_interval, is above max_lag or unknown.
+The servers borrow the connections and measure the lag (engine-specific SQL); the router only keeps
+the state and the counters.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+
+class ReplicaRouter:
+    """Round-robin choice among the healthy replicas of one server, with lag and read-after-write fallback."""
+
+    def __init__(self, engine: str, replicas: Sequence[str], *, max_lag: float = 0.0, check_interval: float = 5.0,
+                 read_after_write: float = 5.0):
+        self.engine = engine
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.read_after_write = read_after_write
+        self._lock = threading.Lock()
+        self._next = 0
+        self._state: Dict[str, dict] = {
+            name: {"lag": None, "checked": None, "lagging": False, "failed_until": 0.0, "error": None}
+            for name in self.replicas
+        }
+        self._written: Dict[str, float] = {}  # database -> time of the last write through this server
+        self.counters = {"replica_reads": 0, "primary_reads": 0, "fallback_read_after_write": 0,
+                         "fallback_unavailable": 0, "fallback_lag": 0, "fallback_error": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self, database_name: str) -> Optional[str]:
+        """Replica for a replica-safe read of database_name, or None to read from the primary."""
+        if not self.replicas:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            written = self._written.get(database_name)
+            if written is not None and now - written < self.read_after_write:
+                self.counters["fallback_read_after_write"] += 1
+                self.counters["primary_reads"] += 1
+                return None
+            for _ in range(len(self.replicas)):
+                name = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+                state = self._state[name]
+                if state["failed_until"] > now:
+                    continue
+                if state["lagging"] and not self._check_due(state, now):
+                    continue
+                self.counters["replica_reads"] += 1
+                return name
+            self.counters["fallback_unavailable"] += 1
+            self.counters["primary_reads"] += 1
+            return None
+
+    def lag_check_due(self, name: str) -> bool:
+        """True when the replica's lag has to be measured before it serves this read."""
+        if not self.max_lag:
+            return False
+        with self._lock:
+            return self._check_due(self._state[name], time.monotonic())
+
+    def report_lag(self, name: str, lag: Optional[float]) -> bool:
+        """Record a lag measurement (None: unknown); returns whether the replica may serve the read."""
+        with self._lock:
+            state = self._state[name]
+            state["lag"] = lag
+            state["checked"] = time.monotonic()
+            state["lagging"] = lag is None or lag > self.max_lag
+            state["error"] = None
+            if state["lagging"]:
+                self._fell_back("fallback_lag")
+            return not state["lagging"]
+
+    def report_failure(self, name: str, error: BaseException):
+        """A replica could not be used: reads skip it for check_interval seconds."""
+        with self._lock:
+            state = self._state[name]
+            state["failed_until"] = time.monotonic() + self.check_interval
+            state["error"] = f"{type(error).__name__}: {error}"
+            self._fell_back("fallback_error")
+
+    def note_write(self, database_name: str):
+        """A statement wrote to database_name through the primary."""
+        if self.replicas and self.read_after_write > 0:
+            with self._lock:
+                self._written[database_name] = time.monotonic()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            replicas = {
+                name: {
+                    "lag_seconds": state["lag"],
+                    "lag_checked_seconds_ago": round(now - state["checked"], 1) if state["checked"] is not None else None,
+                    "available": state["failed_until"] <= now and not state["lagging"],
+                    "last_error": state["error"],
+                }
+                for name, state in self._state.items()
+            }
+            return {
+                "engine": self.engine,
+                "max_lag": self.max_lag,
+                "check_interval": self.check_interval,
+                "read_after_write": self.read_after_write,
+                "replicas": replicas,
+                **self.counters,
+            }
+
+    def _check_due(self, state: dict, now: float) -> bool:
+        return state["checked"] is None or now - state["checked"] >= self.check_interval
+
+    def _fell_back(self, reason: str):
+        # The read counted for the replica in choose() goes to the primary after all
+        self.counters["replica_reads"] -= 1
+        self.counters["primary_reads"] += 1
+        self.counters[reason] += 1
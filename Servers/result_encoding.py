@@ -0,0 +1,66 @@
+"""
+result_encoding.py
+
+Encodings for query results returned by the database servers.
+
+  - "json"     (default): list of row objects, pretty-printed. Unchanged legacy format.
+  - "columnar": one "columns" header plus "rows" arrays, serialized without indentation.
+  - "csv" / "tsv": header line plus one text line per row in "data".
+
+Every format other than "json" is serialized compactly, with orjson when it is installed
+(falls back to the standard json module with compact separators).
+"""
+
+import csv
+import io
+import json
+from typing import List, Sequence
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+RESULT_FORMATS = ("json", "columnar", "csv", "tsv")
+
+
+def validate_format(result_format: str) -> str:
+    """Normalize result_format, raising ValueError for unknown formats."""
+    normalized = (result_format or "json").strip().lower()
+    if normalized not in RESULT_FORMATS:
+        raise ValueError(f"Unknown result_format '{result_format}'. Use one of: {', '.join(RESULT_FORMATS)}")
+    return normalized
+
+
+def encode_rows(colnames: List[str], rows: Sequence[Sequence], result_format: str = "json") -> dict:
+    """Return the response fields carrying the rows in the requested format."""
+    if result_format == "json":
+        if colnames and rows:
+            return {"data": [dict(zip(colnames, row)) for row in rows]}
+        return {"data": rows}
+    if result_format == "columnar":
+        return {"columns": colnames, "rows": [list(row) for row in rows]}
+    return {"data": _delimited(colnames, rows, "," if result_format == "csv" else "\t")}
+
+
+def dumps(payload: dict, result_format: str = "json") -> str:
+    """Serialize a response: legacy pretty JSON for "json", compact (and orjson if available) otherwise."""
+    if result_format == "json":
+        return json.dumps(payload, indent=2, default=str)
+    if orjson is not None:
+        try:
+            # Datetimes go through str() as well so both backends produce the same text
+            return orjson.dumps(payload, default=str, option=orjson.OPT_PASSTHROUGH_DATETIME).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits
+    return json.dumps(payload, default=str, separators=(",", ":"), ensure_ascii=False)
+
+
+def _delimited(colnames: List[str], rows: Sequence[Sequence], delimiter: str) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    if colnames:
+        writer.writerow(colnames)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+    return buffer.getvalue()
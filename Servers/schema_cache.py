@@ -0,0 +1,130 @@
+"""
+schema_cache.py
+
+Persistent cache of extracted schemas, one entry per (engine, database).
+
+Entries live in memory and in a JSON file per database under SCHEMA_CACHE_DIR, so repeat
+schema requests are served without re-reading the catalog, even right after a restart.
+Every entry carries the catalog fingerprint it was extracted under; a lookup with a
+different fingerprint, or of an entry written for an older schema structure, is a miss.
+Servers also invalidate a database explicitly when query_data runs DDL against it.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+from urllib.parse import quote
+
+from loguru import logger
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "multi_database_mcp", "schema")
+
+# Bumped whenever load_schema adds keys, so entries written by older versions are re-extracted
+SCHEMA_FORMAT = 2
+
+
+class SchemaCache:
+    """Fingerprint-validated schema cache backed by one JSON file per database."""
+
+    def __init__(self, engine: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        self.engine = engine
+        # An empty cache_dir keeps the cache in memory only
+        self.cache_dir = os.path.join(cache_dir, engine) if cache_dir else None
+        self._lock = threading.Lock()
+        self._memory = {}
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+
+    def get(self, database_name: str, fingerprint: str) -> Optional[dict]:
+        """Cached schema for database_name, or None if missing or extracted under another fingerprint."""
+        with self._lock:
+            entry = self._memory.get(database_name)
+        source = "hits"
+        if entry is None:
+            entry = self._read(database_name)
+            source = "disk_hits"
+        with self._lock:
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            if entry.get("format") != SCHEMA_FORMAT or entry["fingerprint"] != fingerprint:
+                self.counters["stale"] += 1
+                self._memory.pop(database_name, None)
+                return None
+            self._memory[database_name] = entry
+            self.counters[source] += 1
+            return entry["schema"]
+
+    def put(self, database_name: str, fingerprint: str, schema: dict):
+        entry = {
+            "engine": self.engine,
+            "database": database_name,
+            "fingerprint": fingerprint,
+            "format": SCHEMA_FORMAT,
+            "extracted_at": time.time(),
+            "schema": schema,
+        }
+        with self._lock:
+            self._memory[database_name] = entry
+        self._write(database_name, entry)
+
+    def invalidate(self, database_name: str):
+        """Drop the entry of a database (called after DDL ran through the executor)."""
+        with self._lock:
+            self._memory.pop(database_name, None)
+            self.counters["invalidations"] += 1
+        path = self._path(database_name)
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove schema cache file {path}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "engine": self.engine,
+                "cache_dir": self.cache_dir,
+                "databases_in_memory": len(self._memory),
+                **self.counters,
+            }
+
+    def _path(self, database_name: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, quote(database_name, safe="") + ".json")
+
+    def _read(self, database_name: str) -> Optional[dict]:
+        path = self._path(database_name)
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable schema cache file {path}: {e}")
+            return None
+
+    def _write(self, database_name: str, entry: dict):
+        path = self._path(database_name)
+        if path is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, default=str)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write schema cache file {path}: {e}")
@@ -0,0 +1,92 @@
+"""
+schema_report.py
+
+Plain-text schema report shared by the PostgreSQL and MySQL schema extractor tools.
+
+Both servers load their catalog into the same structure:
+    {table_name: {"columns": [{"name", "data_type", "nullable", "default", "max_length"}],
+                  "primary_keys": [column_name],
+                  "foreign_keys": [{"column", "ref_table", "ref_column", "constraint"}],
+                  "checks": [{"name", "clause"}],
+                  "indexes": [{"name", "columns", "unique", "predicate"}]}}
+Index columns are in key order; an expression key part is None.
+"""
+
+
+def render_schema(database_name: str, schema: dict) -> str:
+    """Format a loaded schema as the plain-text report returned by the schema extractor tools."""
+    schema_info = []
+    schema_info.append(f"DATABASE SCHEMA: {database_name}")
+    schema_info.append("=" * 50)
+    schema_info.append("")
+    
+    # 1. Table names
+    schema_info.append("TABLE NAMES (Node Types):")
+    schema_info.append("-" * 30)
+    for table_name in schema:
+        schema_info.append(f"• {table_name}")
+    schema_info.append("")
+    
+    # 2. Column definitions and constraints per table
+    for table_name, table in schema.items():
+        schema_info.append(f"TABLE: {table_name}")
+        schema_info.append("=" * 40)
+        
+        schema_info.append("COLUMNS (Attributes/Properties):")
+        schema_info.append("-" * 35)
+        
+        for col in table["columns"]:
+            # Format column info
+            col_info = f"• {col['name']}: {col['data_type']}"
+            if col["max_length"]:
+                col_info += f"({col['max_length']})"
+            if not col["nullable"]:
+                col_info += " NOT NULL"
+            if col["default"]:
+                col_info += f" DEFAULT {col['default']}"
+            
+            schema_info.append(col_info)
+        
+        schema_info.append("")
+        
+        # 3. Primary keys
+        if table["primary_keys"]:
+            schema_info.append("PRIMARY KEYS:")
+            schema_info.append("-" * 15)
+            for pk in table["primary_keys"]:
+                schema_info.append(f"• {pk}")
+            schema_info.append("")
+        
+        # 4. Foreign key relationships
+        if table["foreign_keys"]:
+            schema_info.append("FOREIGN KEY RELATIONSHIPS (Node Connections):")
+            schema_info.append("-" * 45)
+            for fk in table["foreign_keys"]:
+                schema_info.append(f"• {fk['column']} → {fk['ref_table']}.{fk['ref_column']}")
+            schema_info.append("")
+        
+        # 5. Check constraints
+        if table["checks"]:
+            schema_info.append("CHECK CONSTRAINTS:")
+            schema_info.append("-" * 20)
+            for constraint in table["checks"]:
+                schema_info.append(f"• {constraint['name']}: {constraint['clause']}")
+            schema_info.append("")
+        
+        # 6. Indexes
+        if table["indexes"]:
+            schema_info.append("INDEXES:")
+            schema_info.append("-" * 10)
+            for index in table["indexes"]:
+                columns = ", ".join(col if col is not None else "<expression>" for col in index["columns"])
+                index_info = f"• {index['name']} ({columns})"
+                if index["unique"]:
+                    index_info += " UNIQUE"
+                if index["predicate"]:
+                    index_info += f" WHERE {index['predicate']}"
+                schema_info.append(index_info)
+            schema_info.append("")
+        
+        schema_info.append("") # Extra spacing between tables
+    
+    return "\n".join(schema_info)
@@ -0,0 +1,374 @@
+"""
+sql_utils.py
+
+Lightweight SQL text helpers shared by the database servers.
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+_LEADING_COMMENTS = re.compile(r"^(?:\s+|--[^\n]*(?:\n|$)|/\*.*?\*/)*", re.S)
+
+
+def strip_leading_comments(sql_query: str) -> str:
+    """Drop whitespace and -- / /* */ comments in front of the first keyword."""
+    return _LEADING_COMMENTS.sub("", sql_query, count=1)
+
+
+def database_ddl(sql_query: str, keywords: Sequence[str] = ("DATABASE",)) -> Optional[Tuple[str, str]]:
+    """Detect CREATE/DROP/ALTER DATABASE statements.
+
+    Returns (verb, database_name) or None. Unquoted names are returned as written;
+    callers apply their engine's identifier folding.
+    """
+    pattern = re.compile(
+        r"(CREATE|DROP|ALTER)\s+(?:%s)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?"
+        r"(`[^`]+`|\"[^\"]+\"|[^\s;]+)" % "|".join(keywords),
+        re.I,
+    )
+    match = pattern.match(strip_leading_comments(sql_query))
+    if match is None:
+        return None
+    return match.group(1).upper(), match.group(2)
+
+
+_DDL_KEYWORDS = ("CREATE", "ALTER", "DROP", "RENAME", "COMMENT")
+
+
+def is_ddl(sql_query: str) -> bool:
+    """True for statements that can change a schema (CREATE/ALTER/DROP/RENAME/COMMENT)."""
+    words = strip_leading_comments(sql_query).split(None, 1)
+    return bool(words) and words[0].upper() in _DDL_KEYWORDS
+
+
+_NAME_PART = re.compile(r'"((?:[^"]|"")*)"|([^."]+)')
+
+
+def folded_name_parts(name: str) -> List[str]:
+    """Parts of a (possibly schema-qualified) PostgreSQL name as the server resolves them: unquoted
+    parts fold to lower case, "quoted" parts keep their case (dots inside quotes do not split)."""
+    parts = []
+    for quoted, plain in _NAME_PART.findall(name):
+        if plain:
+            if plain.strip():
+                parts.append(plain.strip().lower())
+        else:
+            parts.append(quoted.replace('""', '"'))
+    return parts
+
+
+# ---------------------------
+# Tokenizer and statement classification
+# ---------------------------
+# Comments and whitespace are skipped; string literals, quoted identifiers and dollar-quoted bodies are
+# single tokens, so keywords inside them are never mistaken for SQL
+_TOKEN = re.compile(
+    r"""(?P<skip>\s+|--[^\n]*|/\*.*?(?:\*/|$))"""
+    r"""|(?P<string>[EeNnBbXx]?'(?:[^']|'')*'|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$)"""
+    r"""|(?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`)"""
+    r"""|(?P<word>[A-Za-z_][\w$]*)"""
+    r"""|(?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?|\.\d+)"""
+    r"""|(?P<punct>[(),;])"""
+    r"""|(?P<other>.)""",
+    re.S,
+)
+
+# Commands that only read; EXPLAIN reads unless it ANALYZEs a write
+_READ_COMMANDS = {"SELECT", "VALUES", "TABLE", "SHOW", "DESCRIBE", "DESC", "EXPLAIN"}
+# Commands a query (and a server-side cursor) can be made of
+_QUERY_COMMANDS = {"SELECT", "VALUES", "TABLE"}
+_DML_COMMANDS = {"INSERT", "UPDATE", "DELETE", "MERGE", "REPLACE"}
+_STATEMENT_COMMANDS = _QUERY_COMMANDS | _DML_COMMANDS
+# Functions that write (sequences, large objects, xid assignment, session settings) or act on other sessions
+_WRITING_FUNCTIONS = {"NEXTVAL", "SETVAL", "SET_CONFIG", "TXID_CURRENT", "PG_CURRENT_XACT_ID", "LO_CREATE", "LO_IMPORT",
+                      "LO_UNLINK", "LO_FROM_BYTEA", "LO_PUT", "DBLINK_EXEC", "PG_TERMINATE_BACKEND",
+                      "PG_CANCEL_BACKEND", "PG_RELOAD_CONF"}
+
+
+class Token(NamedTuple):
+    kind: str   # word, string, quoted, number, punct or other
+    text: str   # as written; words are upper-cased
+    depth: int  # parenthesis depth the token is at
+
+
+class StatementInfo(NamedTuple):
+    """What a piece of SQL does, as far as the text tells.
+
+    command    effective command of the first statement: the statement after a WITH list, after
+               leading parentheses, or EXPLAIN; "" for empty text
+    statements number of (non-empty) statements
+    writes     may change data, schema or server state (DML, DDL, data-modifying CTEs, SELECT INTO,
+               writing functions, EXPLAIN ANALYZE of a write, and any command not known to only read)
+    locking    takes row locks (FOR UPDATE / FOR SHARE / LOCK IN SHARE MODE)
+    read_only  a single read statement (not USE) that neither writes nor locks: it can run in autocommit or a READ ONLY
+               transaction and needs no COMMIT
+    query      a single SELECT / VALUES / TABLE without writes, which a server-side cursor can stream
+    functions  names of the functions called, upper-cased
+    """
+    command: str
+    statements: int
+    writes: bool
+    locking: bool
+    read_only: bool
+    query: bool
+    functions: frozenset
+
+
+def tokenize(sql_query: str) -> List[Token]:
+    """Tokens of SQL text without whitespace and comments."""
+    tokens, depth = [], 0
+    for match in _TOKEN.finditer(sql_query):
+        kind = match.lastgroup if match.lastgroup != "tag" else "string"
+        if kind == "skip":
+            continue
+        text = match.group(kind)
+        if kind == "word":
+            text = text.upper()
+        elif kind == "punct" and text == ")":
+            depth = max(0, depth - 1)
+        tokens.append(Token(kind, text, depth))
+        if kind == "punct" and text == "(":
+            depth += 1
+    return tokens
+
+
+def _split_statements(tokens: List[Token]) -> List[List[Token]]:
+    statements, current = [], []
+    for token in tokens:
+        if token.kind == "punct" and token.text == ";" and token.depth == 0:
+            if current:
+                statements.append(current)
+            current = []
+        else:
+            current.append(token)
+    if current:
+        statements.append(current)
+    return statements
+
+
+def _is_command(tokens: List[Token], i: int) -> bool:
+    """A DML word at tokens[i] starts a statement: first token or first in parentheses (a CTE body),
+    followed by a name rather than "(" (MySQL's INSERT() / REPLACE() functions) or an operator."""
+    if i > 0 and not (tokens[i - 1].kind == "punct" and tokens[i - 1].text == "("):
+        return False
+    return i + 1 < len(tokens) and tokens[i + 1].kind in ("word", "quoted")
+
+
+def _classify_tokens(tokens: List[Token]) -> Tuple[str, bool, bool, set]:
+    """(command, writes, locking, functions) of one statement."""
+    words = [(i, token) for i, token in enumerate(tokens) if token.kind == "word"]
+    if not words:
+        return "", False, False, set()
+    functions = {token.text for i, token in words
+                 if i + 1 < len(tokens) and tokens[i + 1].kind == "punct" and tokens[i + 1].text == "("}
+    base = words[0][1].depth
+    command = words[0][1].text
+    if command == "WITH":
+        # The main statement is the first command keyword back at the WITH's own level
+        command = next((token.text for _, token in words[1:]
+                        if token.depth == base and token.text in _STATEMENT_COMMANDS), "SELECT")
+    if command == "EXPLAIN":
+        start = next((i for i, token in words[1:] if token.depth == base and
+                      (token.text in _STATEMENT_COMMANDS or token.text == "WITH")), None)
+        options = {token.text for i, token in words[1:] if start is None or i < start}
+        if start is None or not options & {"ANALYZE", "ANALYSE"}:
+            return "EXPLAIN", False, False, functions
+        _, writes, locking, inner_functions = _classify_tokens(tokens[start:])
+        return "EXPLAIN", writes, locking, functions | inner_functions
+
+    texts = [token.text for _, token in words]
+    locking = any(
+        texts[j] == "FOR" and j + 1 < len(texts) and texts[j + 1] in ("UPDATE", "SHARE", "NO", "KEY")
+        or texts[j:j + 4] == ["LOCK", "IN", "SHARE", "MODE"]
+        for j in range(len(texts))
+    )
+    if command == "USE":
+        return command, False, False, functions
+    if command not in _READ_COMMANDS:
+        return command, True, locking, functions
+    # Data-modifying CTEs; DML words elsewhere are functions, columns or clauses (FOR UPDATE, DO UPDATE)
+    writes = any(token.text in _DML_COMMANDS and _is_command(tokens, i) for i, token in words)
+    # SELECT ... INTO creates a table (PostgreSQL) or writes variables / files (MySQL)
+    writes = writes or (command == "SELECT" and any(token.text == "INTO" and token.depth == base for _, token in words))
+    writes = writes or bool(functions & _WRITING_FUNCTIONS)
+    return command, writes, locking, functions
+
+
+def classify(sql_query: str) -> StatementInfo:
+    """Classify SQL text from its tokens (see StatementInfo)."""
+    statements = _split_statements(tokenize(sql_query))
+    if not statements:
+        return StatementInfo("", 0, False, False, False, False, frozenset())
+    results = [_classify_tokens(tokens) for tokens in statements]
+    command = results[0][0]
+    writes = any(result[1] for result in results)
+    locking = any(result[2] for result in results)
+    single = len(statements) == 1
+    read_only = single and command in _READ_COMMANDS and not writes and not locking
+    return StatementInfo(
+        command=command,
+        statements=len(statements),
+        writes=writes,
+        locking=locking,
+        read_only=read_only,
+        query=single and command in _QUERY_COMMANDS and not writes,
+        functions=frozenset().union(*(result[3] for result in results)),
+    )
+
+
+# ---------------------------
+# Normalization and table extraction (used by the query result cache)
+# ---------------------------
+# Quoted literals/identifiers are kept verbatim; comments are dropped; whitespace is collapsed
+_SQL_PARTS = re.compile(
+    r"""(?P<literal>'(?:[^']|'')*'|"(?:[^"]|"")*"|`(?:[^`]|``)*`)"""
+    r"""|(?P<comment>--[^\n]*|/\*.*?\*/)"""
+    r"""|(?P<space>\s+)""",
+    re.S,
+)
+
+
+def normalize_sql(sql_query: str) -> str:
+    """Canonical text for cache keys: comments removed, whitespace collapsed, trailing ';' dropped."""
+    def _replace(match):
+        if match.group("literal") is not None:
+            return match.group("literal")
+        return " "
+    return _SQL_PARTS.sub(_replace, sql_query).strip().rstrip(";").strip()
+
+
+def _without_literals(sql_query: str) -> str:
+    """SQL text with string literals blanked out and comments removed, for keyword scanning."""
+    def _replace(match):
+        literal = match.group("literal")
+        if literal is not None and literal.startswith("'"):
+            return "''"
+        return match.group(0) if literal is not None else " "
+    return _SQL_PARTS.sub(_replace, sql_query)
+
+
+_IDENTIFIER = r'(?:`[^`]+`|"[^"]+"|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|"[^"]+"|[\w$]+))*'
+_CLAUSE_WORDS = (r"(?!(?:JOIN|ON|USING|WHERE|INNER|LEFT|RIGHT|FULL|OUTER|CROSS|NATURAL|STRAIGHT_JOIN|LATERAL|GROUP"
+                 r"|ORDER|HAVING|WINDOW|LIMIT|OFFSET|FETCH|FOR|UNION|EXCEPT|INTERSECT|RETURNING|SET|VALUES)\b)")
+_ALIAS = r"(?:\s+(?:AS\s+)?%s[\w$]+)?" % _CLAUSE_WORDS
+_READ_TABLES = re.compile(r"\b(?:FROM|JOIN)\s+(%s)(%s(?:\s*,\s*%s%s)*)"
+                          % (_IDENTIFIER, _ALIAS, _IDENTIFIER, _ALIAS), re.I)
+_LIST_ITEM = re.compile(r",\s*(%s)" % _IDENTIFIER)
+_WRITE_TARGETS = re.compile(
+    r"^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE(?:\s+ONLY)?|DELETE\s+FROM(?:\s+ONLY)?|MERGE\s+INTO"
+    r"|TRUNCATE(?:\s+TABLE)?(?:\s+ONLY)?|COPY|LOAD\s+DATA.*?\bINTO\s+TABLE"
+    r"|(?:CREATE|ALTER|DROP)\s+(?:(?:GLOBAL\s+|LOCAL\s+)?(?:TEMPORARY\s+|TEMP\s+|UNLOGGED\s+)?TABLE"
+    r"|(?:MATERIALIZED\s+)?VIEW)(?:\s+IF\s+(?:NOT\s+)?EXISTS)?"
+    r"|REFRESH\s+MATERIALIZED\s+VIEW(?:\s+CONCURRENTLY)?)\s+(%s(?:\s*,\s*%s)*)"
+    % (_IDENTIFIER, _IDENTIFIER),
+    re.I | re.S,
+)
+_NON_CACHEABLE = re.compile(
+    r"\b(?:FOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)|INTO|NOW|RANDOM|RAND|UUID|UUID_SHORT"
+    r"|GEN_RANDOM_UUID|CURRENT_DATE|CURRENT_TIME|CURRENT_TIMESTAMP|LOCALTIME|LOCALTIMESTAMP|SYSDATE"
+    r"|CLOCK_TIMESTAMP|STATEMENT_TIMESTAMP|TIMEOFDAY|NEXTVAL|CURRVAL|SETVAL|LASTVAL|LAST_INSERT_ID"
+    r"|PG_SLEEP|SLEEP|GET_LOCK|PG_ADVISORY_LOCK|TXID_CURRENT|FOUND_ROWS)\b",
+    re.I,
+)
+
+
+def _table_name(identifier: str) -> str:
+    """Last component of a (possibly qualified, possibly quoted) name, unquoted and lower-cased."""
+    last = re.split(r"\s*\.\s*", identifier.strip())[-1]
+    return last.strip('`"').lower()
+
+
+def referenced_tables(sql_query: str) -> set:
+    """Names of the tables a query reads (FROM / JOIN lists), without schema qualifiers."""
+    text = _without_literals(sql_query)
+    tables = set()
+    for match in _READ_TABLES.finditer(text):
+        tables.add(_table_name(match.group(1)))
+        for item in _LIST_ITEM.finditer(match.group(2) or ""):
+            tables.add(_table_name(item.group(1)))
+    return tables
+
+
+def written_tables(sql_query: str) -> Optional[set]:
+    """Names of the tables a DML/DDL statement writes, or None if they cannot be determined."""
+    match = _WRITE_TARGETS.match(_without_literals(sql_query))
+    if match is None:
+        return None
+    return {_table_name(part) for part in re.split(r"\s*,\s*", match.group(1))}
+
+
+def may_write(sql_query: str) -> bool:
+    """False for statements that cannot change table contents (plain reads, SHOW, DESCRIBE, EXPLAIN, USE)."""
+    return classify(sql_query).writes
+
+
+def is_plain_read(sql_query: str) -> bool:
+    """A single SELECT/WITH statement without data-modifying CTEs, SELECT INTO or writing functions."""
+    statement = classify(sql_query)
+    return statement.statements == 1 and statement.command == "SELECT" and not statement.writes
+
+
+# Reads that need the primary: row locks, SELECT INTO, sequences, locks and per-session state (set_config)
+_PRIMARY_ONLY = re.compile(
+    r"\b(?:FOR\s+(?:UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)|LOCK\s+IN\s+SHARE\s+MODE|INTO|NEXTVAL|SETVAL"
+    r"|CURRVAL|LASTVAL|SET_CONFIG|LAST_INSERT_ID|FOUND_ROWS|ROW_COUNT|GET_LOCK|RELEASE_LOCK|IS_USED_LOCK|PG_ADVISORY_\w+"
+    r"|PG_TRY_ADVISORY_\w+|TXID_CURRENT|PG_CURRENT_XACT_ID)\b",
+    re.I,
+)
+
+
+def is_replica_safe(sql_query: str) -> bool:
+    """A plain read a replica can answer: no data-modifying CTEs, locking clauses, SELECT INTO, sequence
+    or lock functions, or session state only the primary connection holds."""
+    return is_plain_read(sql_query) and _PRIMARY_ONLY.search(_without_literals(sql_query)) is None
+
+
+_LIMITING_CLAUSES = re.compile(r"\b(?:LIMIT|OFFSET|FETCH|FOR|INTO|PROCEDURE)\b", re.I)
+
+
+def with_row_limit(sql_query: str, limit: int) -> str:
+    """Cap a plain read at limit rows.
+
+    LIMIT is appended when the text has no LIMIT/OFFSET/FETCH/locking clause anywhere (keeping its
+    ORDER BY); otherwise the query is wrapped in a derived table.
+    """
+    sql_query = strip_leading_comments(sql_query).strip().rstrip(";").rstrip()
+    if _LIMITING_CLAUSES.search(_without_literals(sql_query)) is None and "--" not in sql_query:
+        return f"{sql_query} LIMIT {int(limit)}"
+    return f"SELECT * FROM (\n{sql_query}\n) AS mcp_capped LIMIT {int(limit)}"
+
+
+def is_cacheable_read(sql_query: str) -> bool:
+    """Plain SELECT/WITH queries without data-modifying CTEs, locking clauses or volatile functions."""
+    statement = classify(sql_query)
+    if statement.command != "SELECT" or not statement.read_only:
+        return False
+    return _NON_CACHEABLE.search(_without_literals(sql_query)) is None
+
+
+# ---------------------------
+# Parameterized queries (used by the prepared statement cache)
+# ---------------------------
+_PREPARABLE_KEYWORDS = ("SELECT", "WITH", "VALUES", "INSERT", "UPDATE", "DELETE", "REPLACE", "MERGE", "TABLE")
+_PLACEHOLDER = re.compile(r"%(s|%)")
+
+
+def numbered_placeholders(sql_query: str, marker: str) -> Tuple[str, int]:
+    """Rewrite %s placeholders for PREPARE: marker "$" numbers them ($1, $2 ...), anything else
+    (MySQL "?") is used as is. %% becomes %. Returns (text, number of placeholders)."""
+    count = 0
+
+    def _replace(match):
+        nonlocal count
+        if match.group(1) == "%":
+            return "%"
+        count += 1
+        return f"${count}" if marker == "$" else marker
+    return _PLACEHOLDER.sub(_replace, sql_query), count
+
+
+def is_preparable(sql_query: str) -> bool:
+    """Single DML/query statements can be prepared; utility statements and scripts cannot."""
+    text = _without_literals(strip_leading_comments(sql_query)).strip().rstrip(";")
+    words = text.lstrip("(").split(None, 1)
+    return bool(words) and words[0].upper() in _PREPARABLE_KEYWORDS and ";" not in text
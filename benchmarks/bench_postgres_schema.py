@@ -0,0 +1,174 @@
+"""
+bench_postgres_schema.py
+
+Compares the per-table information_schema extractor that postgres_schema_extractor used to run
+(four queries per table) with the set-based pg_catalog extractor (five queries in total).
+
+For each table count a scratch schema is created with foreign keys and check constraints,
+both extractors are timed against it, and the speedup is printed.
+
+Usage:
+    python benchmarks/bench_postgres_schema.py --tables 50 200 800 --repeat 3
+
+Connection settings come from the same POSTGRES_* environment variables as the server.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Servers"))
+
+import postgres_server  # noqa: E402
+
+BENCH_DATABASE = os.getenv("POSTGRES_BENCH_DATABASE", "mcp_bench_schema")
+
+
+def legacy_extract(cursor, database_name: str) -> str:
+    """The previous N+1 implementation: one information_schema round of queries per table."""
+    schema_info = [f"DATABASE SCHEMA: {database_name}", "=" * 50, ""]
+    cursor.execute("""
+        SELECT table_name
+        FROM information_schema.tables
+        WHERE table_schema = 'public'
+        ORDER BY table_name;
+    """)
+    tables = cursor.fetchall()
+    schema_info.append("TABLE NAMES (Node Types):")
+    schema_info.append("-" * 30)
+    for table in tables:
+        schema_info.append(f"• {table[0]}")
+    schema_info.append("")
+
+    for (table_name,) in tables:
+        schema_info.append(f"TABLE: {table_name}")
+        schema_info.append("=" * 40)
+        cursor.execute("""
+            SELECT column_name, data_type, is_nullable, column_default, character_maximum_length
+            FROM information_schema.columns
+            WHERE table_name = %s AND table_schema = 'public'
+            ORDER BY ordinal_position;
+        """, (table_name,))
+        schema_info.append("COLUMNS (Attributes/Properties):")
+        schema_info.append("-" * 35)
+        for col_name, data_type, nullable, default, max_length in cursor.fetchall():
+            col_info = f"• {col_name}: {data_type}"
+            if max_length:
+                col_info += f"({max_length})"
+            if nullable == "NO":
+                col_info += " NOT NULL"
+            if default:
+                col_info += f" DEFAULT {default}"
+            schema_info.append(col_info)
+        schema_info.append("")
+
+        cursor.execute("""
+            SELECT column_name
+            FROM information_schema.key_column_usage
+            WHERE table_name = %s
+            AND constraint_name IN (
+                SELECT constraint_name
+                FROM information_schema.table_constraints
+                WHERE table_name = %s AND constraint_type = 'PRIMARY KEY'
+            );
+        """, (table_name, table_name))
+        primary_keys = cursor.fetchall()
+        if primary_keys:
+            schema_info.append("PRIMARY KEYS:")
+            schema_info.append("-" * 15)
+            schema_info.extend(f"• {pk[0]}" for pk in primary_keys)
+            schema_info.append("")
+
+        cursor.execute("""
+            SELECT kcu.column_name, ccu.table_name, ccu.column_name, tc.constraint_name
+            FROM information_schema.table_constraints AS tc
+            JOIN information_schema.key_column_usage AS kcu
+                ON tc.constraint_name = kcu.constraint_name
+                AND tc.table_schema = kcu.table_schema
+            JOIN information_schema.constraint_column_usage AS ccu
+                ON ccu.constraint_name = tc.constraint_name
+                AND ccu.table_schema = tc.table_schema
+            WHERE tc.constraint_type = 'FOREIGN KEY'
+            AND tc.table_name = %s;
+        """, (table_name,))
+        foreign_keys = cursor.fetchall()
+        if foreign_keys:
+            schema_info.append("FOREIGN KEY RELATIONSHIPS (Node Connections):")
+            schema_info.append("-" * 45)
+            schema_info.extend(f"• {fk[0]} → {fk[1]}.{fk[2]}" for fk in foreign_keys)
+            schema_info.append("")
+
+        cursor.execute("""
+            SELECT constraint_name, check_clause
+            FROM information_schema.check_constraints
+            WHERE constraint_schema = 'public'
+            AND constraint_name IN (
+                SELECT constraint_name
+                FROM information_schema.table_constraints
+                WHERE table_name = %s AND constraint_type = 'CHECK'
+            );
+        """, (table_name,))
+        check_constraints = cursor.fetchall()
+        if check_constraints:
+            schema_info.append("CHECK CONSTRAINTS:")
+            schema_info.append("-" * 20)
+            schema_info.extend(f"• {name}: {clause}" for name, clause in check_constraints)
+            schema_info.append("")
+        schema_info.append("")
+    return "\n".join(schema_info)
+
+
+def set_based_extract(cursor, database_name: str) -> str:
+    return postgres_server.render_schema(database_name, postgres_server.load_schema(cursor))
+
+
+def seed_schema(cursor, table_count: int):
+    """(Re)create table_count tables: every table has a PK, varchar/default columns, a check and an FK."""
+    cursor.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+    for i in range(table_count):
+        fk = f", parent_id integer REFERENCES t_{i - 1:05d}(id)" if i else ""
+        cursor.execute(f"""
+            CREATE TABLE t_{i:05d} (
+                id serial PRIMARY KEY,
+                name varchar(50) NOT NULL,
+                score integer DEFAULT 0 CHECK (score >= 0),
+                created_at timestamp DEFAULT now(){fk}
+            );
+        """)
+
+
+def time_it(fn, cursor, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(cursor, BENCH_DATABASE)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Create the scratch database through the server itself
+    if not postgres_server.database_exists(BENCH_DATABASE):
+        postgres_server.query_data(f"CREATE DATABASE {BENCH_DATABASE}", postgres_server.MAINTENANCE_DB)
+
+    print(f"{'tables':>8} {'legacy (s)':>12} {'set-based (s)':>14} {'speedup':>9}")
+    with postgres_server.get_pool(BENCH_DATABASE).connection() as conn:
+        conn.autocommit = True
+        cursor = conn.cursor()
+        for table_count in args.tables:
+            seed_schema(cursor, table_count)
+            legacy = time_it(legacy_extract, cursor, args.repeat)
+            set_based = time_it(set_based_extract, cursor, args.repeat)
+            print(f"{table_count:>8} {legacy:>12.3f} {set_based:>14.3f} {legacy / set_based:>8.1f}x")
+        cursor.close()
+        conn.autocommit = False
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+bench_result_encoding.py
+
+Measures the response size, serialization time and approximate LLM token count of every
+result_format on representative synthetic tables (no database needed).
+
+Tokens are counted with tiktoken's cl100k_base encoding when it is installed, otherwise
+estimated as characters / 4.
+
+Usage:
+    python benchmarks/bench_result_encoding.py --rows 200 --repeat 20
+"""
+
+import argparse
+import datetime
+import decimal
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Servers"))
+
+import result_encoding  # noqa: E402
+from result_encoding import RESULT_FORMATS, dumps, encode_rows  # noqa: E402
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_encoding.encode(text))
+    TOKENIZER = "tiktoken cl100k_base"
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return len(text) // 4
+    TOKENIZER = "chars / 4 estimate"
+
+
+def lookup_table(n: int):
+    """Narrow dimension table: id + short name."""
+    columns = ["country_id", "country_name"]
+    names = ["India", "Germany", "Brazil", "Japan", "Kenya", "Canada", "Peru", "Norway"]
+    return columns, [(i, names[i % len(names)]) for i in range(n)]
+
+
+def orders_table(n: int):
+    """Wide fact table with ids, decimals, timestamps, nullable columns."""
+    columns = ["order_id", "customer_id", "status", "amount", "currency", "discount",
+               "created_at", "shipped_at", "warehouse_code", "is_gift"]
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        created = start + datetime.timedelta(minutes=17 * i)
+        rows.append((
+            100000 + i, random.randint(1, 5000), random.choice(["NEW", "PAID", "SHIPPED", "CANCELLED"]),
+            decimal.Decimal(random.randint(100, 99999)) / 100, "EUR",
+            None if i % 3 else decimal.Decimal("5.00"), created,
+            None if i % 4 == 0 else created + datetime.timedelta(days=2),
+            f"WH-{i % 12:02d}", bool(i % 7 == 0),
+        ))
+    return columns, rows
+
+
+def reviews_table(n: int):
+    """Text-heavy table."""
+    columns = ["review_id", "product_id", "rating", "title", "body"]
+    words = "fast delivery great quality would buy again the product broke after a week sturdy".split()
+    return columns, [
+        (i, random.randint(1, 300), random.randint(1, 5),
+         " ".join(random.choices(words, k=4)), " ".join(random.choices(words, k=30)))
+        for i in range(n)
+    ]
+
+
+def measure(columns, rows, result_format, repeat):
+    best = float("inf")
+    text = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = dumps({
+            "status": "success",
+            "database": "bench",
+            **encode_rows(columns, rows, result_format),
+            "sql_query": "SELECT * FROM bench",
+            "row_count": len(rows),
+        }, result_format)
+        best = min(best, time.perf_counter() - start)
+    return len(text.encode("utf-8")), best, count_tokens(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    random.seed(7)
+
+    backend = "orjson" if result_encoding.orjson is not None else "json"
+    print(f"rows={args.rows}  compact backend={backend}  tokens={TOKENIZER}\n")
+    print(f"{'table':<8} {'format':<9} {'bytes':>9} {'ms':>8} {'tokens':>8} {'bytes vs json':>14} {'tokens vs json':>15}")
+    for name, factory in (("lookup", lookup_table), ("orders", orders_table), ("reviews", reviews_table)):
+        columns, rows = factory(args.rows)
+        baseline = None
+        for result_format in RESULT_FORMATS:
+            size, seconds, tokens = measure(columns, rows, result_format, args.repeat)
+            if baseline is None:
+                baseline = (size, tokens)
+            print(f"{name:<8} {result_format:<9} {size:>9} {seconds * 1000:>8.2f} {tokens:>8} "
+                  f"{size / baseline[0]:>13.0%} {tokens / baseline[1]:>14.0%}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
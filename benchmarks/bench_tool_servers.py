@@ -0,0 +1,437 @@
+"""
+bench_tool_servers.py
+
+Latency and throughput of the PostgreSQL and MySQL tool servers against local stand-in databases.
+
+A stand-in server is started per engine (or an existing one is used) and seeded with synthetic
+databases of configurable size; then the real tool functions of postgres_server.py and
+mysql_server.py are driven for each scenario:
+  list            list_databases tool
+  exists          database existence check (catalog cache)
+  query           SELECT ... LIMIT 100 on a rotating table through the query executor
+  switch          the same SELECT, alternating between the seeded databases
+  schema          schema extractor with its cache invalidated before every call
+  schema_cached   schema extractor answered from its cache (fingerprint check only)
+Every scenario runs `--iterations` calls from `--concurrency` concurrent callers after `--warmup`
+calls, and reports p50/p95/p99 latency and calls per second. The read-query result cache is
+disabled unless --query-cache is given, so query and switch measure the database round trip.
+
+Stand-ins (--stand-in):
+  docker    postgres:16 and mysql:8.0 containers on free local ports (removed afterwards)
+  local     throwaway instances from the initdb/pg_ctl and mysqld binaries on PATH (or --pg-bin /
+            --mysql-bin); must not run as root
+  external  the servers configured by the POSTGRES_* / MYSQL_* environment variables
+
+Results can be saved as a baseline and later runs compared against it; a p95 latency or
+throughput more than --tolerance worse than the baseline is reported as a regression and makes
+the script exit with status 1.
+
+Usage:
+    python benchmarks/bench_tool_servers.py --tables 20 --columns 8 --rows 1000 --save-baseline
+    python benchmarks/bench_tool_servers.py --tables 20 --columns 8 --rows 1000
+    python benchmarks/bench_tool_servers.py --stand-in external --engines postgres --scenarios query switch
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+SERVERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Servers")
+sys.path.insert(0, SERVERS_DIR)
+
+from instrumentation import RollingHistogram  # noqa: E402
+
+ENGINES = ("postgres", "mysql")
+SCENARIOS = ("list", "exists", "query", "switch", "schema", "schema_cached")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_tool_servers.json")
+
+STAND_IN_PASSWORD = "bench"
+DOCKER_IMAGES = {"postgres": "postgres:16", "mysql": "mysql:8.0"}
+STARTUP_TIMEOUT = 120
+
+# Same check as the servers' instrumentation: responses put "status" first
+_ERROR_RESPONSE = re.compile(r'\s*\{\s*"status":\s*"error"')
+
+# Synthetic column types, cycled through for the non-key columns
+_PG_TYPES = ("integer", "varchar(40)", "numeric(12,2)", "timestamp", "boolean")
+_MYSQL_TYPES = ("INT", "VARCHAR(40)", "DECIMAL(12,2)", "DATETIME", "BOOLEAN")
+
+
+# ---------------------------
+# Stand-in servers
+# ---------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(ready, what: str, timeout: float = STARTUP_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            ready()
+            return
+        except Exception as e:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{what} did not become ready in {timeout:.0f}s: {e}")
+            time.sleep(0.5)
+
+
+def start_docker(engine: str, stack: ExitStack) -> dict:
+    name = f"mcp-bench-{engine}-{os.getpid()}"
+    port = {"postgres": 5432, "mysql": 3306}[engine]
+    password_env = "POSTGRES_PASSWORD" if engine == "postgres" else "MYSQL_ROOT_PASSWORD"
+    subprocess.run(["docker", "run", "-d", "--rm", "--name", name, "-e", f"{password_env}={STAND_IN_PASSWORD}",
+                    "-p", f"127.0.0.1::{port}", DOCKER_IMAGES[engine]], check=True, stdout=subprocess.DEVNULL)
+    stack.callback(subprocess.run, ["docker", "rm", "-f", name], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    mapped = subprocess.run(["docker", "port", name, f"{port}/tcp"], check=True, capture_output=True, text=True)
+    host_port = mapped.stdout.split()[0].rsplit(":", 1)[1]
+    user = "postgres" if engine == "postgres" else "root"
+    return {"host": "127.0.0.1", "port": host_port, "user": user, "password": STAND_IN_PASSWORD}
+
+
+def start_local_postgres(pg_bin: str, stack: ExitStack) -> dict:
+    workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="mcp-bench-pg-"))
+    data = os.path.join(workdir, "data")
+    binary = lambda name: os.path.join(pg_bin, name) if pg_bin else name
+    subprocess.run([binary("initdb"), "-D", data, "-U", "postgres", "--auth=trust"], check=True,
+                   stdout=subprocess.DEVNULL)
+    # Unix socket only, in the scratch directory: no port to collide with
+    subprocess.run([binary("pg_ctl"), "-D", data, "-o", f"-k {workdir} -h ''", "-l", os.path.join(workdir, "log"),
+                    "-w", "start"], check=True, stdout=subprocess.DEVNULL)
+    stack.callback(subprocess.run, [binary("pg_ctl"), "-D", data, "-m", "fast", "-w", "stop"],
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return {"host": workdir, "port": "5432", "user": "postgres", "password": ""}
+
+
+def start_local_mysql(mysql_bin: str, stack: ExitStack) -> dict:
+    workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="mcp-bench-mysql-"))
+    data = os.path.join(workdir, "data")
+    mysqld = os.path.join(mysql_bin, "mysqld") if mysql_bin else "mysqld"
+    subprocess.run([mysqld, "--no-defaults", "--initialize-insecure", f"--datadir={data}"], check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    port = free_port()
+    process = subprocess.Popen([mysqld, "--no-defaults", f"--datadir={data}", f"--port={port}",
+                                "--bind-address=127.0.0.1", f"--socket={os.path.join(workdir, 'mysql.sock')}",
+                                "--mysqlx=OFF", f"--log-error={os.path.join(workdir, 'error.log')}"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def stop():
+        process.terminate()
+        process.wait(timeout=60)
+    stack.callback(stop)
+    return {"host": "127.0.0.1", "port": str(port), "user": "root", "password": ""}
+
+
+def external(engine: str) -> dict:
+    prefix = engine.upper()
+    defaults = {"postgres": ("5432", "postgres"), "mysql": ("3306", "root")}[engine]
+    return {
+        "host": os.getenv(f"{prefix}_HOST", "localhost"),
+        "port": os.getenv(f"{prefix}_PORT", defaults[0]),
+        "user": os.getenv(f"{prefix}_USER", defaults[1]),
+        "password": os.getenv(f"{prefix}_PASSWORD", "pass123"),
+    }
+
+
+def start_stand_in(engine: str, args, stack: ExitStack) -> dict:
+    if args.stand_in == "docker":
+        settings = start_docker(engine, stack)
+    elif args.stand_in == "local" and engine == "postgres":
+        settings = start_local_postgres(args.pg_bin, stack)
+    elif args.stand_in == "local":
+        settings = start_local_mysql(args.mysql_bin, stack)
+    else:
+        settings = external(engine)
+    wait_until(lambda: connect(engine, settings, None).close(), f"{engine} stand-in")
+    return settings
+
+
+def connect(engine: str, settings: dict, database: str):
+    if engine == "postgres":
+        import psycopg2
+        conn = psycopg2.connect(host=settings["host"], port=settings["port"], user=settings["user"],
+                                password=settings["password"], dbname=database or "postgres")
+        conn.autocommit = True
+        return conn
+    import pymysql
+    return pymysql.connect(host=settings["host"], port=int(settings["port"]), user=settings["user"],
+                           password=settings["password"], database=database, autocommit=True)
+
+
+# ---------------------------
+# Synthetic schemas
+# ---------------------------
+def bench_databases(count: int) -> list:
+    return [f"mcp_bench_{i}" for i in range(count)]
+
+
+def table_names(count: int) -> list:
+    return [f"t_{i:05d}" for i in range(count)]
+
+
+def seed(engine: str, settings: dict, args):
+    """(Re)create the bench databases: tables with a PK, typed columns, an index and an FK to the previous table."""
+    types = _PG_TYPES if engine == "postgres" else _MYSQL_TYPES
+    admin = connect(engine, settings, None)
+    cursor = admin.cursor()
+    for database in bench_databases(args.databases):
+        cursor.execute(f"DROP DATABASE IF EXISTS {database}")
+        cursor.execute(f"CREATE DATABASE {database}")
+    cursor.close()
+    admin.close()
+
+    for database in bench_databases(args.databases):
+        conn = connect(engine, settings, database)
+        cursor = conn.cursor()
+        for i, table in enumerate(table_names(args.tables)):
+            columns = [f"c_{j:02d} {types[j % len(types)]}" for j in range(args.columns)]
+            if i:
+                # Table-level constraint: MySQL ignores inline REFERENCES
+                columns += ["parent_id INT", f"FOREIGN KEY (parent_id) REFERENCES t_{i - 1:05d}(id)"]
+            key = "id serial PRIMARY KEY" if engine == "postgres" else "id INT AUTO_INCREMENT PRIMARY KEY"
+            cursor.execute(f"CREATE TABLE {table} ({', '.join([key] + columns)})")
+            if args.columns:
+                cursor.execute(f"CREATE INDEX {table}_c_00 ON {table} (c_00)")
+            if args.rows:
+                insert_rows(engine, cursor, table, types, args.columns, args.rows)
+        if engine == "postgres":
+            cursor.execute("ANALYZE")
+        cursor.close()
+        conn.close()
+
+
+def insert_rows(engine: str, cursor, table: str, types: tuple, column_count: int, rows: int):
+    names = [f"c_{j:02d}" for j in range(column_count)]
+    if engine == "postgres":
+        values = {
+            "integer": "(g * 7) % 1000",
+            "varchar(40)": "'name_' || (g % 500)",
+            "numeric(12,2)": "(g % 10000) / 100.0",
+            "timestamp": "timestamp '2024-01-01' + g * interval '17 minutes'",
+            "boolean": "g % 7 = 0",
+        }
+        expressions = [values[types[j % len(types)]] for j in range(column_count)]
+        cursor.execute(f"INSERT INTO {table} ({', '.join(names)}) SELECT {', '.join(expressions)} "
+                       f"FROM generate_series(1, {rows}) AS g" if names else
+                       f"INSERT INTO {table} SELECT FROM generate_series(1, {rows})")
+        return
+    values = {
+        "INT": lambda g: (g * 7) % 1000,
+        "VARCHAR(40)": lambda g: f"name_{g % 500}",
+        "DECIMAL(12,2)": lambda g: (g % 10000) / 100,
+        "DATETIME": lambda g: f"2024-01-{g % 28 + 1:02d} 00:00:00",
+        "BOOLEAN": lambda g: g % 7 == 0,
+    }
+    generators = [values[types[j % len(types)]] for j in range(column_count)]
+    if not names:
+        cursor.executemany(f"INSERT INTO {table} () VALUES ()", [()] * rows)
+        return
+    statement = f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(['%s'] * len(names))})"
+    for start in range(1, rows + 1, 1000):
+        cursor.executemany(statement, [tuple(gen(g) for gen in generators)
+                                       for g in range(start, min(rows, start + 999) + 1)])
+
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def configure_environment(engine: str, settings: dict, args):
+    """The server modules read their settings at import time."""
+    prefix = engine.upper()
+    os.environ[f"{prefix}_HOST"] = settings["host"]
+    os.environ[f"{prefix}_PORT"] = str(settings["port"])
+    os.environ[f"{prefix}_USER"] = settings["user"]
+    os.environ[f"{prefix}_PASSWORD"] = settings["password"]
+    if not args.query_cache:
+        os.environ[f"{prefix}_QUERY_CACHE_TTL"] = "0"
+    os.environ["SCHEMA_CACHE_DIR"] = ""
+    os.environ["MCP_TRACE_FILE"] = ""
+
+
+def scenario_calls(engine: str, args) -> dict:
+    """scenario -> factory of the i-th call: (coroutine function, setup run outside the timing)."""
+    if engine == "postgres":
+        import postgres_server as server
+        list_tool, query_tool, schema_tool = (server.list_databases_tool, server.query_data_tool,
+                                              server.extract_database_schema_tool)
+        exists = lambda database: server.run_blocking(server.database_exists, database)
+    else:
+        import mysql_server as server
+        list_tool, query_tool, schema_tool = (server.list_databases_tool, server.query_data,
+                                              server.extract_database_schema)
+        exists = server.database_exists
+    from loguru import logger
+    logger.remove()  # the tools log every call at DEBUG
+
+    databases = bench_databases(args.databases)
+    tables = table_names(args.tables)
+    select = lambda i: f"SELECT * FROM {tables[i % len(tables)]} ORDER BY id LIMIT 100"
+
+    def invalidate(database):
+        server.schema_cache.invalidate(database)
+
+    return {
+        "list": lambda i: (list_tool, (), None),
+        "exists": lambda i: (exists, (databases[i % len(databases)],), None),
+        "query": lambda i: (query_tool, (select(i), databases[0]), None),
+        "switch": lambda i: (query_tool, (select(i // len(databases)), databases[i % len(databases)]), None),
+        "schema": lambda i: (schema_tool, (databases[0],), lambda: invalidate(databases[0])),
+        "schema_cached": lambda i: (schema_tool, (databases[0],), None),
+    }
+
+
+async def run_scenario(make_call, iterations: int, concurrency: int, warmup: int) -> dict:
+    for i in range(warmup):
+        func, call_args, setup = make_call(i)
+        if setup:
+            setup()
+        await func(*call_args)
+
+    latency = RollingHistogram(iterations)
+    errors = 0
+    next_call = 0
+    lock = asyncio.Lock()  # setup + call of the cold scenarios must not interleave
+
+    async def caller():
+        nonlocal next_call, errors
+        while next_call < iterations:
+            i = next_call
+            next_call += 1
+            func, call_args, setup = make_call(i)
+            if setup:
+                async with lock:
+                    setup()
+                    started = time.perf_counter()
+                    result = await func(*call_args)
+            else:
+                started = time.perf_counter()
+                result = await func(*call_args)
+            latency.add((time.perf_counter() - started) * 1000)
+            if isinstance(result, str) and _ERROR_RESPONSE.match(result):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    summary = latency.summary()
+    return {
+        "calls": summary["count"],
+        "errors": errors,
+        "p50_ms": summary["p50"],
+        "p95_ms": summary["p95"],
+        "p99_ms": summary["p99"],
+        "mean_ms": summary["mean"],
+        "throughput": round(summary["count"] / elapsed, 1),
+    }
+
+
+async def bench_engine(engine: str, args) -> dict:
+    calls = scenario_calls(engine, args)
+    results = {}
+    for scenario in args.scenarios:
+        results[scenario] = await run_scenario(calls[scenario], args.iterations, args.concurrency, args.warmup)
+    if engine == "mysql":
+        import mysql_server
+        mysql_server.pool.close()
+    return results
+
+
+# ---------------------------
+# Reporting and baselines
+# ---------------------------
+def compare(results: dict, baseline: dict, tolerance: float) -> dict:
+    """scenario key -> (p95 change, throughput change, regressed) for the scenarios in both runs."""
+    changes = {}
+    for engine, scenarios in results.items():
+        for scenario, current in scenarios.items():
+            previous = baseline.get("results", {}).get(engine, {}).get(scenario)
+            if not previous:
+                continue
+            p95 = current["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+            throughput = current["throughput"] / previous["throughput"] - 1 if previous["throughput"] else 0.0
+            changes[(engine, scenario)] = (p95, throughput, p95 > tolerance or throughput < -tolerance)
+    return changes
+
+
+def print_report(results: dict, changes: dict):
+    header = f"{'engine':<9} {'scenario':<14} {'calls':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'calls/s':>9}"
+    print(header + (f" {'p95 vs base':>12} {'calls/s vs base':>16}" if changes else ""))
+    for engine, scenarios in results.items():
+        for scenario, r in scenarios.items():
+            line = (f"{engine:<9} {scenario:<14} {r['calls']:>6} {r['errors']:>6} {r['p50_ms']:>9.2f} "
+                    f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput']:>9.1f}")
+            change = changes.get((engine, scenario))
+            if change:
+                line += f" {change[0]:>+12.0%} {change[1]:>+16.0%}" + ("  REGRESSION" if change[2] else "")
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stand-in", choices=("docker", "local", "external"), default="docker")
+    parser.add_argument("--pg-bin", default="", help="directory of initdb/pg_ctl for --stand-in local")
+    parser.add_argument("--mysql-bin", default="", help="directory of mysqld for --stand-in local")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=list(ENGINES))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--databases", type=int, default=2)
+    parser.add_argument("--tables", type=int, default=20)
+    parser.add_argument("--columns", type=int, default=8)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--query-cache", action="store_true", help="keep the read-query result cache enabled")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the bench databases of a previous run")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+    args.databases = max(1, args.databases)
+    args.tables = max(1, args.tables)
+
+    config = {key: getattr(args, key) for key in ("stand_in", "databases", "tables", "columns", "rows",
+                                                   "iterations", "concurrency", "query_cache")}
+    results = {}
+    with ExitStack() as stack:
+        for engine in args.engines:
+            print(f"Starting {engine} ({args.stand_in})...")
+            settings = start_stand_in(engine, args, stack)
+            if not args.skip_seed:
+                started = time.perf_counter()
+                seed(engine, settings, args)
+                print(f"Seeded {args.databases} x {args.tables} tables x {args.columns} columns x {args.rows} rows "
+                      f"in {time.perf_counter() - started:.1f}s")
+            configure_environment(engine, settings, args)
+            results[engine] = asyncio.run(bench_engine(engine, args))
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("config") != config:
+            print(f"⚠️  Baseline {args.baseline} was recorded with {baseline.get('config')}; numbers may not compare")
+    changes = compare(results, baseline, args.tolerance) if baseline else {}
+    print()
+    print_report(results, changes)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+                       "config": config, "results": results}, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    if any(change[2] for change in changes.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
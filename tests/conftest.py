@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The server modules import each other as top-level modules (they run as scripts from Servers/)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Servers"))
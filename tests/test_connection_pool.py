@@ -0,0 +1,196 @@
+import asyncio
+import time
+
+import pytest
+
+import connection_pool
+from connection_pool import ANY_TAG, AsyncConnectionPool, ConnectionPool, PoolExhaustedError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return time.perf_counter()
+
+
+class FakeConnection:
+    def __init__(self, tag):
+        self.tag = tag
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(connection_pool, "time", fake)
+    return fake
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect(tag):
+        conn = FakeConnection(tag)
+        opened.append(conn)
+        return conn
+
+    pool = ConnectionPool(connect, **kwargs)
+    return pool, opened
+
+
+def test_released_connection_is_reused(clock):
+    pool, opened = make_pool(max_size=2)
+    conn = pool.acquire("db")
+    pool.release(conn)
+    assert pool.acquire("db") is conn
+    stats = pool.stats()
+    assert len(opened) == 1
+    assert stats["misses"] == 1 and stats["hits"] == 1 and stats["in_use"] == 1
+
+
+def test_connection_context_manager_returns_the_connection(clock):
+    pool, _ = make_pool(max_size=1)
+    with pool.connection("db") as conn:
+        assert pool.stats()["in_use"] == 1
+    assert pool.stats()["idle"] == 1
+    assert pool.acquire("db") is conn
+
+
+def test_exhausted_pool_times_out(clock):
+    pool, _ = make_pool(max_size=1)
+    pool.acquire("db")
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire("db", timeout=0)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_closed_pool_refuses_borrowers(clock):
+    pool, opened = make_pool(max_size=1)
+    pool.release(pool.acquire("db"))
+    pool.close()
+    assert opened[0].closed
+    with pytest.raises(PoolExhaustedError):
+        pool.acquire("db")
+
+
+def test_failed_reset_discards_the_connection(clock):
+    def reset(conn):
+        raise RuntimeError("rollback failed")
+
+    pool, opened = make_pool(max_size=1, reset=reset)
+    conn = pool.acquire("db")
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["idle"] == 0
+    assert pool.acquire("db") is not conn
+    assert len(opened) == 2
+
+
+def test_discarded_connection_is_closed(clock):
+    pool, _ = make_pool(max_size=1)
+    conn = pool.acquire("db")
+    pool.release(conn, discard=True)
+    assert conn.closed
+    assert pool.stats()["discarded"] == 1
+
+
+def test_max_lifetime_recycles_connections(clock):
+    pool, opened = make_pool(max_size=1, max_lifetime=60)
+    conn = pool.acquire("db")
+    pool.release(conn)
+    clock.now += 61
+    assert pool.acquire("db") is not conn
+    assert conn.closed
+    assert pool.stats()["lifetime_recycles"] == 1
+
+
+def test_idle_eviction_keeps_min_size(clock):
+    pool, opened = make_pool(max_size=3, min_size=1, idle_timeout=10)
+    conns = [pool.acquire("db") for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    clock.now += 11
+    pool.prune()
+    stats = pool.stats()
+    assert stats["idle"] == 1
+    assert stats["idle_evictions"] == 2
+    # The most recently released connection survives
+    assert not conns[-1].closed and conns[0].closed and conns[1].closed
+
+
+def test_dead_connection_fails_health_check(clock):
+    pool, opened = make_pool(max_size=1, health_check=lambda conn: False, health_check_interval=5)
+    conn = pool.acquire("db")
+    pool.release(conn)
+    clock.now += 6
+    assert pool.acquire("db") is not conn
+    assert pool.stats()["health_check_failures"] == 1
+
+
+def test_tag_mismatch_switches_an_idle_connection(clock):
+    switched = []
+
+    def switch(conn, tag):
+        switched.append(tag)
+        conn.tag = tag
+
+    pool, opened = make_pool(max_size=1, switch=switch)
+    conn = pool.acquire("db1")
+    pool.release(conn)
+    assert pool.acquire("db2") is conn
+    assert switched == ["db2"] and conn.tag == "db2"
+    assert pool.stats()["switches"] == 1
+
+
+def test_tag_mismatch_without_switch_opens_a_new_connection(clock):
+    pool, opened = make_pool(max_size=2)
+    pool.release(pool.acquire("db1"))
+    conn = pool.acquire("db2")
+    assert conn.tag == "db2" and len(opened) == 2
+
+
+def test_any_tag_takes_any_warm_connection(clock):
+    pool, _ = make_pool(max_size=1)
+    conn = pool.acquire("db1")
+    pool.release(conn)
+    assert pool.acquire(ANY_TAG) is conn
+
+
+def test_min_size_is_opened_in_the_background():
+    pool, opened = make_pool(max_size=5, min_size=3)
+    pool.acquire("db")
+    deadline = time.monotonic() + 2
+    while pool.stats()["prewarmed"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = pool.stats()
+    assert stats["prewarmed"] == 2 and stats["idle"] == 2 and stats["misses"] == 1
+    assert all(conn.tag == "db" for conn in opened)
+
+
+def test_async_pool_reuses_switches_and_times_out():
+    async def scenario():
+        async def connect(tag):
+            return FakeConnection(tag)
+
+        async def switch(conn, tag):
+            conn.tag = tag
+
+        pool = AsyncConnectionPool(connect, max_size=1, switch=switch)
+        conn = await pool.acquire("db1")
+        with pytest.raises(PoolExhaustedError):
+            await pool.acquire("db1", timeout=0.01)
+        await pool.release(conn)
+        assert await pool.acquire("db2") is conn
+        assert conn.tag == "db2"
+        return pool.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["misses"] == 1 and stats["switches"] == 1 and stats["timeouts"] == 1
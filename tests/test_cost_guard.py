@@ -0,0 +1,96 @@
+import pytest
+
+from cost_guard import CostGuard, QueryRejected, mysql_plan_estimate, postgres_plan_estimate
+
+# EXPLAIN (FORMAT JSON) output of a sequential scan
+POSTGRES_PLAN = [{"Plan": {"Node Type": "Seq Scan", "Relation Name": "orders", "Startup Cost": 0.0,
+                           "Total Cost": 1834.0, "Plan Rows": 50000, "Plan Width": 40}}]
+
+# EXPLAIN FORMAT=JSON (version 1) output of a two-table join
+MYSQL_JOIN_PLAN = {"query_block": {
+    "select_id": 1,
+    "cost_info": {"query_cost": "5210.40"},
+    "nested_loop": [
+        {"table": {"table_name": "customers", "access_type": "ALL", "rows_examined_per_scan": 2000,
+                   "rows_produced_per_join": 2000}},
+        {"table": {"table_name": "orders", "access_type": "ref", "rows_examined_per_scan": 12,
+                   "rows_produced_per_join": 24000}},
+    ]}}
+
+# The same join folded by GROUP BY: the output row count is unknown
+MYSQL_GROUPED_PLAN = {"query_block": {
+    "select_id": 1,
+    "cost_info": {"query_cost": "5210.40"},
+    "grouping_operation": {"using_temporary_table": True, "nested_loop": MYSQL_JOIN_PLAN["query_block"]["nested_loop"]}}}
+
+# EXPLAIN FORMAT=JSON version 2 (MySQL 8.3+)
+MYSQL_V2_PLAN = {"query": "/* select#1 */ select ...", "operation": "Table scan on orders",
+                 "estimated_rows": 50000.0, "estimated_total_cost": 5120.25}
+
+
+@pytest.mark.parametrize("plan,estimate", [
+    (MYSQL_JOIN_PLAN, (24000.0, 5210.4)),
+    (MYSQL_GROUPED_PLAN, (None, 5210.4)),
+    (MYSQL_V2_PLAN, (50000.0, 5120.25)),
+    ({"query_block": {"select_id": 1, "message": "No tables used"}}, (None, None)),
+])
+def test_mysql_plan_estimate(plan, estimate):
+    assert mysql_plan_estimate(plan) == estimate
+
+
+def test_postgres_plan_estimate():
+    assert postgres_plan_estimate(POSTGRES_PLAN) == (50000, 1834.0)
+
+
+def test_cheap_query_runs_as_is():
+    guard = CostGuard("postgres", mode="reject", max_rows=100000, max_cost=10000)
+    assert guard.check(*postgres_plan_estimate(POSTGRES_PLAN)) is None
+    assert guard.stats()["checked"] == 1
+
+
+def test_too_many_rows_rejected_in_reject_mode():
+    guard = CostGuard("postgres", mode="reject", max_rows=1000, max_cost=10000)
+    with pytest.raises(QueryRejected) as info:
+        guard.check(*postgres_plan_estimate(POSTGRES_PLAN))
+    assert info.value.report["action"] == "rejected"
+    assert info.value.report["estimated_rows"] == 50000
+    assert guard.stats()["rejected"] == 1
+
+
+def test_too_many_rows_capped_in_limit_mode():
+    guard = CostGuard("mysql", mode="limit", max_rows=1000, max_cost=10000, row_cap=500)
+    report = guard.check(*mysql_plan_estimate(MYSQL_JOIN_PLAN))
+    assert report["action"] == "capped" and report["limit"] == 500
+    assert guard.stats()["capped"] == 1
+
+
+def test_too_costly_rejected_even_in_limit_mode():
+    guard = CostGuard("mysql", mode="limit", max_rows=1000, max_cost=5000)
+    with pytest.raises(QueryRejected) as info:
+        guard.check(*mysql_plan_estimate(MYSQL_V2_PLAN))
+    assert "cost" in str(info.value)
+
+
+def test_paged_queries_skip_the_row_limit():
+    guard = CostGuard("mysql", mode="reject", max_rows=1000, max_cost=10000)
+    assert guard.check(*mysql_plan_estimate(MYSQL_JOIN_PLAN), paged=True) is None
+    with pytest.raises(QueryRejected):
+        guard.check(*postgres_plan_estimate(POSTGRES_PLAN), paged=False)
+
+
+@pytest.mark.parametrize("plan", [MYSQL_GROUPED_PLAN, {"query_block": {}}])
+def test_unknown_rows_are_not_limited(plan):
+    guard = CostGuard("mysql", mode="reject", max_rows=1, max_cost=0)
+    assert guard.check(*mysql_plan_estimate(plan)) is None
+
+
+def test_zero_thresholds_are_not_checked():
+    guard = CostGuard("postgres", mode="reject", max_rows=0, max_cost=0)
+    assert guard.check(*postgres_plan_estimate(POSTGRES_PLAN)) is None
+
+
+def test_mode_is_validated():
+    assert not CostGuard("postgres", mode=" OFF ").enabled
+    assert CostGuard("postgres", mode=None).mode == "off"
+    with pytest.raises(ValueError):
+        CostGuard("postgres", mode="warn")
@@ -0,0 +1,106 @@
+import gc
+
+from prepared_statements import PreparedStatementCache, statement_key
+
+
+class FakeConnection:
+    pass
+
+
+def run(cache, conn, key, database="db"):
+    """Mimic an executor: check out, then record a newly prepared name."""
+    name, ready, stale = cache.checkout(conn, database, key)
+    if name is not None and not ready:
+        cache.prepared(conn, key, name)
+    return name, ready, stale
+
+
+def test_statement_key():
+    assert statement_key("db", "SELECT %s", [1, 2], ["int"]) == ("db", "SELECT %s", 2, ("int",))
+    assert statement_key("db", "SELECT %s", (1,)) == ("db", "SELECT %s", 1, ())
+
+
+def test_prepared_after_threshold_uses_then_reused():
+    cache = PreparedStatementCache("postgres", threshold=2)
+    conn = FakeConnection()
+    key = statement_key("db", "SELECT %s", [1])
+    assert run(cache, conn, key) == (None, False, [])
+    assert run(cache, conn, key) == ("mcp_stmt_1", False, [])
+    assert run(cache, conn, key) == ("mcp_stmt_1", True, [])
+    stats = cache.stats()
+    assert stats["unprepared"] == 1 and stats["prepares"] == 1 and stats["hits"] == 1
+    assert stats["statements"] == 1
+
+
+def test_threshold_one_prepares_immediately():
+    cache = PreparedStatementCache("postgres", threshold=0)
+    assert cache.threshold == 1
+    assert run(cache, FakeConnection(), ("db", "q", 0, ())) == ("mcp_stmt_1", False, [])
+
+
+def test_failed_prepare_is_not_recorded():
+    cache = PreparedStatementCache("postgres", threshold=1)
+    conn = FakeConnection()
+    key = ("db", "q", 0, ())
+    name, ready, _ = cache.checkout(conn, "db", key)
+    assert name == "mcp_stmt_1" and not ready
+    # prepared() never called: the next checkout prepares again under a new name
+    assert cache.checkout(conn, "db", key)[:2] == ("mcp_stmt_2", False)
+
+
+def test_forget_drops_a_statement():
+    cache = PreparedStatementCache("postgres", threshold=1)
+    conn = FakeConnection()
+    key = ("db", "q", 0, ())
+    run(cache, conn, key)
+    cache.forget(conn, key)
+    assert run(cache, conn, key) == ("mcp_stmt_2", False, [])
+
+
+def test_lru_eviction_returns_stale_names():
+    cache = PreparedStatementCache("postgres", max_per_connection=2, threshold=1)
+    conn = FakeConnection()
+    a, b, c = (("db", sql, 0, ()) for sql in ("a", "b", "c"))
+    run(cache, conn, a)
+    run(cache, conn, b)
+    run(cache, conn, a)  # a is now the most recently used
+    assert run(cache, conn, c) == ("mcp_stmt_3", False, ["mcp_stmt_2"])
+    assert run(cache, conn, a) == ("mcp_stmt_1", True, [])
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_marks_only_that_database_stale():
+    cache = PreparedStatementCache("postgres", threshold=1)
+    conn = FakeConnection()
+    run(cache, conn, ("db", "a", 0, ()))
+    run(cache, conn, ("other", "b", 0, ()), database="other")
+    cache.invalidate("db")
+    assert run(cache, conn, ("db", "a", 0, ())) == ("mcp_stmt_3", False, ["mcp_stmt_1"])
+    assert run(cache, conn, ("other", "b", 0, ()), database="other") == ("mcp_stmt_2", True, [])
+
+
+def test_statements_are_per_connection():
+    cache = PreparedStatementCache("postgres", threshold=1)
+    first, second = FakeConnection(), FakeConnection()
+    key = ("db", "q", 0, ())
+    run(cache, first, key)
+    assert run(cache, second, key) == ("mcp_stmt_1", False, [])
+    assert cache.stats()["connections"] == 2
+
+
+def test_state_goes_away_with_the_connection():
+    cache = PreparedStatementCache("postgres", threshold=1)
+    conn = FakeConnection()
+    run(cache, conn, ("db", "q", 0, ()))
+    assert cache.stats()["connections"] == 1
+    del conn
+    gc.collect()
+    assert cache.stats()["connections"] == 0
+
+
+def test_disabled_never_prepares():
+    cache = PreparedStatementCache("postgres", max_per_connection=0, threshold=1)
+    assert not cache.enabled
+    conn = FakeConnection()
+    for _ in range(3):
+        assert run(cache, conn, ("db", "q", 0, ())) == (None, False, [])
@@ -0,0 +1,109 @@
+import pytest
+
+import query_cache
+from query_cache import QueryResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(query_cache, "time", fake)
+    return fake
+
+
+def store(cache, key, tables=("users",), size=10, database="db"):
+    cache.put((database, key), database, ["id"], [(1,)], tables, size)
+
+
+def test_put_then_get(clock):
+    cache = QueryResultCache("postgres", max_bytes=1000)
+    assert cache.get(("db", "q")) is None
+    cache.put(("db", "q"), "db", ["id"], [(1,), (2,)], ["users"], 10)
+    entry = cache.get(("db", "q"))
+    assert entry.colnames == ["id"] and entry.rows == [(1,), (2,)]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["bytes"] == 10
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = QueryResultCache("postgres", max_bytes=1000, ttl=30)
+    store(cache, "q")
+    clock.now += 31
+    assert cache.get(("db", "q")) is None
+    stats = cache.stats()
+    assert stats["expirations"] == 1 and stats["entries"] == 0 and stats["bytes"] == 0
+
+
+def test_replacing_a_key_does_not_double_count_bytes(clock):
+    cache = QueryResultCache("postgres", max_bytes=1000)
+    store(cache, "q", size=10)
+    store(cache, "q", size=20)
+    stats = cache.stats()
+    assert stats["entries"] == 1 and stats["bytes"] == 20
+
+
+def test_max_bytes_evicts_least_recently_used(clock):
+    cache = QueryResultCache("postgres", max_bytes=100)
+    for key in ("a", "b", "c", "d"):
+        store(cache, key, size=25)
+    cache.get(("db", "a"))
+    store(cache, "e", size=25)
+    assert cache.get(("db", "b")) is None
+    assert cache.get(("db", "a")) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] == 100
+
+
+def test_max_entries_evicts_oldest(clock):
+    cache = QueryResultCache("postgres", max_entries=2, max_bytes=1000)
+    for key in ("a", "b", "c"):
+        store(cache, key)
+    assert cache.get(("db", "a")) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_entries_over_a_quarter_of_the_budget_are_refused(clock):
+    cache = QueryResultCache("postgres", max_bytes=100)
+    store(cache, "big", size=26)
+    store(cache, "fits", size=25)
+    assert cache.get(("db", "big")) is None
+    assert cache.get(("db", "fits")) is not None
+    stats = cache.stats()
+    assert stats["too_large"] == 1 and stats["stores"] == 1 and stats["bytes"] == 25
+
+
+def test_invalidate_tables_drops_only_dependent_entries(clock):
+    cache = QueryResultCache("postgres", max_bytes=1000)
+    store(cache, "users", tables=["users"])
+    store(cache, "join", tables=["users", "orders"])
+    store(cache, "orders", tables=["orders"])
+    store(cache, "other_db_users", tables=["users"], database="other")
+    assert cache.invalidate("db", {"users"}) == 3
+    assert cache.get(("db", "orders")) is not None
+    assert cache.get(("db", "users")) is None
+    assert cache.get(("db", "join")) is None
+    assert cache.get(("other", "other_db_users")) is None
+    assert cache.stats()["bytes"] == 10
+
+
+def test_invalidate_database_and_everything(clock):
+    cache = QueryResultCache("postgres", max_bytes=1000)
+    store(cache, "a", database="db")
+    store(cache, "b", database="other")
+    assert cache.invalidate("db") == 1
+    assert cache.get(("other", "b")) is not None
+    assert cache.invalidate() == 1
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("kwargs", [{"ttl": 0}, {"max_entries": 0}, {"max_bytes": 0}])
+def test_disabled(kwargs):
+    assert not QueryResultCache("postgres", **kwargs).enabled
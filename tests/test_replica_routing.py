@@ -0,0 +1,102 @@
+import pytest
+
+import replica_routing
+from replica_routing import ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(replica_routing, "time", fake)
+    return fake
+
+
+def test_no_replicas_reads_from_primary(clock):
+    router = ReplicaRouter("postgres", [])
+    assert not router.enabled
+    assert router.choose("db") is None
+
+
+def test_round_robin(clock):
+    router = ReplicaRouter("postgres", ["r1", "r2"])
+    assert [router.choose("db") for _ in range(4)] == ["r1", "r2", "r1", "r2"]
+    assert router.stats()["replica_reads"] == 4
+
+
+def test_read_after_write_window(clock):
+    router = ReplicaRouter("postgres", ["r1"], read_after_write=5)
+    router.note_write("db")
+    clock.now += 4.9
+    assert router.choose("db") is None
+    assert router.choose("other") == "r1"
+    clock.now += 0.2
+    assert router.choose("db") == "r1"
+    stats = router.stats()
+    assert stats["fallback_read_after_write"] == 1 and stats["primary_reads"] == 1
+
+
+def test_read_after_write_disabled(clock):
+    router = ReplicaRouter("postgres", ["r1"], read_after_write=0)
+    router.note_write("db")
+    assert router.choose("db") == "r1"
+
+
+def test_lag_check_only_when_max_lag_set(clock):
+    assert not ReplicaRouter("postgres", ["r1"]).lag_check_due("r1")
+    router = ReplicaRouter("postgres", ["r1"], max_lag=10, check_interval=5)
+    assert router.lag_check_due("r1")
+    assert router.report_lag("r1", 2.0)
+    clock.now += 4
+    assert not router.lag_check_due("r1")
+    clock.now += 1
+    assert router.lag_check_due("r1")
+
+
+def test_lagging_replica_falls_back_until_rechecked(clock):
+    router = ReplicaRouter("postgres", ["r1"], max_lag=10, check_interval=5)
+    assert router.choose("db") == "r1"
+    assert not router.report_lag("r1", 30.0)
+    clock.now += 1
+    assert router.choose("db") is None
+    clock.now += 5
+    # The check is due again, so the replica is offered for another measurement
+    assert router.choose("db") == "r1"
+    assert router.report_lag("r1", 1.0)
+    stats = router.stats()
+    assert stats["fallback_lag"] == 1 and stats["fallback_unavailable"] == 1
+    assert stats["replica_reads"] == 1 and stats["primary_reads"] == 2
+    assert stats["replicas"]["r1"]["available"]
+
+
+def test_unknown_lag_counts_as_lagging(clock):
+    router = ReplicaRouter("postgres", ["r1"], max_lag=10)
+    router.choose("db")
+    assert not router.report_lag("r1", None)
+    assert not router.stats()["replicas"]["r1"]["available"]
+
+
+def test_lagging_replica_is_skipped_for_a_healthy_one(clock):
+    router = ReplicaRouter("postgres", ["r1", "r2"], max_lag=10)
+    router.choose("db")
+    router.report_lag("r1", 60.0)
+    assert [router.choose("db") for _ in range(3)] == ["r2", "r2", "r2"]
+
+
+def test_failed_replica_is_skipped_for_check_interval(clock):
+    router = ReplicaRouter("postgres", ["r1"], check_interval=5)
+    router.choose("db")
+    router.report_failure("r1", ConnectionError("refused"))
+    assert router.choose("db") is None
+    assert router.stats()["replicas"]["r1"]["last_error"] == "ConnectionError: refused"
+    clock.now += 5
+    assert router.choose("db") == "r1"
+    stats = router.stats()
+    assert stats["fallback_error"] == 1 and stats["fallback_unavailable"] == 1
@@ -0,0 +1,74 @@
+import pytest
+
+from sql_utils import classify, folded_name_parts, is_cacheable_read, is_plain_read, is_replica_safe, may_write
+
+
+@pytest.mark.parametrize("sql_query", [
+    "SELECT replace(name, ' ', '_') FROM users",
+    "SELECT insert('abc', 1, 1, 'x')",
+    "SELECT update FROM t",
+    "SELECT t.update, \"delete\" FROM t",
+    "SELECT $$a; b$$",
+    "SELECT $$ delete $$",
+    "SELECT $body$ delete $body$",
+    "SELECT 'delete from t'",
+    "SELECT 1 /* ; delete from t */",
+    "(SELECT 1) UNION (SELECT 2)",
+])
+def test_plain_selects_are_read_only_queries(sql_query):
+    statement = classify(sql_query)
+    assert statement.command == "SELECT"
+    assert statement.statements == 1
+    assert not statement.writes
+    assert statement.read_only
+    assert statement.query
+    assert not may_write(sql_query)
+    assert is_plain_read(sql_query)
+
+
+@pytest.mark.parametrize("sql_query", [
+    "WITH d AS (DELETE FROM t RETURNING *) SELECT * FROM d",
+    "WITH d AS MATERIALIZED (UPDATE t SET a = 1 RETURNING *) SELECT * FROM d",
+    "SELECT * INTO t2 FROM t",
+    "SELECT nextval('s')",
+    "SELECT set_config('search_path', 'x', false)",
+    "EXPLAIN ANALYZE DELETE FROM t",
+    "SELECT 1; DELETE FROM t",
+    "INSERT INTO t VALUES (1)",
+    "WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x",
+])
+def test_writes(sql_query):
+    statement = classify(sql_query)
+    assert statement.writes
+    assert not statement.read_only
+    assert not statement.query
+    assert may_write(sql_query)
+    assert not is_cacheable_read(sql_query)
+    assert not is_replica_safe(sql_query)
+
+
+def test_locking_reads_are_not_read_only():
+    for sql_query in ("SELECT * FROM t FOR UPDATE", "SELECT * FROM t FOR NO KEY UPDATE", "SELECT * FROM t LOCK IN SHARE MODE"):
+        statement = classify(sql_query)
+        assert statement.locking and not statement.writes and not statement.read_only
+        assert not is_cacheable_read(sql_query)
+
+
+def test_utility_statements():
+    assert classify("SHOW TABLES").read_only
+    assert classify("EXPLAIN SELECT 1").read_only
+    assert not classify("USE db").writes and not classify("USE db").read_only
+    assert classify("SET x = 1").writes
+    assert classify("").statements == 0
+
+
+@pytest.mark.parametrize("name, parts", [
+    ("Users", ["users"]),
+    ('"MixedCase"', ["MixedCase"]),
+    ("schema.table", ["schema", "table"]),
+    ('Sales."Q1 Orders"', ["sales", "Q1 Orders"]),
+    ('"with.dot"', ["with.dot"]),
+    (' "say ""hi""" ', ['say "hi"']),
+])
+def test_folded_name_parts(name, parts):
+    assert folded_name_parts(name) == parts